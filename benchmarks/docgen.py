@@ -0,0 +1,114 @@
+"""
+合成 .docx 文档生成器。
+
+按参数生成可复现的测试文档：段落数、每段的run数、表格数量和大小、是否包含合并单元格、
+嵌入图片的大小。相同参数和随机种子始终生成内容相同的文档。
+"""
+import io
+import random
+import struct
+import zlib
+from typing import Dict, Any
+
+import docx
+from docx.oxml import parse_xml
+from docx.shared import Pt, RGBColor
+
+W_NS = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+
+_WORDS = ["合同", "甲方", "乙方", "liability", "clause", "payment", "条款", "annex", "收入", "schedule", "违约", "term"]
+
+
+def _png(size: int, rng: random.Random) -> bytes:
+    """生成一张 1x1 的合法PNG，并用私有辅助块把文件填充到约 size 字节（模拟大图片）。"""
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data) & 0xFFFFFFFF)
+
+    header = b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", struct.pack(">IIBBBBB", 1, 1, 8, 2, 0, 0, 0))
+    pixels = chunk(b"IDAT", zlib.compress(b"\x00\xff\x00\x00"))
+    padding = max(0, size - len(header) - len(pixels) - 24)
+    # 随机字节不可压缩，zip包中的图片大小与 size 基本一致
+    filler = chunk(b"prIv", rng.getrandbits(8 * padding).to_bytes(padding, "little")) if padding else b""
+    return header + filler + pixels + chunk(b"IEND", b"")
+
+
+def _text(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(_WORDS) for _ in range(words))
+
+
+def _table_xml(rows: int, cols: int, merged: bool, rng: random.Random) -> str:
+    """直接生成表格XML（python-docx 逐个单元格构建大表格太慢）。"""
+    grid = "".join("<w:gridCol w:w=\"1200\"/>" for _ in range(cols))
+    parts = [f'<w:tbl xmlns:w="{W_NS}"><w:tblPr><w:tblStyle w:val="TableGrid"/></w:tblPr><w:tblGrid>{grid}</w:tblGrid>']
+    for r in range(rows):
+        cells = []
+        c = 0
+        while c < cols:
+            props = ""
+            span = 1
+            if merged and c == 0:
+                # 第一列每5行纵向合并一次
+                props = '<w:vMerge w:val="restart"/>' if r % 5 == 0 else "<w:vMerge/>"
+            elif merged and c == 1 and cols >= 3:
+                # 第二、三列横向合并
+                span = 2
+                props = '<w:gridSpan w:val="2"/>'
+            text = _text(rng, 3) if not (merged and c == 0 and r % 5) else ""
+            cells.append(f"<w:tc><w:tcPr>{props}</w:tcPr><w:p><w:r><w:t>{text}</w:t></w:r></w:p></w:tc>")
+            c += span
+        parts.append("<w:tr>" + "".join(cells) + "</w:tr>")
+    parts.append("</w:tbl>")
+    return "".join(parts)
+
+
+def generate(paragraphs: int = 200, runs_per_paragraph: int = 3, tables: int = 1, table_rows: int = 50,
+             table_cols: int = 5, merged_cells: bool = True, media_count: int = 0, media_size: int = 0,
+             seed: int = 0) -> bytes:
+    """
+    生成一份合成文档并返回其字节内容。
+
+    :param paragraphs: 段落数量（不含标题）。
+    :param runs_per_paragraph: 每个段落的run数量，run之间交替使用不同格式。
+    :param tables: 表格数量，均匀分布在段落之间。
+    :param table_rows: 每个表格的行数。
+    :param table_cols: 每个表格的列数。
+    :param merged_cells: 表格是否包含纵向和横向合并的单元格。
+    :param media_count: 嵌入图片的数量。
+    :param media_size: 每张图片的大小（字节）。
+    :param seed: 随机种子。
+    """
+    rng = random.Random(seed)
+    document = docx.Document()
+    document.add_heading("Benchmark document", 1)
+    body = document.element.body
+
+    table_every = paragraphs // tables if tables else 0
+    tables_added = 0
+    for i in range(paragraphs):
+        p = document.add_paragraph()
+        for j in range(runs_per_paragraph):
+            run = p.add_run(_text(rng, rng.randint(3, 12)) + " ")
+            if j % 3 == 1:
+                run.bold = True
+            elif j % 3 == 2:
+                run.font.size = Pt(9)
+                run.font.color.rgb = RGBColor(0x80, 0, 0)
+        if table_every and (i + 1) % table_every == 0 and tables_added < tables:
+            # 插入到 sectPr 之前，与 add_paragraph 的位置一致
+            body.insert(len(body) - 1, parse_xml(_table_xml(table_rows, table_cols, merged_cells, rng)))
+            tables_added += 1
+
+    for _ in range(media_count):
+        document.add_picture(io.BytesIO(_png(media_size, rng)))
+
+    stream = io.BytesIO()
+    document.save(stream)
+    return stream.getvalue()
+
+
+def describe(**params: Any) -> Dict[str, Any]:
+    """返回生成参数（补全默认值），写入结果文件便于对比。"""
+    defaults = dict(paragraphs=200, runs_per_paragraph=3, tables=1, table_rows=50, table_cols=5,
+                    merged_cells=True, media_count=0, media_size=0, seed=0)
+    defaults.update(params)
+    return defaults
@@ -0,0 +1,285 @@
+"""
+docx-mcp 基准测试。
+
+在本地生成合成文档，测量文档处理热点路径和 process_document_from_url 的端到端流水线，
+输出吞吐量、延迟分位数和峰值内存，结果保存为JSON以便比较不同版本。
+
+用法（在项目根目录执行）:
+    python benchmarks/run.py --profile medium --output results.json
+    python benchmarks/run.py --profile medium --compare results.json
+"""
+import argparse
+import asyncio
+import io
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Dict, Any, Callable, List, Optional
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, ROOT_DIR)
+
+import docgen  # noqa: E402
+from stubs import DocumentServer, FakeOSS  # noqa: E402
+
+# 预置的文档规模
+PROFILES: Dict[str, Dict[str, Any]] = {
+    "small": dict(paragraphs=50, runs_per_paragraph=3, tables=1, table_rows=10, table_cols=4,
+                  merged_cells=True, media_count=0, media_size=0),
+    "medium": dict(paragraphs=1000, runs_per_paragraph=4, tables=4, table_rows=200, table_cols=6,
+                   merged_cells=True, media_count=2, media_size=1024 * 1024),
+    "large": dict(paragraphs=10000, runs_per_paragraph=4, tables=4, table_rows=2500, table_cols=8,
+                  merged_cells=True, media_count=4, media_size=8 * 1024 * 1024),
+}
+
+
+def percentiles(samples: List[float]) -> Dict[str, float]:
+    """返回以毫秒表示的延迟分位数。"""
+    ordered = sorted(samples)
+
+    def pick(q: float) -> float:
+        index = min(len(ordered) - 1, max(0, int(round(q * (len(ordered) - 1)))))
+        return ordered[index] * 1000
+
+    return {
+        "mean": statistics.fmean(ordered) * 1000,
+        "p50": pick(0.50),
+        "p90": pick(0.90),
+        "p99": pick(0.99),
+        "max": ordered[-1] * 1000,
+    }
+
+
+def peak_memory(func: Callable[[], Any]) -> int:
+    """
+    用 tracemalloc 测量执行一次 func 的Python堆内存峰值（字节）。
+
+    lxml 在C层分配的内存不在统计范围内，进程整体的峰值见 meta.max_rss_bytes。
+    """
+    tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def bench(func: Callable[[int], Any], iterations: int, warmup: int = 1) -> Dict[str, Any]:
+    """
+    执行 func(i) iterations 次并统计延迟；峰值内存另外单独测量一次，避免 tracemalloc 影响计时。
+    """
+    for i in range(warmup):
+        func(i)
+    samples = []
+    started = time.perf_counter()
+    for i in range(iterations):
+        t0 = time.perf_counter()
+        func(i)
+        samples.append(time.perf_counter() - t0)
+    total = time.perf_counter() - started
+    return {
+        "iterations": iterations,
+        "total_seconds": total,
+        "throughput_per_second": iterations / total if total else 0.0,
+        "latency_ms": percentiles(samples),
+        "peak_memory_bytes": peak_memory(lambda: func(0)),
+    }
+
+
+def bench_hot_paths(data: bytes, iterations: int, patch_count: int) -> Dict[str, Dict[str, Any]]:
+    """测量结构提取、打补丁和段落文本替换。"""
+    import docx
+    from core.docx_processor import DocxProcessor
+    from core.models import DocumentPatch
+
+    structure = DocxProcessor.extract_structure_streaming(io.BytesIO(data))
+    paragraph_ids = [e["id"] for e in structure["elements"] if e["type"] == "paragraph"]
+    cell_ids = [
+        cell["id"]
+        for e in structure["elements"] if e["type"] == "table"
+        for row in e["rows"] for cell in row["cells"]
+    ]
+    rng = random.Random(1)
+
+    def patch_set(i: int) -> List[DocumentPatch]:
+        ids = rng.sample(paragraph_ids, min(patch_count, len(paragraph_ids)))
+        ids += rng.sample(cell_ids, min(patch_count // 4, len(cell_ids)))
+        return [DocumentPatch(element_id=element_id, new_content=f"修改后的内容 {i} {element_id}") for element_id in ids]
+
+    patch_sets = [patch_set(i) for i in range(iterations + 1)]
+
+    # _replace_paragraph_text 单独测量：文档只解析一次，每次替换不同的多run段落
+    document = docx.Document(io.BytesIO(data))
+    paragraphs = [p for p in document.paragraphs if len(p.runs) > 1]
+
+    def replace_text(i: int):
+        DocxProcessor._replace_paragraph_text(paragraphs[i % len(paragraphs)], f"替换文本 {i} " * 8)
+
+    return {
+        "extract_structure_with_ids": bench(
+            lambda i: DocxProcessor.extract_structure_with_ids(io.BytesIO(data)), iterations),
+        "extract_structure_streaming": bench(
+            lambda i: DocxProcessor.extract_structure_streaming(io.BytesIO(data)), iterations),
+        "apply_patches": bench(
+            lambda i: DocxProcessor.apply_patches(io.BytesIO(data), io.BytesIO(), patch_sets[i]), iterations),
+        "replace_paragraph_text": bench(replace_text, min(len(paragraphs), iterations * 50)),
+    }
+
+
+def bench_pipeline(main_module, url: str, patches_json: str, requests: int, concurrency: int) -> Dict[str, Any]:
+    """并发调用 process_document_from_url，测量端到端吞吐量和延迟。"""
+
+    async def run(count: int) -> List[float]:
+        semaphore = asyncio.Semaphore(concurrency)
+        samples: List[float] = []
+
+        async def one():
+            async with semaphore:
+                t0 = time.perf_counter()
+                result = await main_module.process_document_from_url(url, patches_json)
+                if "error" in result:
+                    raise RuntimeError(result["error"])
+                samples.append(time.perf_counter() - t0)
+
+        await asyncio.gather(*(one() for _ in range(count)))
+        await main_module.connections.aclose()
+        return samples
+
+    asyncio.run(run(min(concurrency, requests)))  # 预热连接池和线程池
+    started = time.perf_counter()
+    samples = asyncio.run(run(requests))
+    total = time.perf_counter() - started
+    return {
+        "requests": requests,
+        "concurrency": concurrency,
+        "total_seconds": total,
+        "throughput_per_second": requests / total if total else 0.0,
+        "latency_ms": percentiles(samples),
+        "peak_memory_bytes": peak_memory(lambda: asyncio.run(run(concurrency))),
+    }
+
+
+def max_rss_bytes() -> Optional[int]:
+    """进程的最大常驻内存（仅类Unix系统）。"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 上单位为KB，macOS 上为字节
+    return rss if sys.platform == "darwin" else rss * 1024
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any]):
+    """打印当前结果相对基线的吞吐量和中位延迟变化。"""
+    print(f"\n{'benchmark':<32}{'throughput':>14}{'p50':>12}{'peak mem':>12}")
+    for name, result in current["results"].items():
+        base = baseline.get("results", {}).get(name)
+        if not base:
+            continue
+
+        def ratio(a: float, b: float) -> str:
+            return f"{(a / b - 1) * 100:+.1f}%" if b else "n/a"
+
+        print(f"{name:<32}"
+              f"{ratio(result['throughput_per_second'], base['throughput_per_second']):>14}"
+              f"{ratio(result['latency_ms']['p50'], base['latency_ms']['p50']):>12}"
+              f"{ratio(result['peak_memory_bytes'], base['peak_memory_bytes']):>12}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="docx-mcp benchmark suite")
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="small")
+    parser.add_argument("--iterations", type=int, default=5, help="每个热点基准的迭代次数")
+    parser.add_argument("--patches", type=int, default=20, help="每次 apply_patches 修改的段落数")
+    parser.add_argument("--requests", type=int, default=20, help="端到端基准的请求总数")
+    parser.add_argument("--concurrency", type=int, default=4, help="端到端基准的并发请求数")
+    parser.add_argument("--skip-pipeline", action="store_true", help="跳过端到端基准")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="结果JSON的保存路径，缺省写入 benchmarks/results/")
+    parser.add_argument("--compare", help="与之前保存的结果JSON比较")
+    args = parser.parse_args()
+
+    params = docgen.describe(**PROFILES[args.profile], seed=args.seed)
+    t0 = time.perf_counter()
+    data = docgen.generate(**params)
+    print(f"generated {args.profile} document: {len(data)} bytes in {time.perf_counter() - t0:.2f}s", file=sys.stderr)
+
+    results = bench_hot_paths(data, args.iterations, args.patches)
+
+    if not args.skip_pipeline:
+        server, oss = DocumentServer(), FakeOSS()
+        # main 在导入时读取配置，必须先把OSS指向本地模拟端点
+        os.environ.update({
+            "OSS_ENDPOINT": oss.endpoint,
+            "OSS_BUCKET_NAME": "benchmark",
+            "OSS_ACCESS_KEY": "benchmark",
+            "OSS_SECRET_KEY": "benchmark",
+            "OSS_DOMAIN": f"{oss.endpoint}/benchmark/",
+            "DOCX_MCP_MULTIPART_CHECKPOINT_DIR": tempfile.mkdtemp(prefix="docx-bench-"),
+        })
+        import main as main_module
+        url = server.publish("benchmark.docx", data)
+        patches_json = json.dumps([
+            {"element_id": f"p_{i}", "new_content": f"修改后的内容 {i}"} for i in range(1, args.patches + 1)
+        ])
+        results["process_document_from_url"] = bench_pipeline(
+            main_module, url, patches_json, args.requests, args.concurrency)
+        server.close()
+        oss.close()
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "git_revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "profile": args.profile,
+            "document": {**params, "size_bytes": len(data)},
+            "iterations": args.iterations,
+            "max_rss_bytes": max_rss_bytes(),
+        },
+        "results": results,
+    }
+
+    output = args.output
+    if output is None:
+        results_dir = os.path.join(BENCH_DIR, "results")
+        os.makedirs(results_dir, exist_ok=True)
+        output = os.path.join(results_dir, f"{args.profile}-{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+    for name, result in results.items():
+        latency = result["latency_ms"]
+        print(f"{name:<32}{result['throughput_per_second']:>10.2f}/s  "
+              f"p50 {latency['p50']:.1f}ms  p99 {latency['p99']:.1f}ms  peak {result['peak_memory_bytes'] / 1e6:.1f}MB")
+    print(f"results written to {output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            compare(report, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
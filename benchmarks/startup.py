@@ -0,0 +1,217 @@
+"""
+docx-mcp 冷启动基准测试。
+
+uvx/stdio 方式下每个会话都会启动一个新进程，启动耗时直接计入智能体的每次调用。本脚本测量：
+- 从启动服务进程到收到第一个 tools/list 响应的时间（包括解释器启动、模块导入和 initialize 握手）；
+- python -X importtime 统计的各模块导入耗时；
+- 启动后是否已经导入了应当推迟加载的模块（oss2、httpx、requests）。
+
+用法（在项目根目录执行）:
+    python benchmarks/startup.py --runs 10 --output startup.json
+    python benchmarks/startup.py --compare startup.json --tolerance 20
+    python benchmarks/startup.py --max-startup-ms 2500
+
+超过 --max-startup-ms、相对基线变慢超过 --tolerance 百分比，或推迟加载的模块在启动时被导入，
+都会以非零状态码退出，可以直接用在CI中。
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime
+from typing import Dict, Any, List
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(BENCH_DIR)
+
+from run import percentiles, git_revision  # noqa: E402
+
+# 只有上传、下载等工具才需要的模块，启动时不应导入
+DEFERRED_MODULES = ("oss2", "httpx", "requests")
+# 单独列出的模块（即使不在耗时最多的前N名中）
+TRACKED_MODULES = ("main", "fastmcp", "mcp", "pydantic", "docx", "lxml.etree", "core.docx_processor") + DEFERRED_MODULES
+
+PROTOCOL_VERSION = "2025-06-18"
+# 启动服务的代码：与 uvx 入口一样调用 main.main()
+SERVER_CODE = "import main; main.main()"
+PROBE_CODE = "import sys, json, main; print(json.dumps(sorted(m for m in {names!r} if m in sys.modules)))"
+
+
+def _send(proc: subprocess.Popen, message: Dict[str, Any]):
+    proc.stdin.write((json.dumps(message) + "\n").encode("utf-8"))
+    proc.stdin.flush()
+
+
+def _receive(proc: subprocess.Popen, request_id: int) -> Dict[str, Any]:
+    """读取stdout直到收到指定id的响应（跳过服务端发来的通知）。"""
+    while True:
+        line = proc.stdout.readline()
+        if not line:
+            raise RuntimeError(f"server exited before responding (code {proc.poll()})")
+        message = json.loads(line)
+        if message.get("id") == request_id:
+            if "error" in message:
+                raise RuntimeError(f"server returned an error: {message['error']}")
+            return message
+
+
+def time_to_list_tools(python: str, env: Dict[str, str]) -> Dict[str, Any]:
+    """启动一个服务进程，完成 initialize 握手并请求 tools/list，返回各阶段耗时（秒）。"""
+    started = time.perf_counter()
+    proc = subprocess.Popen(
+        [python, "-c", SERVER_CODE], cwd=ROOT_DIR, env=env,
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+    )
+    try:
+        _send(proc, {
+            "jsonrpc": "2.0", "id": 1, "method": "initialize",
+            "params": {
+                "protocolVersion": PROTOCOL_VERSION,
+                "capabilities": {},
+                "clientInfo": {"name": "docx-mcp-startup-bench", "version": "1.0"},
+            },
+        })
+        _receive(proc, 1)
+        initialized = time.perf_counter()
+        _send(proc, {"jsonrpc": "2.0", "method": "notifications/initialized"})
+        _send(proc, {"jsonrpc": "2.0", "id": 2, "method": "tools/list", "params": {}})
+        tools = _receive(proc, 2)["result"]["tools"]
+        listed = time.perf_counter()
+    finally:
+        proc.stdin.close()
+        try:
+            proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+            proc.wait()
+    return {"initialize": initialized - started, "list_tools": listed - started, "tool_count": len(tools)}
+
+
+def import_times(python: str, env: Dict[str, str]) -> Dict[str, Dict[str, float]]:
+    """
+    用 python -X importtime 导入 main，返回 {模块名: {"self_ms", "cumulative_ms"}}。
+
+    同一模块只取第一次（真正执行导入的那次）记录。
+    """
+    proc = subprocess.run(
+        [python, "-X", "importtime", "-c", "import main"], cwd=ROOT_DIR, env=env,
+        capture_output=True, text=True, check=True,
+    )
+    modules: Dict[str, Dict[str, float]] = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        fields = line[len("import time:"):].split("|")
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue  # 表头
+        name = fields[2].strip()
+        if name not in modules:
+            modules[name] = {"self_ms": int(fields[0]) / 1000, "cumulative_ms": int(fields[1]) / 1000}
+    return modules
+
+
+def eagerly_imported(python: str, env: Dict[str, str]) -> List[str]:
+    """返回导入 main 之后已经加载的推迟加载模块。"""
+    proc = subprocess.run(
+        [python, "-c", PROBE_CODE.format(names=set(DEFERRED_MODULES))], cwd=ROOT_DIR, env=env,
+        capture_output=True, text=True, check=True,
+    )
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> bool:
+    """打印相对基线的变化，p50 变慢超过 tolerance 百分比时返回 False。"""
+    ok = True
+    print(f"\n{'metric':<28}{'baseline':>12}{'current':>12}{'change':>10}")
+    for name in ("list_tools", "initialize"):
+        base = baseline.get("results", {}).get(name)
+        result = current["results"].get(name)
+        if not base or not result:
+            continue
+        before, after = base["latency_ms"]["p50"], result["latency_ms"]["p50"]
+        change = (after / before - 1) * 100 if before else 0.0
+        flag = "  REGRESSION" if change > tolerance else ""
+        print(f"{name + ' p50 (ms)':<28}{before:>12.1f}{after:>12.1f}{change:>+9.1f}%{flag}")
+        ok = ok and change <= tolerance
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="docx-mcp cold start benchmark")
+    parser.add_argument("--runs", type=int, default=5, help="启动服务进程的次数")
+    parser.add_argument("--top", type=int, default=15, help="输出导入耗时最多的前N个顶层模块")
+    parser.add_argument("--python", default=sys.executable, help="启动服务使用的解释器")
+    parser.add_argument("--max-startup-ms", type=float, help="tools/list 中位耗时的上限（毫秒）")
+    parser.add_argument("--output", help="结果JSON的保存路径，缺省写入 benchmarks/results/")
+    parser.add_argument("--compare", help="与之前保存的结果JSON比较")
+    parser.add_argument("--tolerance", type=float, default=20.0, help="与基线比较时允许变慢的百分比")
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    env.pop("DOCX_MCP_METRICS_PORT", None)
+    env.pop("DOCX_MCP_WORKER_PROCESSES", None)
+
+    # 第一次启动会写入字节码缓存，不计入结果
+    time_to_list_tools(args.python, env)
+    runs = [time_to_list_tools(args.python, env) for _ in range(args.runs)]
+    imports = import_times(args.python, env)
+    eager = eagerly_imported(args.python, env)
+
+    top_level = {name: times for name, times in imports.items() if "." not in name or name.startswith("core.")}
+    slowest = sorted(top_level.items(), key=lambda item: -item[1]["cumulative_ms"])[:args.top]
+    results = {
+        "list_tools": {"latency_ms": percentiles([r["list_tools"] for r in runs])},
+        "initialize": {"latency_ms": percentiles([r["initialize"] for r in runs])},
+    }
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "git_revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "runs": args.runs,
+            "tool_count": runs[-1]["tool_count"],
+        },
+        "results": results,
+        "imports": {
+            "slowest": dict(slowest),
+            "tracked": {name: imports.get(name) for name in TRACKED_MODULES},
+        },
+        "eagerly_imported": eager,
+    }
+
+    output = args.output
+    if output is None:
+        results_dir = os.path.join(BENCH_DIR, "results")
+        os.makedirs(results_dir, exist_ok=True)
+        output = os.path.join(results_dir, f"startup-{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+    latency = results["list_tools"]["latency_ms"]
+    print(f"time to first tools/list ({runs[-1]['tool_count']} tools): "
+          f"p50 {latency['p50']:.1f}ms  min {min(r['list_tools'] for r in runs) * 1000:.1f}ms  max {latency['max']:.1f}ms")
+    print(f"\n{'module':<36}{'cumulative':>12}{'self':>10}")
+    for name, times in slowest:
+        print(f"{name:<36}{times['cumulative_ms']:>10.1f}ms{times['self_ms']:>8.1f}ms")
+    print(f"\nresults written to {output}")
+
+    ok = True
+    if eager:
+        print(f"deferred modules imported at startup: {', '.join(eager)}")
+        ok = False
+    if args.max_startup_ms is not None and latency["p50"] > args.max_startup_ms:
+        print(f"time to tools/list p50 {latency['p50']:.1f}ms exceeds the limit of {args.max_startup_ms:.1f}ms")
+        ok = False
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            ok = compare(report, json.load(f), args.tolerance) and ok
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
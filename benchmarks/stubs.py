@@ -0,0 +1,208 @@
+"""
+基准测试用的本地服务：提供文档下载的HTTP服务器和模拟阿里云OSS的上传端点。
+
+两者都运行在本机的后台线程中，不依赖任何外部网络。
+"""
+import hashlib
+import http.server
+import re
+import threading
+import uuid
+from typing import Dict, List, Tuple
+from urllib.parse import urlparse, parse_qs
+
+
+class _DocumentHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    documents: Dict[str, bytes] = {}
+    # 依次记录每个请求的 (路径, 状态码)
+    requests: List[Tuple[str, int]] = []
+
+    def log_message(self, *args):
+        pass
+
+    def send_response(self, code, message=None):
+        self.requests.append((self.path, code))
+        super().send_response(code, message)
+
+    def do_GET(self):
+        data = self.documents.get(self.path)
+        if data is None:
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        etag = '"%s"' % hashlib.md5(data).hexdigest()
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("ETag", etag)
+        self.send_header("Content-Type", "application/vnd.openxmlformats-officedocument.wordprocessingml.document")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+class DocumentServer:
+    """在本地端口上提供文档下载，支持 ETag 条件请求和 keep-alive。"""
+
+    def __init__(self):
+        handler = type("DocumentHandler", (_DocumentHandler,), {"documents": {}, "requests": []})
+        self._handler = handler
+        self._server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+
+    @property
+    def base_url(self) -> str:
+        return "http://127.0.0.1:%d" % self._server.server_address[1]
+
+    def statuses(self, name: str) -> List[int]:
+        """返回对某份文档的各次请求的状态码。"""
+        return [code for path, code in list(self._handler.requests) if path == "/" + name]
+
+    def publish(self, name: str, data: bytes) -> str:
+        """发布一份文档，返回其下载URL。"""
+        self._handler.documents["/" + name] = data
+        return f"{self.base_url}/{name}"
+
+    def close(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+class _OssHandler(http.server.BaseHTTPRequestHandler):
+    """实现 oss2 上传用到的 PutObject 和分片上传接口（InitiateMultipartUpload/UploadPart/ListParts/Complete）。"""
+
+    protocol_version = "HTTP/1.1"
+    state = None
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, code: int = 200, body: bytes = b"", headers: Dict[str, str] = None):
+        self.send_response(code)
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.send_header("x-oss-request-id", uuid.uuid4().hex)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _parse(self):
+        url = urlparse(self.path)
+        query = parse_qs(url.query, keep_blank_values=True)
+        bucket, _, key = url.path.lstrip("/").partition("/")
+        return bucket, key, query
+
+    def _body(self) -> bytes:
+        return self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+    def do_PUT(self):
+        bucket, key, query = self._parse()
+        data = self._body()
+        etag = '"%s"' % hashlib.md5(data).hexdigest().upper()
+        with self.state["lock"]:
+            if "uploadId" in query:
+                part_number = int(query["partNumber"][0])
+                self.state["part_requests"].append(part_number)
+                if part_number in self.state["fail_parts"]:
+                    xml = b'<?xml version="1.0" encoding="UTF-8"?><Error><Code>InternalError</Code><Message>injected</Message></Error>'
+                    return self._reply(500, xml, {"Content-Type": "application/xml"})
+                self.state["uploads"][query["uploadId"][0]]["parts"][part_number] = (etag, data)
+            else:
+                self._store_object(key, data)
+        self._reply(200, b"", {"ETag": etag})
+
+    def _store_object(self, key: str, data: bytes):
+        self.state["objects"][key] = len(data)
+        self.state["bytes"] += len(data)
+        if self.state["contents"] is not None:
+            self.state["contents"][key] = data
+
+    def do_POST(self):
+        bucket, key, query = self._parse()
+        body = self._body()
+        with self.state["lock"]:
+            if "uploads" in query:
+                upload_id = uuid.uuid4().hex
+                self.state["uploads"][upload_id] = {"key": key, "parts": {}}
+                xml = (f'<?xml version="1.0" encoding="UTF-8"?><InitiateMultipartUploadResult><Bucket>{bucket}</Bucket>'
+                       f'<Key>{key}</Key><UploadId>{upload_id}</UploadId></InitiateMultipartUploadResult>')
+                return self._reply(200, xml.encode(), {"Content-Type": "application/xml"})
+            upload = self.state["uploads"].pop(query["uploadId"][0])
+            numbers = [int(n) for n in re.findall(rb"<PartNumber>(\d+)</PartNumber>", body)]
+            self._store_object(key, b"".join(upload["parts"][n][1] for n in numbers))
+        xml = (f'<?xml version="1.0" encoding="UTF-8"?><CompleteMultipartUploadResult><Location>{key}</Location>'
+               f'<Bucket>{bucket}</Bucket><Key>{key}</Key><ETag>"multipart"</ETag></CompleteMultipartUploadResult>')
+        self._reply(200, xml.encode(), {"Content-Type": "application/xml", "ETag": '"multipart"'})
+
+    def do_GET(self):
+        bucket, key, query = self._parse()
+        with self.state["lock"]:
+            upload = self.state["uploads"].get(query.get("uploadId", [""])[0])
+            if upload is None:
+                xml = b'<?xml version="1.0" encoding="UTF-8"?><Error><Code>NoSuchUpload</Code><Message>not found</Message></Error>'
+                return self._reply(404, xml, {"Content-Type": "application/xml"})
+            parts = "".join(
+                f"<Part><PartNumber>{n}</PartNumber><LastModified>2024-01-01T00:00:00.000Z</LastModified>"
+                f"<ETag>{etag}</ETag><Size>{len(data)}</Size></Part>"
+                for n, (etag, data) in sorted(upload["parts"].items())
+            )
+        xml = (f'<?xml version="1.0" encoding="UTF-8"?><ListPartsResult><Bucket>{bucket}</Bucket><Key>{key}</Key>'
+               f'<UploadId>{query["uploadId"][0]}</UploadId><PartNumberMarker>0</PartNumberMarker>'
+               f'<NextPartNumberMarker>0</NextPartNumberMarker><MaxParts>1000</MaxParts>'
+               f'<IsTruncated>false</IsTruncated>{parts}</ListPartsResult>')
+        self._reply(200, xml.encode(), {"Content-Type": "application/xml"})
+
+
+class FakeOSS:
+    """
+    本地的OSS模拟端点。
+
+    端点地址是IP，oss2 会使用 path-style 请求（/bucket/key），无需配置域名解析。
+    默认只记录对象大小，keep_content=True 时保存对象内容（测试中用来核对上传结果）。
+    part_requests 按顺序记录收到的 UploadPart 分片号；fail_parts 中的分片号返回500，用来模拟中断的上传。
+    """
+
+    def __init__(self, keep_content: bool = False):
+        state = {"lock": threading.Lock(), "objects": {}, "uploads": {}, "bytes": 0,
+                 "contents": {} if keep_content else None, "part_requests": [], "fail_parts": set()}
+        handler = type("OssHandler", (_OssHandler,), {"state": state})
+        self.state = state
+        self._server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+
+    @property
+    def endpoint(self) -> str:
+        return "http://127.0.0.1:%d" % self._server.server_address[1]
+
+    @property
+    def uploaded_objects(self) -> int:
+        with self.state["lock"]:
+            return len(self.state["objects"])
+
+    def content(self, key: str) -> bytes:
+        """返回已上传对象的内容（需要 keep_content=True）。"""
+        with self.state["lock"]:
+            return self.state["contents"][key]
+
+    @property
+    def part_requests(self):
+        with self.state["lock"]:
+            return list(self.state["part_requests"])
+
+    def fail_parts(self, *part_numbers: int):
+        """之后对这些分片号的 UploadPart 请求都返回500；不传参数时恢复正常。"""
+        with self.state["lock"]:
+            self.state["fail_parts"] = set(part_numbers)
+            self.state["part_requests"].clear()
+
+    def close(self):
+        self._server.shutdown()
+        self._server.server_close()
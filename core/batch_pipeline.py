@@ -0,0 +1,132 @@
+import asyncio
+from typing import Dict, Any, Awaitable, Callable, List, Optional
+
+# 各阶段之间传递的结束标记
+_DONE = object()
+
+
+class BatchPipeline:
+    """
+    下载 -> 打补丁 -> 上传 三阶段流水线。
+
+    每个阶段由固定数量的工作协程从上一阶段的队列中取任务，阶段之间的队列有长度上限，
+    下游处理不过来时上游自动等待，同时在途的文档数量因此是有界的。
+    不同文档的下载、处理、上传相互重叠，网络和CPU可以同时保持忙碌。
+    任一阶段失败只影响对应的任务，结果以 {"error": ...} 的形式返回。
+    """
+
+    def __init__(self,
+                 download: Callable[[Dict[str, Any]], Awaitable[Any]],
+                 process: Callable[[Dict[str, Any], Any], Awaitable[Dict[str, Any]]],
+                 upload: Callable[[Dict[str, Any], Any], Awaitable[Dict[str, Any]]],
+                 download_concurrency: int = 8, process_concurrency: int = 4, upload_concurrency: int = 8,
+                 release: Optional[Callable[[Any], None]] = None):
+        """
+        :param download: async download(job) -> 下载结果，失败时抛出异常。
+        :param process: async process(job, 下载结果) -> {"success": True, ...} 或 {"error": ...}。
+        :param upload: async upload(job, 处理结果) -> 上传结果字典（失败时包含 "error"）。
+        :param release: 下载结果处理完毕后的清理函数（例如关闭临时文件）。
+        """
+        self.download = download
+        self.process = process
+        self.upload = upload
+        self.release = release
+        self.download_concurrency = max(1, int(download_concurrency))
+        self.process_concurrency = max(1, int(process_concurrency))
+        self.upload_concurrency = max(1, int(upload_concurrency))
+
+    async def run(self, jobs: List[Dict[str, Any]],
+                  on_result: Optional[Callable[[Dict[str, Any]], Awaitable[None]]] = None) -> List[Dict[str, Any]]:
+        """
+        执行全部任务。
+
+        :param jobs: 任务列表，每个任务原样传给各阶段的函数。
+        :param on_result: 每个任务完成（成功或失败）时调用，用于实时上报进度。
+        :return: 按完成顺序排列的结果列表，每个结果带有任务在 jobs 中的下标 "index"。
+        """
+        pending: asyncio.Queue = asyncio.Queue()
+        downloaded: asyncio.Queue = asyncio.Queue(maxsize=self.process_concurrency)
+        processed: asyncio.Queue = asyncio.Queue(maxsize=self.upload_concurrency)
+        results: List[Dict[str, Any]] = []
+
+        for index, job in enumerate(jobs):
+            pending.put_nowait((index, job))
+
+        async def finish(index: int, result: Dict[str, Any]):
+            result = {"index": index, **result}
+            results.append(result)
+            if on_result is not None:
+                try:
+                    await on_result(result)
+                except Exception:
+                    # 进度上报失败不影响批处理本身
+                    pass
+
+        async def download_worker():
+            while True:
+                try:
+                    index, job = pending.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                try:
+                    data = await self.download(job)
+                except Exception as e:
+                    await finish(index, {"error": str(e)})
+                    continue
+                await downloaded.put((index, job, data))
+
+        async def process_worker():
+            while True:
+                item = await downloaded.get()
+                if item is _DONE:
+                    return
+                index, job, data = item
+                try:
+                    result = await self.process(job, data)
+                except Exception as e:
+                    result = {"error": str(e)}
+                finally:
+                    if self.release is not None:
+                        self.release(data)
+                if "error" in result:
+                    await finish(index, result)
+                    continue
+                await processed.put((index, job, result))
+
+        async def upload_worker():
+            while True:
+                item = await processed.get()
+                if item is _DONE:
+                    return
+                index, job, data = item
+                try:
+                    result = await self.upload(job, data)
+                except Exception as e:
+                    result = {"error": str(e)}
+                await finish(index, result)
+
+        async def stage(workers: List[asyncio.Task], next_queue: Optional[asyncio.Queue], next_count: int):
+            # 本阶段全部结束后通知下一阶段的每个工作协程退出
+            await asyncio.gather(*workers)
+            if next_queue is not None:
+                for _ in range(next_count):
+                    await next_queue.put(_DONE)
+
+        downloaders = [asyncio.create_task(download_worker()) for _ in range(self.download_concurrency)]
+        processors = [asyncio.create_task(process_worker()) for _ in range(self.process_concurrency)]
+        uploaders = [asyncio.create_task(upload_worker()) for _ in range(self.upload_concurrency)]
+        try:
+            await asyncio.gather(
+                stage(downloaders, downloaded, self.process_concurrency),
+                stage(processors, processed, self.upload_concurrency),
+                stage(uploaders, None, 0),
+            )
+        finally:
+            for task in downloaders + processors + uploaders:
+                task.cancel()
+            # 被取消时清理已下载但尚未处理的文档
+            while not downloaded.empty():
+                item = downloaded.get_nowait()
+                if item is not _DONE and self.release is not None:
+                    self.release(item[2])
+        return results
@@ -0,0 +1,151 @@
+import base64
+import gzip
+import json
+from typing import Dict, Any, List, Optional
+
+COMPACT_FORMAT = "compact-v1"
+PACK_ENCODING = "gzip+base64"
+
+
+class CompactFormat:
+    """
+    文档结构的紧凑列式表示。
+
+    默认格式中每个段落、单元格都重复 "id"、"type"、"text"、"style" 等键，ID也可以由位置推出。
+    紧凑格式按列存放：
+    - "start"：第一个元素的下标，元素连续时ID由下标推出（p_N / tbl_N）；不连续时改为 "index" 列表；
+    - "types"：每个元素一个字符，"p" 为段落，"t" 为表格；
+    - "text" / "style" / "hash"：与元素一一对应的列，表格的 text、style 为 null，style 为 "styles" 表中的下标；
+    - "anchors"：{元素位置: 锚点}，只包含带锚点的段落；
+    - "tables"：按出现顺序每个表格一项，"cells" 为二维文本数组（第 r 行第 c 列即 tbl_N_rRcC），
+      被合并覆盖的位置为 null，"spans" 为合并单元格的 [行, 列, row_span, col_span]。
+    """
+
+    @staticmethod
+    def encode(elements: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """把元素列表编码为紧凑格式。"""
+        styles: Dict[str, int] = {}
+        indexes: List[int] = []
+        types: List[str] = []
+        texts: List[Optional[str]] = []
+        style_refs: List[Optional[int]] = []
+        hashes: List[Optional[str]] = []
+        anchors: Dict[str, str] = {}
+        tables: List[Dict[str, Any]] = []
+
+        for position, element in enumerate(elements):
+            hashes.append(element.get("hash"))
+            if element["type"] == "table":
+                indexes.append(int(element["id"][4:]))
+                types.append("t")
+                texts.append(None)
+                style_refs.append(None)
+                tables.append(CompactFormat._encode_table(element))
+                continue
+            indexes.append(int(element["id"][2:]))
+            types.append("p")
+            texts.append(element.get("text"))
+            style = element.get("style")
+            style_refs.append(None if style is None else styles.setdefault(style, len(styles)))
+            if element.get("anchor"):
+                anchors[str(position)] = element["anchor"]
+
+        compact: Dict[str, Any] = {"format": COMPACT_FORMAT}
+        first = indexes[0] if indexes else 0
+        if indexes == list(range(first, first + len(indexes))):
+            compact["start"] = first
+        else:
+            compact["index"] = indexes
+        compact.update({
+            "types": "".join(types),
+            "styles": list(styles),
+            "style": style_refs,
+            "text": texts,
+            "hash": hashes,
+        })
+        if anchors:
+            compact["anchors"] = anchors
+        if tables:
+            compact["tables"] = tables
+        return compact
+
+    @staticmethod
+    def _encode_table(table: Dict[str, Any]) -> Dict[str, Any]:
+        grid: List[List[Optional[str]]] = []
+        spans: List[List[int]] = []
+        for r, row in enumerate(table["rows"]):
+            cells: List[Optional[str]] = []
+            for cell in row["cells"]:
+                # 单元格ID形如 tbl_N_rRcC，列号在最后一个 "c" 之后
+                cell_id = cell["id"]
+                c = int(cell_id[cell_id.rindex("c") + 1:])
+                if c == len(cells):
+                    cells.append(cell.get("text", ""))
+                else:
+                    if c > len(cells):
+                        cells.extend([None] * (c + 1 - len(cells)))
+                    cells[c] = cell.get("text", "")
+                if len(cell) > 2:
+                    spans.append([r, c, cell.get("row_span", 1), cell.get("col_span", 1)])
+            grid.append(cells)
+        encoded: Dict[str, Any] = {"cells": grid}
+        if spans:
+            encoded["spans"] = spans
+        return encoded
+
+    @staticmethod
+    def decode(compact: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """把紧凑格式还原为默认格式的元素列表。"""
+        types = compact["types"]
+        indexes = compact.get("index") or range(compact.get("start", 0), compact.get("start", 0) + len(types))
+        styles = compact.get("styles", [])
+        anchors = compact.get("anchors", {})
+        tables = iter(compact.get("tables", []))
+        elements = []
+        for position, (kind, index) in enumerate(zip(types, indexes)):
+            if kind == "t":
+                element = CompactFormat._decode_table(f"tbl_{index}", next(tables))
+            else:
+                style = compact["style"][position]
+                element = {
+                    "id": f"p_{index}",
+                    "type": "paragraph",
+                    "text": compact["text"][position],
+                    "style": None if style is None else styles[style],
+                }
+                if str(position) in anchors:
+                    element["anchor"] = anchors[str(position)]
+            if compact["hash"][position] is not None:
+                element["hash"] = compact["hash"][position]
+            elements.append(element)
+        return elements
+
+    @staticmethod
+    def _decode_table(table_id: str, table: Dict[str, Any]) -> Dict[str, Any]:
+        spans = {(r, c): (row_span, col_span) for r, c, row_span, col_span in table.get("spans", [])}
+        rows = []
+        for r, grid_row in enumerate(table["cells"]):
+            cells = []
+            for c, text in enumerate(grid_row):
+                if text is None:
+                    continue
+                cell = {"id": f"{table_id}_r{r}c{c}", "text": text}
+                row_span, col_span = spans.get((r, c), (1, 1))
+                if col_span > 1:
+                    cell["col_span"] = col_span
+                if row_span > 1:
+                    cell["row_span"] = row_span
+                cells.append(cell)
+            rows.append({"cells": cells})
+        return {"id": table_id, "type": "table", "rows": rows}
+
+    @staticmethod
+    def pack(payload: Any) -> str:
+        """把结果序列化为JSON后用gzip压缩并Base64编码。"""
+        data = json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        return base64.b64encode(gzip.compress(data, compresslevel=6)).decode("ascii")
+
+    @staticmethod
+    def unpack(packed: str) -> Any:
+        """pack 的逆操作。"""
+        return json.loads(gzip.decompress(base64.b64decode(packed)).decode("utf-8"))
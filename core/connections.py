@@ -0,0 +1,273 @@
+import asyncio
+import hashlib
+import socket
+import tempfile
+import threading
+import weakref
+from concurrent.futures import Executor
+from typing import Dict, Any, List, Optional
+
+from .lazy_import import LazyModule
+
+# 下载和OSS上传的依赖导入较慢，推迟到第一次使用时
+httpx = LazyModule("httpx")
+oss2 = LazyModule("oss2")
+
+
+class DownloadTooLargeError(Exception):
+    """下载内容超过允许的最大大小。"""
+
+
+class OssConfigError(Exception):
+    """OSS配置不完整（访问密钥等环境变量未设置）。"""
+
+
+# 临时文件转存到磁盘后，累积到该字节数再交给线程写入
+_DISK_WRITE_BATCH = 1024 * 1024
+
+# 上传必需的OSS配置项及对应的环境变量
+_REQUIRED_OSS_SETTINGS = (
+    ("access_key", "OSS_ACCESS_KEY"),
+    ("secret_key", "OSS_SECRET_KEY"),
+    ("bucket_name", "OSS_BUCKET_NAME"),
+    ("domain", "OSS_DOMAIN"),
+)
+
+
+class DownloadedDocument:
+    """
+    下载到临时文件中的文档。
+
+    内容小于 spool_threshold 时保存在内存中，超过后自动转存到磁盘。
+    下载过程中同时计算了内容的 SHA-256，调用方无需再次读取整个文件。
+    使用完毕后需要调用 close() 释放临时文件。
+    """
+
+    def __init__(self, status_code: int, headers: "httpx.Headers",
+                 file: Optional[tempfile.SpooledTemporaryFile] = None, size: int = 0, sha256: Optional[str] = None):
+        self.status_code = status_code
+        self.headers = headers
+        self.file = file
+        self.size = size
+        self.sha256 = sha256
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+class ConnectionManager:
+    """
+    进程内共享的网络连接层。
+
+    - 下载使用一个长期存在的 httpx.AsyncClient，连接池支持 keep-alive，
+      同一主机的后续请求复用已建立的 TCP/TLS 连接；
+    - OSS 上传使用一个长期存在的 oss2.Bucket，自带独立的连接池；
+    - 统计新建连接数与请求数，用于确认连接确实被复用。
+    所有方法都是线程安全的。
+    """
+
+    def __init__(self, oss_config: Dict[str, str], http_pool_size: int = 32,
+                 http_keepalive_expiry: float = 30.0, oss_pool_size: int = 16,
+                 download_timeout: float = 30.0):
+        self.oss_config = oss_config
+        self.http_pool_size = http_pool_size
+        self.http_keepalive_expiry = http_keepalive_expiry
+        self.oss_pool_size = oss_pool_size
+        self.download_timeout = download_timeout
+        self._lock = threading.Lock()
+        self._http_client: Optional["httpx.AsyncClient"] = None
+        self._http_loop: Optional[asyncio.AbstractEventLoop] = None
+        # 共享 AsyncClient 建立的网络流，事件循环已经结束、无法 aclose 时用来断开连接
+        self._http_streams = weakref.WeakSet()
+        self._bucket: Optional["oss2.Bucket"] = None
+        self.http_requests = 0
+        self.http_connections_opened = 0
+
+    def http_client(self) -> "httpx.AsyncClient":
+        """
+        返回当前事件循环上的共享 AsyncClient。
+
+        AsyncClient 绑定在创建它的事件循环上，事件循环变化时（例如测试中多次 asyncio.run）重新创建，
+        旧的客户端随即关闭。
+        """
+        loop = asyncio.get_running_loop()
+        stale = None
+        with self._lock:
+            if self._http_client is None or self._http_loop is not loop:
+                stale = self._detach_http_client()
+                limits = httpx.Limits(
+                    max_connections=self.http_pool_size,
+                    max_keepalive_connections=self.http_pool_size,
+                    keepalive_expiry=self.http_keepalive_expiry,
+                )
+                self._http_client = httpx.AsyncClient(
+                    timeout=self.download_timeout, limits=limits, follow_redirects=True
+                )
+                self._http_loop = loop
+            client = self._http_client
+        if stale is not None:
+            self._close_detached(*stale)
+        return client
+
+    def _detach_http_client(self):
+        """取下当前的客户端，返回 (客户端, 事件循环, 网络流列表)，没有客户端时返回 None（调用方持有 self._lock）。"""
+        if self._http_client is None:
+            return None
+        detached = (self._http_client, self._http_loop, list(self._http_streams))
+        self._http_client, self._http_loop = None, None
+        self._http_streams = weakref.WeakSet()
+        return detached
+
+    @staticmethod
+    def _close_detached(client: "httpx.AsyncClient", loop: Optional[asyncio.AbstractEventLoop], streams):
+        """
+        关闭不再使用的 AsyncClient。
+
+        客户端只能在创建它的事件循环上关闭：该循环仍在（其他线程中）运行时把 aclose 提交给它；
+        循环已经结束时无法再执行 aclose，直接断开它的TCP连接（shutdown），套接字随传输对象回收时释放。
+        """
+        if loop is not None and loop.is_running() and not loop.is_closed():
+            asyncio.run_coroutine_threadsafe(client.aclose(), loop)
+            return
+        for stream in streams:
+            sock = stream.get_extra_info("socket")
+            if sock is None:
+                continue
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass  # 连接已经断开
+
+    async def _trace(self, event_name: str, info: Dict[str, Any]):
+        """httpcore 跟踪回调：每建立一个新的TCP连接计数一次，并记录其网络流。"""
+        if event_name == "connection.connect_tcp.complete":
+            with self._lock:
+                self.http_connections_opened += 1
+                self._http_streams.add(info["return_value"])
+
+    async def download(self, url: str, headers: Optional[Dict[str, str]] = None,
+                       max_size: int = 0, spool_threshold: int = 16 * 1024 * 1024,
+                       executor: Optional[Executor] = None) -> DownloadedDocument:
+        """
+        流式下载文档到 SpooledTemporaryFile，并限制最大大小。
+
+        响应头中的 Content-Length 超过 max_size 时不读取响应体直接中止；
+        没有 Content-Length 或其不准确时，在累计字节数超过 max_size 时中止。
+        304（配合 If-None-Match 的条件请求）直接返回，不包含文件。
+        前 spool_threshold 字节写入内存；之后的数据（包括转存到磁盘本身）按批在 executor 中写入，不阻塞事件循环。
+
+        :param url: 文档URL。
+        :param headers: 额外的请求头。
+        :param max_size: 允许的最大字节数，0 表示不限制。
+        :param spool_threshold: 超过该字节数后临时文件转存到磁盘。
+        :param executor: 执行磁盘写入的线程池，None 表示事件循环的默认线程池。
+        :return: DownloadedDocument，非 2xx/304 状态码时抛出 httpx.HTTPStatusError。
+        """
+        async with self.stream("GET", url, headers) as response:
+            if response.status_code == 304:
+                return DownloadedDocument(response.status_code, response.headers)
+            response.raise_for_status()
+
+            content_length = response.headers.get("content-length")
+            if max_size and content_length and content_length.isdigit() and int(content_length) > max_size:
+                raise DownloadTooLargeError(
+                    f"document size {content_length} bytes exceeds the limit of {max_size} bytes"
+                )
+
+            loop = asyncio.get_running_loop()
+            file = tempfile.SpooledTemporaryFile(max_size=spool_threshold)
+            digest = hashlib.sha256()
+            size = 0
+            pending: List[bytes] = []
+            pending_size = 0
+            try:
+                async for chunk in response.aiter_bytes():
+                    size += len(chunk)
+                    if max_size and size > max_size:
+                        raise DownloadTooLargeError(f"document exceeds the limit of {max_size} bytes")
+                    digest.update(chunk)
+                    if size <= spool_threshold:
+                        file.write(chunk)
+                        continue
+                    pending.append(chunk)
+                    pending_size += len(chunk)
+                    if pending_size >= _DISK_WRITE_BATCH:
+                        await loop.run_in_executor(executor, file.writelines, pending)
+                        pending = []
+                        pending_size = 0
+                if pending:
+                    await loop.run_in_executor(executor, file.writelines, pending)
+            except BaseException:
+                file.close()
+                raise
+            file.seek(0)
+            return DownloadedDocument(response.status_code, response.headers, file, size, digest.hexdigest())
+
+    def stream(self, method: str, url: str, headers: Optional[Dict[str, str]] = None):
+        """通过共享连接池发起流式请求，返回 httpx 的异步上下文管理器。"""
+        client = self.http_client()
+        with self._lock:
+            self.http_requests += 1
+        return client.stream(method, url, headers=headers, extensions={"trace": self._trace})
+
+    def get_bucket(self) -> "oss2.Bucket":
+        """返回长期复用的OSS bucket对象，首次调用时创建。OSS配置不完整时抛出 OssConfigError。"""
+        with self._lock:
+            if self._bucket is None:
+                missing = [env for key, env in _REQUIRED_OSS_SETTINGS if not self.oss_config.get(key)]
+                if missing:
+                    raise OssConfigError(f"OSS is not configured, set the environment variables: {', '.join(missing)}")
+                auth = oss2.Auth(self.oss_config["access_key"], self.oss_config["secret_key"])
+                session = oss2.Session(pool_size=self.oss_pool_size)
+                self._bucket = oss2.Bucket(
+                    auth, self.oss_config["endpoint"], self.oss_config["bucket_name"], session=session
+                )
+            return self._bucket
+
+    def _oss_pool_stats(self) -> Dict[str, int]:
+        """汇总OSS连接池（requests/urllib3）中的连接和请求计数。"""
+        stats = {"pool_size": self.oss_pool_size, "connections_opened": 0, "requests": 0}
+        with self._lock:
+            bucket = self._bucket
+        if bucket is None:
+            return stats
+        adapters = bucket.session.session.adapters.values()
+        for adapter in set(adapters):
+            pools = adapter.poolmanager.pools
+            for key in list(pools.keys()):
+                pool = pools.get(key)
+                if pool is not None:
+                    stats["connections_opened"] += pool.num_connections
+                    stats["requests"] += pool.num_requests
+        return stats
+
+    def stats(self) -> Dict[str, Any]:
+        """返回下载连接池和OSS连接池的统计信息。"""
+        with self._lock:
+            http = {
+                "pool_size": self.http_pool_size,
+                "keepalive_expiry": self.http_keepalive_expiry,
+                "requests": self.http_requests,
+                "connections_opened": self.http_connections_opened,
+            }
+        oss = self._oss_pool_stats()
+        for section in (http, oss):
+            requests_made = section["requests"]
+            section["reuse_ratio"] = (
+                max(0.0, 1 - section["connections_opened"] / requests_made) if requests_made else 0.0
+            )
+        return {"http": http, "oss": oss}
+
+    async def aclose(self):
+        """关闭共享的HTTP客户端。"""
+        with self._lock:
+            detached = self._detach_http_client()
+        if detached is None:
+            return
+        client, loop, streams = detached
+        if loop is asyncio.get_running_loop():
+            await client.aclose()
+        else:
+            self._close_detached(client, loop, streams)
@@ -1,9 +1,54 @@
+import copy
 import docx
-from typing import List, Dict, Any, Union
+import re
+import time
+import zipfile
+from typing import List, Dict, Any, Optional, Union, Tuple
 from io import BytesIO
 from docx.document import Document
+from docx.oxml.ns import qn
 from docx.table import _Cell
 from .models import DocumentPatch
+from .streaming_extractor import StreamingExtractor, ANCHOR_PREFIX
+from .package_writer import PackageWriter
+from .lazy_package import LazyPackage
+from .structure_delta import StructureDelta
+from .run_formatter import RunFormatter, RunOffsetTable, RunSnapshot
+from .table_engine import TableLayout
+
+# 补丁目标ID的格式：段落 p_N、单元格 tbl_N_rRcC；另外支持基于 w14:paraId 的稳定锚点 para:XXXXXXXX
+_PARAGRAPH_ID_RE = re.compile(r"p_(\d+)")
+_CELL_ID_RE = re.compile(r"tbl_(\d+)_r(\d+)c(\d+)")
+_P_TAG = qn("w:p")
+_PARA_ID_ATTR = qn("w14:paraId")
+
+
+class _ElementSnapshots:
+    """
+    修改前元素的备份，用于在一批修改中途失败时整体回滚。
+
+    只备份实际要修改的段落（w:p）或单元格（w:tc），开销与修改范围成正比，而不是整个文档。
+    """
+
+    def __init__(self):
+        self._saved: List[Tuple[Any, Any]] = []
+        self._seen = set()
+
+    def save(self, element):
+        """在元素第一次被修改之前调用。"""
+        if id(element) not in self._seen:
+            self._seen.add(id(element))
+            self._saved.append((element, copy.deepcopy(element)))
+
+    def restore(self):
+        """把所有备份过的元素换回修改前的副本（按备份的逆序，嵌套的元素也能正确还原）。"""
+        for element, saved in reversed(self._saved):
+            parent = element.getparent()
+            if parent is not None:
+                parent.replace(element, saved)
+        self._saved.clear()
+        self._seen.clear()
+
 
 class DocxProcessor:
     """
@@ -15,83 +60,366 @@ class DocxProcessor:
     @staticmethod
     def extract_structure_with_ids(file_stream: BytesIO) -> Dict[str, Any]:
         """
-        从内存中的文件流解析DOCX文件，提取其结构，并为每个可编辑元素生成唯一ID。
+        从内存中的文件流解析DOCX文件，提取其结构，并为每个可编辑元素生成唯一ID和内容哈希。
 
         :param file_stream: 包含.docx文件内容的BytesIO流。
-        :return: 一个代表文档结构的字典。
+        :return: 一个代表文档结构的字典：{"elements": [...], "version": 文档版本号}。
         """
-        document = docx.Document(file_stream)
-        structure = {"elements": []}
+        document = LazyPackage.open(file_stream)
+        elements = []
         element_counter = 0
 
         # 遍历文档的所有顶级元素（段落和表格）
         for element in document.element.body:
-            if element.tag.endswith('p'):  # 如果是段落
+            kind = StreamingExtractor.body_element_kind(element.tag)
+            if kind == "paragraph":  # 如果是段落
                 p = docx.text.paragraph.Paragraph(element, document)
                 paragraph_id = f"p_{element_counter}"
-                structure["elements"].append({
+                paragraph_data = {
                     "id": paragraph_id,
                     "type": "paragraph",
                     "text": p.text,
                     "style": p.style.name,
-                })
+                }
+                # 段落带有 w14:paraId 时提供稳定锚点，文档结构变化后仍可直接定位
+                para_id = element.get(_PARA_ID_ATTR)
+                if para_id:
+                    paragraph_data["anchor"] = ANCHOR_PREFIX + para_id
+                elements.append(StructureDelta.with_hash(paragraph_data))
                 element_counter += 1
-            elif element.tag.endswith('tbl'):  # 如果是表格
-                table = docx.table.Table(element, document)
-                table_id = f"tbl_{element_counter}"
+            elif kind == "table":  # 如果是表格
+                # 直接读取 w:tr/w:tc，合并单元格只输出一次并附带跨行/跨列信息
+                layout = TableLayout(f"tbl_{element_counter}", StreamingExtractor.paragraph_text)
                 table_data = {
-                    "id": table_id,
+                    "id": layout.table_id,
                     "type": "table",
-                    "rows": []
+                    "rows": [layout.add_row(tr) for tr in element.iterchildren(qn("w:tr"))]
                 }
-                for i, row in enumerate(table.rows):
-                    row_data = {"cells": []}
-                    for j, cell in enumerate(row.cells):
-                        cell_id = f"{table_id}_r{i}c{j}"
-                        row_data["cells"].append({
-                            "id": cell_id,
-                            "text": cell.text,
-                        })
-                    table_data["rows"].append(row_data)
-                structure["elements"].append(table_data)
+                elements.append(StructureDelta.with_hash(table_data))
                 element_counter += 1
-        
-        return structure
+
+        # 每个元素带有内容哈希，整份结构带有版本号，用于增量获取
+        return StructureDelta.build(elements)
 
     @staticmethod
-    def apply_patches(original_stream: BytesIO, new_stream: BytesIO, patches: List[DocumentPatch]):
+    def extract_structure_streaming(file_stream: BytesIO) -> Dict[str, Any]:
+        """
+        以流式方式提取文档结构，不构建完整的 python-docx Document 对象。
+
+        只读取主文档XML和样式XML，适用于包含大量图片等媒体文件的大文档。
+        返回结果（包括元素ID）与 extract_structure_with_ids 完全一致。
+
+        :param file_stream: 包含.docx文件内容的BytesIO流。
+        :return: 一个代表文档结构的字典。
+        """
+        return StreamingExtractor.extract_structure(file_stream)
+
+    @staticmethod
+    def apply_patches(original_stream: BytesIO, new_stream: BytesIO, patches: List[DocumentPatch],
+                      timings: Optional[Dict[str, float]] = None):
         """
         将一系列修改（补丁）应用到内存中的原始DOCX文件流，并将结果写入新的流。
 
+        文档按需加载，图片、嵌入对象等部件不会被读入内存；保存时只重新序列化主文档部件，
+        其余部件按原样复制压缩数据。
+
         :param original_stream: 包含原始.docx文件内容的BytesIO流。
         :param new_stream: 用于写入修改后文件内容的BytesIO流。
         :param patches: 一个包含修改指令的列表。
+        :param timings: 可选，传入字典时写入各阶段耗时（秒）：parse、patch、save。
         """
-        document = docx.Document(original_stream)
-        patches_dict = {p.element_id: p.new_content for p in patches}
+        started = time.monotonic()
+        document = LazyPackage.open(original_stream)
+        parsed = time.monotonic()
+        applied = DocxProcessor.apply_patches_to_document(document, patches)
+        patched = time.monotonic()
+        DocxProcessor.save_document(document, original_stream, new_stream, bool(applied))
+        if timings is not None:
+            timings["parse"] = parsed - started
+            timings["patch"] = patched - parsed
+            timings["save"] = time.monotonic() - patched
 
+    @staticmethod
+    def apply_patches_to_document(document: Document, patches: List[DocumentPatch]) -> List[str]:
+        """
+        将补丁应用到已解析的 Document 对象上（不涉及读写文件）。
+
+        同一元素有多个整段替换时以最后一个为准；带字符区间的补丁在整段替换之后应用，
+        区间都相对于应用前的段落文本，互相不能重叠。字符区间和 diff 模式只支持段落。
+        任何补丁出错（ValueError 等）时已做的修改全部撤销，文档保持调用前的状态。
+
+        :param document: python-docx 的 Document 对象。
+        :param patches: 一个包含修改指令的列表。
+        :return: 实际找到并修改了的元素ID列表。
+        """
+        patches_by_id: Dict[str, List[DocumentPatch]] = {}
+        for patch in patches:
+            patches_by_id.setdefault(patch.element_id, []).append(patch)
+
+        # 一次性定位所有补丁目标，只遍历到最后一个被修改的元素为止
+        targets = DocxProcessor._index_patch_targets(document, patches_by_id)
+        # 先检查所有补丁，任何一个不合法时文档保持不变
+        for element_id, (kind, target) in targets.items():
+            if kind != "paragraph":
+                for patch in patches_by_id[element_id]:
+                    if patch.start is not None or patch.end is not None:
+                        raise ValueError(f"Character range patches are only supported for paragraphs: {element_id}")
+                    if patch.mode == "diff":
+                        raise ValueError(f"Diff patches are only supported for paragraphs: {element_id}")
+
+        snapshots = _ElementSnapshots()
+        try:
+            for element_id, (kind, target) in targets.items():
+                element_patches = patches_by_id[element_id]
+                text_patches = [p for p in element_patches if p.start is None and p.end is None]
+                span_patches = [p for p in element_patches if p.start is not None or p.end is not None]
+                snapshots.save(target._p if kind == "paragraph" else target._tc)
+                if text_patches:
+                    patch = text_patches[-1]
+                    if patch.mode == "diff":
+                        RunOffsetTable(target._p).apply_diff(str(patch.new_content))
+                    elif kind == "paragraph":
+                        DocxProcessor._replace_paragraph_text(target, patch.new_content)
+                    else:
+                        # 清空单元格并填充新内容
+                        target.text = str(patch.new_content)
+                if span_patches:
+                    DocxProcessor._replace_paragraph_spans(target, span_patches)
+        except Exception:
+            # 部分补丁已经生效时撤销，保证一批补丁要么全部应用、要么都不应用
+            snapshots.restore()
+            raise
+        return list(targets)
+
+    @staticmethod
+    def _replace_paragraph_spans(p: docx.text.paragraph.Paragraph, patches: List[DocumentPatch]):
+        """
+        按字符区间修改段落，只改写与区间重叠的run。
+
+        各区间相对于修改前的文本；从后向前应用，前面区间的偏移不受影响。
+        同一位置的多个插入按补丁顺序排列。
+        """
+        table = RunOffsetTable(p._p)
+        length = table.length
+        spans = sorted(
+            (
+                patch.start if patch.start is not None else 0,
+                patch.end if patch.end is not None else length,
+                index,
+                str(patch.new_content),
+            )
+            for index, patch in enumerate(patches)
+        )
+        for previous, current in zip(spans, spans[1:]):
+            if previous[1] > current[0]:
+                raise ValueError(
+                    f"Overlapping character ranges [{previous[0]}, {previous[1]}) and [{current[0]}, {current[1]}) "
+                    f"for element {patches[0].element_id}"
+                )
+        for start, end, _, text in reversed(spans):
+            table.replace(start, end, text)
+
+    @staticmethod
+    def find_and_replace(document: Document, find: str, replacement: str, regex: bool = False,
+                         match_case: bool = True, scope: str = "all", start: int = 0, end: Optional[int] = None,
+                         max_replacements: int = 0) -> Dict[str, Any]:
+        """
+        在文档中查找并替换文本，一次遍历完成全部替换。
+
+        每个段落先计算文本并查找匹配，只有存在匹配时才建立run偏移表（RunOffsetTable），
+        跨run的匹配同样可以替换，替换内容沿用匹配起点所在run的格式，其他run保持不变。
+
+        :param document: python-docx 的 Document 对象。
+        :param find: 要查找的文本；regex 为 True 时为正则表达式。
+        :param replacement: 替换文本；正则模式下可以使用 \\1、\\g<name> 引用分组。
+        :param regex: 是否按正则表达式匹配。
+        :param match_case: 是否区分大小写。
+        :param scope: "all"、"paragraphs"（只处理顶级段落）或 "tables"（只处理表格中的段落）。
+        :param start: 顶级元素下标的起点（含）。
+        :param end: 顶级元素下标的终点（含），None 表示到文档末尾。
+        :param max_replacements: 最多替换的次数，0 表示不限制。
+        :return: {"replacements": 替换总数, "elements": {顶级元素ID: 替换次数}}，表格按 tbl_N 计数。
+        """
+        if not find:
+            raise ValueError("find must not be empty")
+        if scope not in ("all", "paragraphs", "tables"):
+            raise ValueError(f"Invalid scope: {scope}")
+        pattern = re.compile(find if regex else re.escape(find), 0 if match_case else re.IGNORECASE)
+
+        elements: Dict[str, int] = {}
+        snapshots = _ElementSnapshots()
+        try:
+            total = DocxProcessor._find_and_replace_elements(
+                document, pattern, replacement, regex, scope, start, end, max_replacements, elements, snapshots)
+        except Exception:
+            # 例如正则替换模板引用了不存在的分组：撤销已替换的段落
+            snapshots.restore()
+            raise
+        return {"replacements": total, "elements": elements}
+
+    @staticmethod
+    def _find_and_replace_elements(document: Document, pattern, replacement: str, regex: bool, scope: str,
+                                   start: int, end: Optional[int], max_replacements: int,
+                                   elements: Dict[str, int], snapshots: _ElementSnapshots) -> int:
+        """find_and_replace 的遍历部分，返回替换总数，各元素的替换次数写入 elements。"""
+        total = 0
         element_counter = 0
-        
-        # 再次遍历文档元素以应用修改
         for element in document.element.body:
-            if element.tag.endswith('p'):
-                current_id = f"p_{element_counter}"
-                if current_id in patches_dict:
-                    p = docx.text.paragraph.Paragraph(element, document)
-                    DocxProcessor._replace_paragraph_text(p, patches_dict[current_id])
-                element_counter += 1
-            elif element.tag.endswith('tbl'):
-                table = docx.table.Table(element, document)
-                table_id = f"tbl_{element_counter}"
-                for i, row in enumerate(table.rows):
-                    for j, cell in enumerate(row.cells):
-                        cell_id = f"{table_id}_r{i}c{j}"
-                        if cell_id in patches_dict:
-                            # 清空单元格并填充新内容
-                            cell.text = str(patches_dict[cell_id])
-                element_counter += 1
+            kind = StreamingExtractor.body_element_kind(element.tag)
+            if kind == "paragraph":
+                element_id = f"p_{element_counter}"
+                paragraphs = () if scope == "tables" else (element,)
+            elif kind == "table":
+                element_id = f"tbl_{element_counter}"
+                paragraphs = () if scope == "paragraphs" else element.iter(_P_TAG)
+            else:
+                continue
+            element_counter += 1
+            if element_counter - 1 < start:
+                continue
+            if end is not None and element_counter - 1 > end:
+                break
 
-        document.save(new_stream)
+            count = 0
+            for p in paragraphs:
+                limit = max_replacements - total - count if max_replacements else 0
+                count += DocxProcessor._replace_matches(p, pattern, replacement, regex, limit, snapshots)
+                if max_replacements and total + count >= max_replacements:
+                    break
+            if count:
+                elements[element_id] = count
+                total += count
+            if max_replacements and total >= max_replacements:
+                break
+        return total
+
+    @staticmethod
+    def _replace_matches(p, pattern, replacement: str, regex: bool, limit: int,
+                         snapshots: Optional[_ElementSnapshots] = None) -> int:
+        """替换一个段落（w:p 元素）中的所有匹配，返回替换次数；limit 大于0时最多替换 limit 处。"""
+        text = StreamingExtractor.paragraph_text(p)
+        matches = [m for m in pattern.finditer(text) if m.end() > m.start() or replacement]
+        if limit:
+            matches = matches[:limit]
+        if not matches:
+            return 0
+        if snapshots is not None:
+            snapshots.save(p)
+        table = RunOffsetTable(p)
+        # 从后向前替换，前面匹配的偏移保持有效
+        for match in reversed(matches):
+            table.replace(match.start(), match.end(), match.expand(replacement) if regex else replacement)
+        return len(matches)
+
+    @staticmethod
+    def _index_patch_targets(document: Document, element_ids) -> Dict[str, Tuple[str, Any]]:
+        """
+        为补丁ID建立 ID -> 目标对象 的索引。
+
+        - p_N / tbl_N_rRcC：按顶级元素顺序计数，遍历到最大的目标序号后立即停止；
+          只展开包含目标单元格的表格，并且只计算目标所在行的单元格；
+        - para:XXXXXXXX：按 w14:paraId 查找段落，不依赖元素顺序；有锚点时一次遍历建立 paraId 索引，
+          每个锚点直接查表。
+        无法匹配的ID会被忽略。
+
+        :return: {element_id: ("paragraph", Paragraph) 或 ("cell", _Cell)}
+        """
+        wanted_paragraphs: Dict[int, str] = {}
+        wanted_cells: Dict[int, List[Tuple[int, int, str]]] = {}
+        anchors: Dict[str, str] = {}
+        for element_id in element_ids:
+            if element_id.startswith(ANCHOR_PREFIX):
+                anchors[element_id] = element_id[len(ANCHOR_PREFIX):].upper()
+                continue
+            match = _PARAGRAPH_ID_RE.fullmatch(element_id)
+            if match and f"p_{int(match.group(1))}" == element_id:
+                wanted_paragraphs[int(match.group(1))] = element_id
+                continue
+            match = _CELL_ID_RE.fullmatch(element_id)
+            if match:
+                table_index, row, col = (int(g) for g in match.groups())
+                if f"tbl_{table_index}_r{row}c{col}" == element_id:
+                    wanted_cells.setdefault(table_index, []).append((row, col, element_id))
+
+        targets: Dict[str, Tuple[str, Any]] = {}
+        last_index = max(list(wanted_paragraphs) + list(wanted_cells), default=-1)
+        element_counter = 0
+        body = document.element.body
+        if last_index >= 0:
+            for element in body:
+                kind = StreamingExtractor.body_element_kind(element.tag)
+                if kind == "paragraph":
+                    if element_counter in wanted_paragraphs:
+                        targets[wanted_paragraphs[element_counter]] = (
+                            "paragraph", docx.text.paragraph.Paragraph(element, document)
+                        )
+                    element_counter += 1
+                elif kind == "table":
+                    if element_counter in wanted_cells:
+                        DocxProcessor._index_table_cells(
+                            docx.table.Table(element, document), wanted_cells[element_counter], targets
+                        )
+                    element_counter += 1
+                if element_counter > last_index:
+                    break
+
+        if anchors:
+            paragraphs_by_anchor = DocxProcessor._index_para_ids(body)
+            for element_id, para_id in anchors.items():
+                found = paragraphs_by_anchor.get(para_id)
+                if found is not None:
+                    targets[element_id] = ("paragraph", docx.text.paragraph.Paragraph(found, document))
+        return targets
+
+    @staticmethod
+    def _index_para_ids(body) -> Dict[str, Any]:
+        """一次遍历建立 {w14:paraId（大写）: w:p 元素} 索引，重复的 paraId 以文档中第一个为准。"""
+        index: Dict[str, Any] = {}
+        for p in body.iter(_P_TAG):
+            para_id = p.get(_PARA_ID_ATTR)
+            if para_id:
+                index.setdefault(para_id.upper(), p)
+        return index
+
+    @staticmethod
+    def _index_table_cells(table, wanted: List[Tuple[int, int, str]], targets: Dict[str, Tuple[str, Any]]):
+        """
+        把 (行, 列, ID) 解析为单元格对象。
+
+        纵向合并需要按行顺序解析，因此只读取到最后一个目标行为止；
+        被合并覆盖的位置解析为合并区域的起始单元格，与 python-docx row.cells 的语义一致。
+        """
+        last_row = max(row for row, _, _ in wanted)
+        layout = TableLayout("", None, keep_elements=True)
+        for tr in table._tbl.iterchildren(qn("w:tr")):
+            if layout.row_count > last_row:
+                break
+            layout.add_row(tr)
+        # 按文档顺序登记，多个ID指向同一个合并单元格时以位置靠后的补丁为准
+        for row, col, element_id in sorted(wanted):
+            tc = layout.root_at(row, col)
+            if tc is not None:
+                targets[element_id] = ("cell", _Cell(tc, table))
+
+    @staticmethod
+    def save_document(document: Document, original_stream: BytesIO, new_stream: BytesIO, changed: bool):
+        """
+        保存修改后的文档。
+
+        没有任何修改时直接复制原文件；否则只替换主文档部件，其余zip条目原样复制。
+        原始包无法按条目复制时（例如加密条目、部件名不匹配，或当前的 zipfile 不支持按原样复制），
+        回退到 python-docx 的完整保存。
+        """
+        if not changed:
+            PackageWriter.copy_stream(original_stream, new_stream)
+            return
+        partname = document.part.partname.lstrip("/")
+        try:
+            PackageWriter.rewrite(original_stream, new_stream, {partname: document.part.blob})
+        except (zipfile.BadZipFile, NotImplementedError, KeyError):
+            new_stream.seek(0)
+            new_stream.truncate()
+            document.save(new_stream)
 
     @staticmethod
     def _replace_paragraph_text(p: docx.text.paragraph.Paragraph, new_text: str):
@@ -104,47 +432,27 @@ class DocxProcessor:
         3. 如果新文本较短，使用第一个run的格式
         4. 如果新文本较长，按比例分配格式
 
+        格式通过整体复制原run的 w:rPr 元素保留（见 RunFormatter）。
+
         :param p: 要修改的段落对象。
         :param new_text: 新的文本内容。
         """
-        if not p.runs:
+        p_element = p._p
+        r_lst = p_element.r_lst
+        if not r_lst:
             # 如果段落没有runs，创建一个新的run
-            p.add_run(new_text)
+            RunFormatter.append_run(p_element, new_text)
             return
         
-        # 保存原始runs的格式信息
-        original_runs_info = []
-        original_text = ""
-        
-        for run in p.runs:
-            run_info = {
-                'text': run.text,
-                'bold': run.bold,
-                'italic': run.italic,
-                'underline': run.underline,
-                'font_name': run.font.name,
-                'font_size': run.font.size,
-                'font_color': None,
-                'style': None
-            }
-            
-            # 保存字体颜色（如果有）
-            if run.font.color.rgb:
-                run_info['font_color'] = run.font.color.rgb
-            
-            original_runs_info.append(run_info)
-            original_text += run.text
-        
-        # 清空现有的runs
-        for run in p.runs[:]:
-            r = run._r
-            r.getparent().remove(r)
-        
-        # 策略1: 如果原段落只有一个run，直接替换并保留所有格式
-        if len(original_runs_info) == 1:
-            new_run = p.add_run(new_text)
-            DocxProcessor._apply_run_formatting(new_run, original_runs_info[0])
+        # 策略1: 如果原段落只有一个run，原地替换文本，run的格式和位置都不变
+        if len(r_lst) == 1:
+            r_lst[0].text = new_text
             return
+
+        # 保存原始runs的文本和格式元素，然后清空现有的runs
+        original_runs = RunFormatter.snapshot(p_element)
+        original_text = "".join(text for text, _ in original_runs)
+        RunFormatter.remove_runs(p_element)
         
         # 策略2: 如果新文本为空，不添加任何内容
         if not new_text.strip():
@@ -152,68 +460,40 @@ class DocxProcessor:
         
         # 策略3: 如果新文本很短或原文本很短，使用第一个run的格式
         if len(new_text) <= 50 or len(original_text) <= 10:
-            new_run = p.add_run(new_text)
-            DocxProcessor._apply_run_formatting(new_run, original_runs_info[0])
+            RunFormatter.append_run(p_element, new_text, original_runs[0][1])
             return
         
         # 策略4: 尝试按比例分配格式
-        DocxProcessor._distribute_formatting_proportionally(p, new_text, original_runs_info, original_text)
-
-    @staticmethod
-    def _apply_run_formatting(run, format_info: Dict[str, Any]):
-        """
-        将格式信息应用到run对象上。
-        
-        :param run: docx run对象
-        :param format_info: 包含格式信息的字典
-        """
-        try:
-            if format_info.get('bold') is not None:
-                run.bold = format_info['bold']
-            if format_info.get('italic') is not None:
-                run.italic = format_info['italic']
-            if format_info.get('underline') is not None:
-                run.underline = format_info['underline']
-            if format_info.get('font_name'):
-                run.font.name = format_info['font_name']
-            if format_info.get('font_size'):
-                run.font.size = format_info['font_size']
-            if format_info.get('font_color'):
-                run.font.color.rgb = format_info['font_color']
-        except Exception:
-            # 如果应用格式失败，忽略错误继续执行
-            pass
+        DocxProcessor._distribute_formatting_proportionally(p_element, new_text, original_runs, original_text)
 
     @staticmethod
-    def _distribute_formatting_proportionally(p, new_text: str, original_runs_info: List[Dict], original_text: str):
+    def _distribute_formatting_proportionally(p_element, new_text: str, original_runs: List[RunSnapshot],
+                                              original_text: str):
         """
         按比例分配格式到新文本中。
         
-        :param p: 段落对象
+        :param p_element: 段落的 w:p 元素
         :param new_text: 新文本
-        :param original_runs_info: 原始runs的格式信息
+        :param original_runs: 原始runs的 (文本, w:rPr) 列表
         :param original_text: 原始文本
         """
         if not original_text:
             # 如果原文本为空，使用第一个run的格式
-            new_run = p.add_run(new_text)
-            if original_runs_info:
-                DocxProcessor._apply_run_formatting(new_run, original_runs_info[0])
+            RunFormatter.append_run(p_element, new_text, original_runs[0][1] if original_runs else None)
             return
         
         # 计算每个原始run在文本中的位置比例
         current_pos = 0
         run_positions = []
         
-        for run_info in original_runs_info:
-            run_text = run_info['text']
-            start_ratio = current_pos / len(original_text) if len(original_text) > 0 else 0
-            end_ratio = (current_pos + len(run_text)) / len(original_text) if len(original_text) > 0 else 1
+        for run_text, rPr in original_runs:
+            start_ratio = current_pos / len(original_text)
+            end_ratio = (current_pos + len(run_text)) / len(original_text)
             
             run_positions.append({
                 'start_ratio': start_ratio,
                 'end_ratio': end_ratio,
-                'format_info': run_info
+                'rPr': rPr
             })
             current_pos += len(run_text)
         
@@ -236,14 +516,11 @@ class DocxProcessor:
             if start_pos < end_pos:
                 segment_text = new_text[start_pos:end_pos]
                 if segment_text:  # 只有当片段不为空时才创建run
-                    new_run = p.add_run(segment_text)
-                    DocxProcessor._apply_run_formatting(new_run, pos_info['format_info'])
+                    RunFormatter.append_run(p_element, segment_text, pos_info['rPr'])
                     last_end = end_pos
         
         # 如果还有剩余文本，使用最后一个run的格式
         if last_end < new_text_len:
             remaining_text = new_text[last_end:]
             if remaining_text:
-                new_run = p.add_run(remaining_text)
-                if original_runs_info:
-                    DocxProcessor._apply_run_formatting(new_run, original_runs_info[-1]) 
\ No newline at end of file
+                RunFormatter.append_run(p_element, remaining_text, original_runs[-1][1])
@@ -0,0 +1,38 @@
+import importlib
+import threading
+from types import ModuleType
+
+
+class LazyModule:
+    """
+    首次访问属性时才导入的模块代理。
+
+    oss2、httpx 等依赖导入耗时较长（oss2 还会带入 requests），而很多会话只用到文档解析。
+    模块级写成 oss2 = LazyModule("oss2") 后，用法与直接 import 相同（oss2.Bucket、
+    except httpx.HTTPError 等），真正的导入推迟到第一次用到它的工具调用。
+    注意类型注解在函数定义时求值，使用代理模块的注解需要写成字符串。
+    """
+
+    def __init__(self, name: str):
+        self._name = name
+        self._module = None
+        self._lock = threading.Lock()
+
+    def load(self) -> ModuleType:
+        """导入并返回真实模块。"""
+        if self._module is None:
+            with self._lock:
+                if self._module is None:
+                    self._module = importlib.import_module(self._name)
+        return self._module
+
+    @property
+    def loaded(self) -> bool:
+        return self._module is not None
+
+    def __getattr__(self, attr: str):
+        return getattr(self.load(), attr)
+
+    def __repr__(self) -> str:
+        state = "loaded" if self.loaded else "not loaded"
+        return f"<LazyModule '{self._name}' ({state})>"
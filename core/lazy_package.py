@@ -0,0 +1,187 @@
+import threading
+import zipfile
+from typing import Dict, BinaryIO, Optional, Type
+
+import docx
+from docx.document import Document
+from docx.opc.constants import CONTENT_TYPE as CT, RELATIONSHIP_TYPE as RT
+from docx.opc.packuri import CONTENT_TYPES_URI, PACKAGE_URI
+from docx.opc.part import Part, PartFactory, XmlPart
+from docx.oxml.parser import parse_xml
+from docx.package import Package
+
+# 以下是 python-docx 的内部接口（1.1 ~ 1.2 中存在），新版本中可能改名或移除
+try:
+    from docx.opc.package import Unmarshaller
+    from docx.opc.pkgreader import PackageReader, _ContentTypeMap
+except ImportError:
+    Unmarshaller = PackageReader = _ContentTypeMap = None
+
+# 延迟加载用到的内部方法/属性：(所属对象, 属性名)
+_REQUIRED_DOCX_INTERNALS = (
+    (_ContentTypeMap, "from_xml"),
+    (PackageReader, "_srels_for"),
+    (PackageReader, "_load_serialized_parts"),
+    (Unmarshaller, "unmarshal"),
+    (PartFactory, "_part_cls_for"),
+    (PartFactory, "part_class_selector"),
+)
+
+
+class _DeferredBlob:
+    """尚未读取的部件内容：记录zip条目名，首次访问时才解压。"""
+
+    __slots__ = ("source", "membername")
+
+    def __init__(self, source: "_LazyZipReader", membername: str):
+        self.source = source
+        self.membername = membername
+
+    def read(self) -> bytes:
+        return self.source.read(self.membername)
+
+
+class _LazyZipReader:
+    """
+    实现 python-docx PhysPkgReader 接口的zip读取器。
+
+    [Content_Types].xml 和 .rels 关系文件立即读取（构建部件关系图需要）；
+    部件内容只返回 _DeferredBlob，zip保持打开，直到部件被访问时再读取对应条目。
+    """
+
+    def __init__(self, stream: BinaryIO):
+        self._zipf = zipfile.ZipFile(stream, "r")
+        # 同一个zip可能被多个部件在不同线程中读取
+        self._lock = threading.Lock()
+
+    def read(self, membername: str) -> bytes:
+        with self._lock:
+            return self._zipf.read(membername)
+
+    def blob_for(self, pack_uri) -> _DeferredBlob:
+        return _DeferredBlob(self, pack_uri.membername)
+
+    @property
+    def content_types_xml(self) -> bytes:
+        return self.read(CONTENT_TYPES_URI.membername)
+
+    def rels_xml_for(self, source_uri) -> Optional[bytes]:
+        try:
+            return self.read(source_uri.rels_uri.membername)
+        except KeyError:
+            return None
+
+    def close(self):
+        # 延迟读取的部件仍需要zip，不在加载结束时关闭
+        pass
+
+
+class _LazyBlobMixin:
+    """二进制部件（图片、字体、嵌入对象等）：_blob 在首次访问时才从zip读取。"""
+
+    @property
+    def _blob(self):
+        blob = self.__dict__.get("_lazy_blob")
+        if isinstance(blob, _DeferredBlob):
+            blob = self.__dict__["_lazy_blob"] = blob.read()
+        return blob
+
+    @_blob.setter
+    def _blob(self, value):
+        self.__dict__["_lazy_blob"] = value
+
+
+class _LazyXmlMixin:
+    """XML部件：元素树在首次访问时才解析；从未访问过的部件保存时直接输出原始字节。"""
+
+    @classmethod
+    def load(cls, partname, content_type, blob, package):
+        return cls(partname, content_type, blob, package)
+
+    @property
+    def _element(self):
+        element = self.__dict__.get("_lazy_element")
+        if isinstance(element, _DeferredBlob):
+            element = self.__dict__["_lazy_element"] = parse_xml(element.read())
+        return element
+
+    @_element.setter
+    def _element(self, value):
+        self.__dict__["_lazy_element"] = value
+
+    @property
+    def blob(self) -> bytes:
+        element = self.__dict__.get("_lazy_element")
+        if isinstance(element, _DeferredBlob):
+            return element.read()
+        return super().blob
+
+
+class LazyPackage:
+    """
+    按需读取部件的DOCX包加载器。
+
+    python-docx 的 docx.Document() 打开文档时会读出包内所有部件，并解析全部XML部件，
+    图片、字体、OLE嵌入对象等二进制部件即使从不使用也会解压进内存。
+    LazyPackage 只立即读取内容类型表、关系文件和主文档部件，其余部件在首次访问时才从zip读取
+    （样式等XML部件在首次访问时才解析），未访问的二进制部件一直只是zip条目的引用。
+    加载耗时和内存因此取决于XML的大小，而不是整个文件（尤其是媒体文件）的大小。
+
+    返回的 Document 与 docx.Document() 的用法完全相同；源流在 Document 使用期间必须保持可读，
+    保存时未改动的部件由 PackageWriter 原样复制压缩数据。
+    延迟加载依赖 python-docx 的内部接口，安装的版本缺少这些接口时回退到 docx.Document() 完整加载。
+    """
+
+    _lazy_classes: Dict[type, type] = {}
+
+    @staticmethod
+    def supported() -> bool:
+        """检查安装的 python-docx 是否具备延迟加载所需的内部接口。"""
+        return all(owner is not None and hasattr(owner, name) for owner, name in _REQUIRED_DOCX_INTERNALS)
+
+    @staticmethod
+    def open(stream: BinaryIO) -> Document:
+        """从可寻址的二进制流加载文档。"""
+        if not LazyPackage.supported():
+            stream.seek(0)
+            return docx.Document(stream)
+        reader = _LazyZipReader(stream)
+        content_types = _ContentTypeMap.from_xml(reader.content_types_xml)
+        pkg_srels = PackageReader._srels_for(reader, PACKAGE_URI)
+        sparts = PackageReader._load_serialized_parts(reader, pkg_srels, content_types)
+        package = Package()
+        Unmarshaller.unmarshal(PackageReader(content_types, pkg_srels, sparts), package, LazyPackage._part_factory)
+
+        document_part = package.main_document_part
+        if document_part.content_type != CT.WML_DOCUMENT_MAIN:
+            raise ValueError(f"file is not a Word file, content type is '{document_part.content_type}'")
+        return document_part.document
+
+    @staticmethod
+    def _part_factory(partname, content_type, reltype, blob, package) -> Part:
+        # 主文档部件总要解析，直接按 python-docx 的方式加载
+        if reltype == RT.OFFICE_DOCUMENT:
+            return PartFactory(partname, content_type, reltype, blob.read(), package)
+        part_class = LazyPackage._part_class(content_type, reltype)
+        if issubclass(part_class, XmlPart) and part_class.__init__ is not XmlPart.__init__:
+            # 在 __init__ 中另存元素引用的XML部件（如 SettingsPart）无法延迟解析
+            return part_class.load(partname, content_type, blob.read(), package)
+        return LazyPackage._lazy_class(part_class).load(partname, content_type, blob, package)
+
+    @staticmethod
+    def _part_class(content_type: str, reltype: str) -> Type[Part]:
+        """与 PartFactory 相同的部件类选择：先用 part_class_selector（图片），再按内容类型。"""
+        part_class = None
+        if PartFactory.part_class_selector is not None:
+            part_class = PartFactory.part_class_selector(content_type, reltype)
+        return part_class or PartFactory._part_cls_for(content_type)
+
+    @staticmethod
+    def _lazy_class(part_class: Type[Part]) -> type:
+        """返回 part_class 的延迟加载子类（按类缓存）。"""
+        lazy_class = LazyPackage._lazy_classes.get(part_class)
+        if lazy_class is None:
+            mixin = _LazyXmlMixin if issubclass(part_class, XmlPart) else _LazyBlobMixin
+            lazy_class = type(f"Lazy{part_class.__name__}", (mixin, part_class), {})
+            LazyPackage._lazy_classes[part_class] = lazy_class
+        return lazy_class
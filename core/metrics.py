@@ -0,0 +1,230 @@
+import bisect
+import http.server
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Any, Callable, List, Optional, Tuple
+
+# 延迟直方图的桶上限（秒）
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Dict[str, Any]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_labels(key: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(key) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    escaped = (
+        (k, v.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')) for k, v in pairs
+    )
+    return "{" + ",".join(f'{k}="{v}"' for k, v in escaped) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Histogram:
+    __slots__ = ("counts", "total", "count")
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.counts = [0] * len(buckets)
+        self.total = 0.0
+        self.count = 0
+
+
+class MetricsRegistry:
+    """
+    进程内的指标注册表，输出 Prometheus 文本格式。
+
+    支持三类指标：
+    - 直方图（observe）：各阶段耗时等；
+    - 计数器（inc）：调用次数、处理字节数等；
+    - 采集回调（register_collector）：输出时调用，返回当前值作为 gauge（如缓存条目数），
+      或作为 counter 输出由其他组件自己累计的计数（如缓存命中次数）。
+    所有方法都是线程安全的。
+    """
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        self._histograms: Dict[str, Dict[LabelKey, _Histogram]] = {}
+        self._counters: Dict[str, Dict[LabelKey, float]] = {}
+        self._help: Dict[str, str] = {}
+        self._collectors: List[Tuple[str, Callable[[], Dict[str, float]]]] = []
+
+    def describe(self, name: str, help_text: str):
+        """设置指标的说明文字（# HELP）。"""
+        with self._lock:
+            self._help[name] = help_text
+
+    def observe(self, name: str, value: float, **labels):
+        """向直方图记录一个观测值。"""
+        key = _label_key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = _Histogram(self.buckets)
+            if index < len(self.buckets):
+                histogram.counts[index] += 1
+            histogram.total += value
+            histogram.count += 1
+
+    def inc(self, name: str, amount: float = 1, **labels):
+        """增加计数器。"""
+        key = _label_key(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + amount
+
+    def register_collector(self, collector: Callable[[], Dict[str, float]], kind: str = "gauge"):
+        """
+        注册一个采集回调，返回 {指标名: 当前值}，在输出指标时调用。
+
+        :param kind: "gauge"（默认）或 "counter"；counter 的值必须单调递增，指标名以 _total 结尾。
+        """
+        if kind not in ("gauge", "counter"):
+            raise ValueError(f"Invalid collector kind: {kind}")
+        with self._lock:
+            self._collectors.append((kind, collector))
+
+    def render_prometheus(self) -> str:
+        """以 Prometheus 文本格式（0.0.4）输出全部指标。"""
+        lines: List[str] = []
+        with self._lock:
+            histograms = {n: {k: (list(h.counts), h.total, h.count) for k, h in s.items()}
+                          for n, s in self._histograms.items()}
+            counters = {n: dict(s) for n, s in self._counters.items()}
+            help_texts = dict(self._help)
+            collectors = list(self._collectors)
+
+        gauges: Dict[str, float] = {}
+        for kind, collector in collectors:
+            try:
+                values = collector()
+            except Exception:
+                # 采集失败不影响其他指标的输出
+                continue
+            if kind == "counter":
+                for name, value in values.items():
+                    counters.setdefault(name, {})[()] = value
+            else:
+                gauges.update(values)
+
+        for name in sorted(histograms):
+            if name in help_texts:
+                lines.append(f"# HELP {name} {help_texts[name]}")
+            lines.append(f"# TYPE {name} histogram")
+            for key, (counts, total, count) in sorted(histograms[name].items()):
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets, counts):
+                    cumulative += bucket_count
+                    lines.append(f"{name}_bucket{_format_labels(key, ('le', _format_value(bound)))} {cumulative}")
+                lines.append(f"{name}_bucket{_format_labels(key, ('le', '+Inf'))} {count}")
+                lines.append(f"{name}_sum{_format_labels(key)} {_format_value(total)}")
+                lines.append(f"{name}_count{_format_labels(key)} {count}")
+
+        for name in sorted(counters):
+            if name in help_texts:
+                lines.append(f"# HELP {name} {help_texts[name]}")
+            lines.append(f"# TYPE {name} counter")
+            for key, value in sorted(counters[name].items()):
+                lines.append(f"{name}{_format_labels(key)} {_format_value(value)}")
+
+        for name in sorted(gauges):
+            if name in help_texts:
+                lines.append(f"# HELP {name} {help_texts[name]}")
+            lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name} {_format_value(gauges[name])}")
+        return "\n".join(lines) + "\n"
+
+
+class StageTimer:
+    """
+    一次工具调用的分阶段计时器。
+
+    每个阶段用单调时钟计时，结束时同时写入指标注册表（按工具名和阶段名区分）；
+    还可以记录各阶段处理的字节数。result() 返回可附加到工具结果中的 timings 块。
+    计时器可以在线程池中使用，但同一时刻只应被一个任务写入。
+    """
+
+    def __init__(self, registry: MetricsRegistry, tool: str):
+        self.registry = registry
+        self.tool = tool
+        self.started = time.monotonic()
+        self.stages: Dict[str, float] = {}
+        self.bytes: Dict[str, int] = {}
+
+    @contextmanager
+    def stage(self, name: str):
+        """计时一个阶段：with timer.stage("download"): ..."""
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.record(name, time.monotonic() - started)
+
+    def record(self, name: str, seconds: float):
+        """记录一个已测得的阶段耗时（同名阶段累加）。"""
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+        self.registry.observe("docx_mcp_stage_seconds", seconds, tool=self.tool, stage=name)
+
+    def add_bytes(self, name: str, size: int):
+        """记录某个阶段处理的字节数。"""
+        self.bytes[name] = self.bytes.get(name, 0) + size
+        self.registry.inc("docx_mcp_stage_bytes_total", size, tool=self.tool, stage=name)
+
+    def finish(self, ok: bool) -> float:
+        """结束本次调用，记录总耗时和调用结果，返回总耗时（秒）。"""
+        total = time.monotonic() - self.started
+        self.registry.observe("docx_mcp_tool_seconds", total, tool=self.tool)
+        self.registry.inc("docx_mcp_tool_calls_total", tool=self.tool, status="ok" if ok else "error")
+        return total
+
+    def result(self, total: Optional[float] = None) -> Dict[str, Any]:
+        """返回 {"total_ms", "stages_ms": {...}, "bytes": {...}}。"""
+        if total is None:
+            total = time.monotonic() - self.started
+        return {
+            "total_ms": round(total * 1000, 3),
+            "stages_ms": {name: round(seconds * 1000, 3) for name, seconds in self.stages.items()},
+            "bytes": dict(self.bytes),
+        }
+
+
+def serve_metrics(registry: MetricsRegistry, host: str = "127.0.0.1", port: int = 9464):
+    """
+    在后台线程中启动一个只提供 GET /metrics 的HTTP服务，供 Prometheus 抓取。
+
+    :return: 已启动的 HTTPServer，调用其 shutdown() 可停止服务。
+    """
+    class MetricsHandler(http.server.BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            if self.path.split("?", 1)[0] != "/metrics":
+                self.send_response(404)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            body = registry.render_prometheus().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    server = http.server.ThreadingHTTPServer((host, port), MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="docx-metrics", daemon=True).start()
+    return server
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional, Any, List, Dict
+from typing import Optional, Any, List, Dict, Literal
 
 # Pydantic模型是FastAPI用于数据验证和文档生成的关键部分
 
@@ -14,6 +14,14 @@ class DocumentPatch(BaseModel):
     # 新的内容，可以是简单的字符串，也可以是更复杂的结构（例如，对于表格单元格）
     new_content: Any
 
+    # 可选的字符区间 [start, end)，按提取结果中段落 text 的字符计数；提供时只把该区间替换为 new_content。
+    # 只给出其中一端时，start 缺省为0，end 缺省为文本末尾。仅适用于段落。
+    start: Optional[int] = None
+    end: Optional[int] = None
+
+    # 整段替换的方式："replace"（默认）重建段落的runs；"diff" 把 new_content 与原文本比较，只改写有变化的run
+    mode: Optional[Literal["replace", "diff"]] = None
+
     class Config:
         # Pydantic的配置类
         # str_strip_whitespace = True: 自动去除字符串两端的空白字符
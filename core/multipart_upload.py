@@ -0,0 +1,166 @@
+import hashlib
+import io
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, BinaryIO, Optional, Tuple, Union
+
+from .lazy_import import LazyModule
+
+oss2 = LazyModule("oss2")
+
+
+class MultipartUploader:
+    """
+    并发分片上传，支持断点续传。
+
+    文件按 part_size 切分，由 concurrency 个线程同时上传。每完成一个分片就把进度写入
+    checkpoint（oss2.ResumableStore，JSON文件），失败的分片会重试 max_retries 次。
+    同一份内容再次上传时，会根据 checkpoint 找回之前的 upload_id 和对象名，
+    通过 list_parts 确认服务端已有的分片后只上传缺失部分。
+    """
+
+    def __init__(self, part_size: int = 8 * 1024 * 1024, concurrency: int = 4,
+                 max_retries: int = 3, checkpoint_dir: Optional[str] = None):
+        self._part_size = int(part_size)
+        self.concurrency = max(1, int(concurrency))
+        self.max_retries = max(0, int(max_retries))
+        self.checkpoint_dir = checkpoint_dir
+        self._store = None
+        self._store_init_lock = threading.Lock()
+        self._store_lock = threading.Lock()
+        self._active = set()
+
+    @property
+    def part_size(self) -> int:
+        return max(oss2.defaults.min_part_size, self._part_size)
+
+    @property
+    def store(self) -> "oss2.ResumableStore":
+        """断点续传记录，首次使用时创建（同时才导入oss2）。"""
+        if self._store is None:
+            with self._store_init_lock:
+                if self._store is None:
+                    self._store = oss2.ResumableStore(root=self.checkpoint_dir, dir="docx-mcp-multipart")
+        return self._store
+
+    @staticmethod
+    def data_size(source: Union[bytes, BinaryIO]) -> int:
+        """返回字节内容或可寻址文件对象的总大小。"""
+        if isinstance(source, (bytes, bytearray, memoryview)):
+            return len(source)
+        current = source.tell()
+        size = source.seek(0, io.SEEK_END)
+        source.seek(current)
+        return size
+
+    @staticmethod
+    def checkpoint_id(source: Union[bytes, BinaryIO]) -> str:
+        """根据内容计算 checkpoint 键，同一份内容始终得到同一个键。"""
+        digest = hashlib.sha256()
+        if isinstance(source, (bytes, bytearray, memoryview)):
+            digest.update(source)
+        else:
+            source.seek(0)
+            for chunk in iter(lambda: source.read(1024 * 1024), b""):
+                digest.update(chunk)
+            source.seek(0)
+        return digest.hexdigest()
+
+    def upload(self, bucket: "oss2.Bucket", key: str, source: Union[bytes, BinaryIO]) -> Tuple[str, Any]:
+        """
+        分片上传 source 到 bucket。
+
+        :param bucket: 目标OSS bucket。
+        :param key: 对象名。若存在同一内容未完成的上传记录，则沿用记录中的对象名。
+        :param source: 字节内容或可寻址文件对象。
+        :return: (实际使用的对象名, complete_multipart_upload 的返回结果)
+        """
+        size = self.data_size(source)
+        store_key = self.checkpoint_id(source)
+        with self._store_lock:
+            if store_key in self._active:
+                # 同一内容正在被另一个请求上传，本次不参与续传，使用独立的 checkpoint
+                store_key = f"{store_key}-{hashlib.md5(key.encode('utf-8')).hexdigest()}"
+            self._active.add(store_key)
+        try:
+            return self._upload(bucket, key, source, size, store_key)
+        finally:
+            with self._store_lock:
+                self._active.discard(store_key)
+
+    def _upload(self, bucket: "oss2.Bucket", key: str, source: Union[bytes, BinaryIO], size: int, store_key: str) -> Tuple[str, Any]:
+        key, upload_id, done = self._resume_or_init(bucket, key, size, store_key)
+
+        part_count = (size + self.part_size - 1) // self.part_size
+        pending = [n for n in range(1, part_count + 1) if n not in done]
+        read_lock = threading.Lock()
+
+        def upload_one(part_number: int):
+            start = (part_number - 1) * self.part_size
+            length = min(self.part_size, size - start)
+            data = self._read_range(source, start, length, read_lock)
+            for attempt in range(self.max_retries + 1):
+                try:
+                    result = bucket.upload_part(key, upload_id, part_number, data)
+                    break
+                except (oss2.exceptions.OssError, oss2.exceptions.RequestError):
+                    if attempt == self.max_retries:
+                        raise
+            self._checkpoint_part(store_key, part_number, result.etag)
+            done[part_number] = result.etag
+
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="oss-part") as pool:
+            # 任一分片最终失败时抛出异常，checkpoint 保留以便下次续传
+            list(pool.map(upload_one, pending))
+
+        parts = [oss2.models.PartInfo(n, done[n]) for n in sorted(done)]
+        result = bucket.complete_multipart_upload(key, upload_id, parts)
+        with self._store_lock:
+            self.store.delete(store_key)
+        return key, result
+
+    def _resume_or_init(self, bucket: "oss2.Bucket", key: str, size: int, store_key: str) -> Tuple[str, str, Dict[int, str]]:
+        """读取 checkpoint 继续之前的上传，或新建一个分片上传任务。"""
+        with self._store_lock:
+            record = self.store.get(store_key)
+        if record and record.get("size") == size and record.get("part_size") == self.part_size \
+                and record.get("bucket") == bucket.bucket_name:
+            try:
+                done = {
+                    part.part_number: part.etag
+                    for part in oss2.PartIterator(bucket, record["key"], record["upload_id"])
+                }
+                return record["key"], record["upload_id"], done
+            except oss2.exceptions.NoSuchUpload:
+                pass
+
+        upload_id = bucket.init_multipart_upload(key).upload_id
+        with self._store_lock:
+            self.store.put(store_key, {
+                "bucket": bucket.bucket_name,
+                "key": key,
+                "upload_id": upload_id,
+                "size": size,
+                "part_size": self.part_size,
+                "parts": {},
+            })
+        return key, upload_id, {}
+
+    def _checkpoint_part(self, store_key: str, part_number: int, etag: str):
+        """记录一个已完成的分片。"""
+        with self._store_lock:
+            record = self.store.get(store_key)
+            if record is not None:
+                record["parts"][str(part_number)] = etag
+                self.store.put(store_key, record)
+
+    @staticmethod
+    def _read_range(source: Union[bytes, BinaryIO], start: int, length: int, lock: threading.Lock) -> bytes:
+        """读取一个分片的数据。文件对象在多个线程间共享，读取时加锁。"""
+        if isinstance(source, (bytes, bytearray, memoryview)):
+            return bytes(memoryview(source)[start:start + length])
+        if isinstance(source, io.BytesIO):
+            return bytes(source.getbuffer()[start:start + length])
+        with lock:
+            source.seek(start)
+            return source.read(length)
@@ -0,0 +1,115 @@
+import copy
+import shutil
+import struct
+import zipfile
+from typing import Dict, BinaryIO
+
+# 本地文件头：签名(4) + 固定字段(26)，其后是文件名和扩展字段
+_LOCAL_HEADER_STRUCT = struct.Struct("<4s2B4HL2L2H")
+_LOCAL_HEADER_SIGNATURE = b"PK\003\004"
+_DATA_DESCRIPTOR_FLAG = 0x08
+_ENCRYPTED_FLAG = 0x01
+_ZIP64_EXTRA_ID = 0x0001
+_COPY_CHUNK_SIZE = 1024 * 1024
+# 按原样复制条目用到的 zipfile 内部属性（CPython 3.8 ~ 3.13 均存在）
+_ZIPFILE_WRITER_ATTRS = ("fp", "filelist", "NameToInfo", "start_dir", "_didModify")
+
+
+class PackageWriter:
+    """
+    DOCX（OPC zip包）的增量写入器。
+
+    未修改的zip条目按原样复制压缩后的字节，不解压也不重新压缩；
+    只有发生变化的部件才会重新压缩写入。保存耗时因此取决于修改部件的大小，
+    而不是整个文档（尤其是图片等媒体文件）的大小。
+    zipfile 没有公开的原样复制接口，这里直接使用其内部属性；当前解释器的 zipfile 不具备这些属性时
+    rewrite 抛出 NotImplementedError，调用方回退到 python-docx 的完整保存。
+    """
+
+    @staticmethod
+    def raw_copy_supported(target: zipfile.ZipFile) -> bool:
+        """检查当前的 zipfile 实现是否具备按原样复制条目所需的内部属性。"""
+        return callable(getattr(zipfile.ZipInfo, "FileHeader", None)) and \
+            all(hasattr(target, attr) for attr in _ZIPFILE_WRITER_ATTRS)
+
+    @staticmethod
+    def rewrite(original_stream: BinaryIO, new_stream: BinaryIO, replaced_parts: Dict[str, bytes]):
+        """
+        将原始包复制到新流中，并用 replaced_parts 中的内容替换对应部件。
+
+        :param original_stream: 包含原始.docx文件内容的可寻址二进制流。
+        :param new_stream: 用于写入新文件内容的可写流。
+        :param replaced_parts: 部件名（zip条目名，如 "word/document.xml"）到新内容的映射。
+        :raises NotImplementedError: 当前的 zipfile 不支持按原样复制条目。
+        """
+        original_stream.seek(0)
+        with zipfile.ZipFile(original_stream) as source, \
+                zipfile.ZipFile(new_stream, "w", zipfile.ZIP_DEFLATED) as target:
+            if not PackageWriter.raw_copy_supported(target):
+                raise NotImplementedError("zipfile does not support copying raw entries")
+            missing = set(replaced_parts) - set(source.namelist())
+            if missing:
+                raise KeyError(f"parts not found in package: {sorted(missing)}")
+            for info in source.infolist():
+                if info.filename in replaced_parts:
+                    new_info = zipfile.ZipInfo(info.filename, date_time=info.date_time)
+                    new_info.compress_type = zipfile.ZIP_DEFLATED
+                    new_info.external_attr = info.external_attr
+                    target.writestr(new_info, replaced_parts[info.filename])
+                else:
+                    PackageWriter._copy_raw_entry(source, target, info)
+
+    @staticmethod
+    def _copy_raw_entry(source: zipfile.ZipFile, target: zipfile.ZipFile, info: zipfile.ZipInfo):
+        """把一个zip条目的压缩数据原样复制到目标包中。"""
+        if info.flag_bits & _ENCRYPTED_FLAG:
+            raise NotImplementedError(f"encrypted zip entry '{info.filename}' cannot be copied")
+
+        source_fp = source.fp
+        source_fp.seek(info.header_offset)
+        header = source_fp.read(_LOCAL_HEADER_STRUCT.size)
+        fields = _LOCAL_HEADER_STRUCT.unpack(header)
+        if fields[0] != _LOCAL_HEADER_SIGNATURE:
+            raise zipfile.BadZipFile(f"bad local file header for '{info.filename}'")
+        source_fp.seek(fields[10] + fields[11], 1)  # 跳过文件名和扩展字段
+
+        new_info = copy.copy(info)
+        # 大小和CRC已知，直接写在本地文件头中，不再使用数据描述符
+        new_info.flag_bits &= ~_DATA_DESCRIPTOR_FLAG
+        new_info.extra = PackageWriter._strip_zip64_extra(info.extra)
+        zip64 = info.file_size > zipfile.ZIP64_LIMIT or info.compress_size > zipfile.ZIP64_LIMIT
+
+        target_fp = target.fp
+        new_info.header_offset = target_fp.tell()
+        target_fp.write(new_info.FileHeader(zip64))
+        remaining = info.compress_size
+        while remaining > 0:
+            chunk = source_fp.read(min(_COPY_CHUNK_SIZE, remaining))
+            if not chunk:
+                raise zipfile.BadZipFile(f"truncated zip entry '{info.filename}'")
+            target_fp.write(chunk)
+            remaining -= len(chunk)
+
+        # 登记到目标包的中央目录
+        target.filelist.append(new_info)
+        target.NameToInfo[new_info.filename] = new_info
+        target.start_dir = target_fp.tell()
+        target._didModify = True
+
+    @staticmethod
+    def _strip_zip64_extra(extra: bytes) -> bytes:
+        """移除扩展字段中的zip64记录，由写入方按需重新生成。"""
+        result = bytearray()
+        pos = 0
+        while pos + 4 <= len(extra):
+            header_id, size = struct.unpack("<HH", extra[pos:pos + 4])
+            if header_id != _ZIP64_EXTRA_ID:
+                result += extra[pos:pos + 4 + size]
+            pos += 4 + size
+        return bytes(result)
+
+    @staticmethod
+    def copy_stream(source: BinaryIO, target: BinaryIO):
+        """把原始流完整复制到目标流（没有任何部件变化时使用）。"""
+        source.seek(0)
+        shutil.copyfileobj(source, target, _COPY_CHUNK_SIZE)
@@ -0,0 +1,340 @@
+import io
+import multiprocessing
+import os
+import sys
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import resource_tracker, shared_memory
+from typing import Dict, Any, List, Optional, Tuple, Union, BinaryIO
+
+from .docx_processor import DocxProcessor
+from .models import DocumentPatch
+
+_COPY_CHUNK_SIZE = 1024 * 1024
+
+# 传给工作进程的文档引用：("bytes", 数据) 或 ("shm", 共享内存名称, 大小)
+DocumentRef = Tuple[Any, ...]
+
+
+# Python 3.13 起 SharedMemory 支持 track=False；更早的版本在 POSIX 上创建和打开时都会登记到 resource_tracker
+_SHM_TRACK_PARAM = sys.version_info >= (3, 13)
+_SHM_AUTO_TRACKED = not _SHM_TRACK_PARAM and os.name == "posix"
+
+# concurrent.futures 的 cancel_futures 参数从 Python 3.9 开始提供
+_CANCEL_FUTURES = sys.version_info >= (3, 9)
+
+
+def _open_shm(name: Optional[str] = None, create: bool = False, size: int = 0) -> shared_memory.SharedMemory:
+    """
+    打开或创建共享内存段，不由 resource_tracker 跟踪。
+
+    生命周期由 DocxWorkerPool 显式管理（谁创建谁负责 unlink，见 _unlink_shm），
+    避免工作进程回收时段被误删，或父进程打开再删除时出现泄漏警告。
+    """
+    if _SHM_TRACK_PARAM:
+        return shared_memory.SharedMemory(name=name, create=create, size=size, track=False)
+    shm = shared_memory.SharedMemory(name=name, create=create, size=size)
+    if _SHM_AUTO_TRACKED:
+        resource_tracker.unregister(shm._name, "shared_memory")
+    return shm
+
+
+def _unlink_shm(shm: shared_memory.SharedMemory):
+    """关闭并删除 _open_shm 打开的共享内存段。"""
+    shm.close()
+    if _SHM_AUTO_TRACKED:
+        # 旧版本的 unlink() 会再次注销登记，先补登记一次保持 resource_tracker 的记录一致
+        resource_tracker.register(shm._name, "shared_memory")
+    shm.unlink()
+
+
+def _shutdown_executor(executor: ProcessPoolExecutor, wait: bool):
+    """关闭进程池并取消排队中的任务。"""
+    if _CANCEL_FUTURES:
+        executor.shutdown(wait=wait, cancel_futures=True)
+    else:
+        executor.shutdown(wait=wait)
+
+
+class SharedBufferReader(io.RawIOBase):
+    """
+    基于 memoryview 的只读可寻址流。
+
+    工作进程用它直接读取共享内存中的文档字节，避免再拷贝一份到 BytesIO。
+    """
+
+    def __init__(self, buffer: memoryview):
+        super().__init__()
+        self._buffer = buffer
+        self._pos = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._pos
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_SET:
+            pos = offset
+        elif whence == io.SEEK_CUR:
+            pos = self._pos + offset
+        elif whence == io.SEEK_END:
+            pos = len(self._buffer) + offset
+        else:
+            raise ValueError(f"invalid whence: {whence}")
+        if pos < 0:
+            raise ValueError("negative seek position")
+        self._pos = pos
+        return pos
+
+    def read(self, size: int = -1) -> bytes:
+        end = len(self._buffer) if size is None or size < 0 else min(self._pos + size, len(self._buffer))
+        if self._pos >= end:
+            return b""
+        data = bytes(self._buffer[self._pos:end])
+        self._pos = end
+        return data
+
+    def readinto(self, b) -> int:
+        data = self.read(len(b))
+        b[:len(data)] = data
+        return len(data)
+
+    def close(self):
+        self._buffer = memoryview(b"")
+        super().close()
+
+
+def _warm_worker():
+    """工作进程初始化：预先加载 python-docx 的默认模板和 oxml 元素类注册表。"""
+    import docx
+    docx.Document()
+
+
+def _noop() -> int:
+    """用于预热工作进程的空任务。"""
+    return 0
+
+
+def _run_with_document(ref: DocumentRef, func, *args):
+    """在工作进程中把文档引用还原为可读流并执行 func(stream, *args)。"""
+    if ref[0] == "bytes":
+        return func(io.BytesIO(ref[1]), *args)
+
+    shm = _open_shm(name=ref[1])
+    view = shm.buf[:ref[2]]
+    reader = SharedBufferReader(view)
+    try:
+        return func(reader, *args)
+    finally:
+        reader.close()
+        view.release()
+        shm.close()
+
+
+def _extract_in_worker(stream, engine: str) -> Dict[str, Any]:
+    """工作进程中的结构提取任务。"""
+    if engine == "docx":
+        return DocxProcessor.extract_structure_with_ids(stream)
+    return DocxProcessor.extract_structure_streaming(stream)
+
+
+def _apply_in_worker(stream, patches_data: List[Dict[str, Any]], shm_threshold: int) -> Tuple[DocumentRef, Dict[str, float]]:
+    """工作进程中的补丁应用任务，大结果通过共享内存传回，同时返回各阶段耗时。"""
+    patches = [DocumentPatch(**p) for p in patches_data]
+    output = io.BytesIO()
+    timings: Dict[str, float] = {}
+    DocxProcessor.apply_patches(stream, output, patches, timings)
+    size = output.tell()
+    if size < shm_threshold:
+        return ("bytes", output.getvalue()), timings
+
+    shm = _open_shm(create=True, size=size)
+    try:
+        shm.buf[:size] = output.getbuffer()[:size]
+    finally:
+        shm.close()
+    return ("shm", shm.name, size), timings
+
+
+def _worker_extract(ref: DocumentRef, engine: str) -> Dict[str, Any]:
+    return _run_with_document(ref, _extract_in_worker, engine)
+
+
+def _worker_apply(ref: DocumentRef, patches_data: List[Dict[str, Any]], shm_threshold: int) -> Tuple[DocumentRef, Dict[str, float]]:
+    return _run_with_document(ref, _apply_in_worker, patches_data, shm_threshold)
+
+
+class DocxWorkerPool:
+    """
+    执行 DocxProcessor 解析和打补丁任务的进程池。
+
+    - 工作进程启动时预加载 python-docx，创建进程池时即预热全部工作进程；
+    - 超过 shm_threshold 的文档通过共享内存在进程间传递，不经过pickle拷贝；
+    - 每个任务有独立超时，超时后终止并重建进程池；
+    - 每个工作进程执行 max_tasks_per_worker 个任务后自动回收（Python 3.11+）。
+    """
+
+    def __init__(self, max_workers: int, max_tasks_per_worker: int = 200,
+                 task_timeout: float = 120.0, shm_threshold: int = 1024 * 1024):
+        self.max_workers = max(1, int(max_workers))
+        self.max_tasks_per_worker = max(0, int(max_tasks_per_worker))
+        self.task_timeout = task_timeout
+        self.shm_threshold = shm_threshold
+        self._lock = threading.Lock()
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._slots = threading.BoundedSemaphore(self.max_workers)
+        self.tasks = 0
+        self.timeouts = 0
+        self.restarts = 0
+
+    def start(self):
+        """创建进程池并预热所有工作进程。"""
+        self._get_executor()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                kwargs = {
+                    "max_workers": self.max_workers,
+                    "mp_context": multiprocessing.get_context("spawn"),
+                    "initializer": _warm_worker,
+                }
+                if self.max_tasks_per_worker and sys.version_info >= (3, 11):
+                    kwargs["max_tasks_per_child"] = self.max_tasks_per_worker
+                executor = ProcessPoolExecutor(**kwargs)
+                # 提交空任务，让所有工作进程立即启动并完成初始化
+                for future in [executor.submit(_noop) for _ in range(self.max_workers)]:
+                    future.result()
+                self._executor = executor
+            return self._executor
+
+    def _restart(self, executor: ProcessPoolExecutor):
+        """终止指定的进程池（超时或崩溃后调用），下次提交任务时重新创建。"""
+        with self._lock:
+            if self._executor is not executor:
+                return
+            self._executor = None
+            self.restarts += 1
+        for process in list((getattr(executor, "_processes", None) or {}).values()):
+            process.terminate()
+        _shutdown_executor(executor, wait=False)
+
+    def _submit(self, func, *args, retry: bool = True):
+        # 同时提交的任务数不超过工作进程数，排队发生在调用线程中，超时只计算执行时间
+        with self._slots:
+            executor = self._get_executor()
+            with self._lock:
+                self.tasks += 1
+            try:
+                future = executor.submit(func, *args)
+                return future.result(timeout=self.task_timeout)
+            except FutureTimeoutError:
+                with self._lock:
+                    self.timeouts += 1
+                self._restart(executor)
+                raise TimeoutError(f"document task exceeded {self.task_timeout}s")
+            except BrokenProcessPool:
+                with self._lock:
+                    restarted_elsewhere = self._executor is not executor
+                self._restart(executor)
+                if not (retry and restarted_elsewhere):
+                    raise
+        # 进程池因其他任务超时被重建，本任务只是受到牵连，重新提交一次
+        return self._submit(func, *args, retry=False)
+
+    def _share(self, content: Union[bytes, memoryview, BinaryIO]) -> Tuple[DocumentRef, Optional[shared_memory.SharedMemory]]:
+        """把文档内容包装为工作进程可用的引用，大文档放入共享内存。文件对象按块复制。"""
+        is_file = hasattr(content, "read")
+        if is_file:
+            size = content.seek(0, io.SEEK_END)
+            content.seek(0)
+        else:
+            size = len(content)
+        if size == 0 or size < self.shm_threshold:
+            return ("bytes", content.read() if is_file else bytes(content)), None
+
+        shm = _open_shm(create=True, size=size)
+        if is_file:
+            offset = 0
+            while offset < size:
+                chunk = content.read(min(_COPY_CHUNK_SIZE, size - offset))
+                if not chunk:
+                    break
+                shm.buf[offset:offset + len(chunk)] = chunk
+                offset += len(chunk)
+        else:
+            shm.buf[:size] = content
+        return ("shm", shm.name, size), shm
+
+    @staticmethod
+    def _release(shm: Optional[shared_memory.SharedMemory]):
+        if shm is not None:
+            _unlink_shm(shm)
+
+    def extract_structure(self, content: Union[bytes, memoryview, BinaryIO], engine: str = "streaming") -> Dict[str, Any]:
+        """
+        在工作进程中提取文档结构。
+
+        :param content: .docx 文件的字节内容或可寻址文件对象。
+        :param engine: "streaming" 或 "docx"，与 DocxProcessor 的两种提取方式对应。
+        :return: 一个代表文档结构的字典。
+        """
+        ref, shm = self._share(content)
+        try:
+            return self._submit(_worker_extract, ref, engine)
+        finally:
+            self._release(shm)
+
+    def apply_patches(self, content: Union[bytes, memoryview, BinaryIO], patches: List[DocumentPatch],
+                      timings: Optional[Dict[str, float]] = None) -> io.BytesIO:
+        """
+        在工作进程中应用补丁。
+
+        :param content: 原始 .docx 文件的字节内容或可寻址文件对象。
+        :param patches: 一个包含修改指令的列表。
+        :param timings: 可选，传入字典时写入工作进程中各阶段的耗时（秒）。
+        :return: 包含修改后文件内容的BytesIO（已定位到开头）。
+        """
+        ref, shm = self._share(content)
+        try:
+            result, worker_timings = self._submit(_worker_apply, ref, [p.model_dump() for p in patches], self.shm_threshold)
+        finally:
+            self._release(shm)
+        if timings is not None:
+            timings.update(worker_timings)
+
+        if result[0] == "bytes":
+            return io.BytesIO(result[1])
+        out_shm = _open_shm(name=result[1])
+        view = out_shm.buf[:result[2]]
+        try:
+            return io.BytesIO(view)
+        finally:
+            view.release()
+            _unlink_shm(out_shm)
+
+    def shutdown(self):
+        """关闭进程池。"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            _shutdown_executor(executor, wait=True)
+
+    def stats(self) -> Dict[str, Any]:
+        """返回进程池的运行统计。"""
+        with self._lock:
+            return {
+                "max_workers": self.max_workers,
+                "max_tasks_per_worker": self.max_tasks_per_worker,
+                "task_timeout": self.task_timeout,
+                "running": self._executor is not None,
+                "tasks": self.tasks,
+                "timeouts": self.timeouts,
+                "restarts": self.restarts,
+            }
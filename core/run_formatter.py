@@ -0,0 +1,186 @@
+import bisect
+import copy
+import difflib
+import os
+from typing import List, Optional, Tuple
+
+from docx.oxml import OxmlElement
+from docx.oxml.ns import qn
+from docx.oxml.text.paragraph import CT_P
+from docx.oxml.text.run import CT_R
+
+# 计入 Run.text 的子元素；w:br 只有文本换行类型才计入
+_TEXT_TAGS = frozenset(qn(tag) for tag in ("w:t", "w:tab", "w:ptab", "w:br", "w:cr", "w:noBreakHyphen"))
+_BR = qn("w:br")
+_BR_TYPE = qn("w:type")
+_RPR = qn("w:rPr")
+
+# 差异比较的规模上限（两段变化部分长度之积），超过时把整个变化部分作为一次替换
+_DIFF_MAX_WORK = 4_000_000
+
+# (run文本, 该run的 w:rPr 元素或 None)
+RunSnapshot = Tuple[str, Optional[object]]
+
+
+class RunFormatter:
+    """
+    基于 w:rPr 深拷贝的run格式引擎。
+
+    直接在XML层面读取run的文本和 w:rPr 元素，新建run时整体复制原 w:rPr，
+    不经过 python-docx 的属性代理逐项读写，因此加粗、字体（含东亚字体）、高亮、
+    字符样式等所有格式都会原样保留。
+    """
+
+    @staticmethod
+    def snapshot(p: CT_P) -> List[RunSnapshot]:
+        """读取段落中所有直接子run的文本和格式元素。"""
+        return [(r.text, r.rPr) for r in p.r_lst]
+
+    @staticmethod
+    def remove_runs(p: CT_P):
+        """移除段落中所有直接子run（超链接等容器中的run不受影响）。"""
+        for r in p.r_lst:
+            p.remove(r)
+
+    @staticmethod
+    def append_run(p: CT_P, text: str, rPr=None) -> CT_R:
+        """
+        在段落末尾追加一个run，复制 rPr 作为其格式。
+
+        文本中的制表符和换行符与 python-docx 的 add_run 一样转换为 w:tab / w:br。
+        """
+        r = p.add_r()
+        if rPr is not None:
+            r.insert(0, copy.deepcopy(rPr))
+        if text:
+            r.text = text
+        return r
+
+
+def _is_text_child(child) -> bool:
+    if child.tag not in _TEXT_TAGS:
+        return False
+    return child.tag != _BR or child.get(_BR_TYPE, "textWrapping") == "textWrapping"
+
+
+class RunOffsetTable:
+    """
+    段落文本字符偏移到run的映射表，用于最小范围的文本修改。
+
+    偏移与提取结果中段落的 text 一致（包括超链接中的run）。replace() 只改写与区间重叠的run，
+    其他run（以及受影响run中的图片、域代码等非文本内容）保持原样，表在每次修改后同步更新。
+    """
+
+    def __init__(self, p: CT_P):
+        self.p = p
+        self.runs: List[CT_R] = p.xpath("./w:r | ./w:hyperlink/w:r")
+        self.texts: List[str] = [r.text for r in self.runs]
+        self.starts: List[int] = []
+        self._reindex(0)
+
+    @property
+    def text(self) -> str:
+        return "".join(self.texts)
+
+    @property
+    def length(self) -> int:
+        return self.starts[-1] + len(self.texts[-1]) if self.runs else 0
+
+    def _reindex(self, index: int):
+        """从第 index 个run开始重新计算起始偏移。"""
+        del self.starts[index:]
+        pos = self.starts[-1] + len(self.texts[index - 1]) if index else 0
+        for text in self.texts[index:]:
+            self.starts.append(pos)
+            pos += len(text)
+
+    def _locate(self, offset: int, insert: bool) -> int:
+        """
+        返回修改起点所在的run。
+
+        替换时取包含第 offset 个字符的run；插入时取 offset 之前的字符所在的run，沿用前文的格式。
+        """
+        if not insert:
+            return bisect.bisect_right(self.starts, offset) - 1
+        i = bisect.bisect_left(self.starts, offset) - 1
+        while i >= 0 and not self.texts[i]:
+            i -= 1
+        if i >= 0:
+            return i
+        # offset 为0（或前面只有空run）：取第一个有文本的run
+        return next((j for j, text in enumerate(self.texts) if text), 0)
+
+    def replace(self, start: int, end: int, text: str):
+        """把段落文本的 [start, end) 替换为 text。"""
+        if not 0 <= start <= end <= self.length:
+            raise ValueError(f"Character range [{start}, {end}) is out of bounds for text of length {self.length}")
+        if start == end and not text:
+            return
+        if not self.runs:
+            self.runs = [RunFormatter.append_run(self.p, text)]
+            self.texts = [text]
+            self._reindex(0)
+            return
+
+        first = self._locate(start, start == end)
+        removed = []
+        j = first
+        while j < len(self.runs) and (j == first or self.starts[j] < end):
+            old = self.texts[j]
+            offset = self.starts[j]
+            tail = old[end - offset:] if end - offset < len(old) else ""
+            new = old[:start - offset] + text + tail if j == first else tail
+            if new != old:
+                RunOffsetTable._set_run_text(self.runs[j], new)
+                self.texts[j] = new
+            if not new and all(child.tag == _RPR for child in self.runs[j]):
+                removed.append(j)
+            j += 1
+
+        for index in reversed(removed):
+            run = self.runs.pop(index)
+            run.getparent().remove(run)
+            del self.texts[index]
+        self._reindex(first)
+
+    def apply_diff(self, new_text: str) -> int:
+        """
+        把段落文本改为 new_text，只改写与原文本不同的部分。
+
+        先去掉公共前后缀，再对中间部分做字符级序列比较，从后向前应用各处修改。
+
+        :return: 实际应用的修改处数。
+        """
+        old_text = self.text
+        if old_text == new_text:
+            return 0
+        prefix = len(os.path.commonprefix([old_text, new_text]))
+        limit = min(len(old_text), len(new_text)) - prefix
+        suffix = 0
+        while suffix < limit and old_text[-1 - suffix] == new_text[-1 - suffix]:
+            suffix += 1
+        old_mid = old_text[prefix:len(old_text) - suffix]
+        new_mid = new_text[prefix:len(new_text) - suffix]
+
+        if len(old_mid) * len(new_mid) > _DIFF_MAX_WORK:
+            ops = [("replace", 0, len(old_mid), 0, len(new_mid))]
+        else:
+            matcher = difflib.SequenceMatcher(None, old_mid, new_mid, autojunk=False)
+            ops = [op for op in matcher.get_opcodes() if op[0] != "equal"]
+        for _, i1, i2, j1, j2 in reversed(ops):
+            self.replace(prefix + i1, prefix + i2, new_mid[j1:j2])
+        return len(ops)
+
+    @staticmethod
+    def _set_run_text(r: CT_R, text: str):
+        """替换run的文本内容，保留 w:rPr 和非文本子元素（图片、域代码、分页符等）的位置。"""
+        text_children = [child for child in r if _is_text_child(child)]
+        index = r.index(text_children[0]) if text_children else len(r)
+        for child in text_children:
+            r.remove(child)
+        if not text:
+            return
+        scratch = OxmlElement("w:r")
+        scratch.text = text
+        for offset, child in enumerate(list(scratch)):
+            r.insert(index + offset, child)
@@ -0,0 +1,174 @@
+import math
+import re
+import threading
+from collections import Counter, OrderedDict
+from typing import Dict, Any, List, Optional, Tuple
+
+# 中日韩文字（汉字、假名、谚文）按字切分，其余按连续的字母数字切分为词
+_CJK = "\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\u3040-\u30ff\uac00-\ud7af"
+_TOKEN_RE = re.compile(f"[{_CJK}]+|[^\\W_{_CJK}]+")
+_CJK_RE = re.compile(f"[{_CJK}]")
+
+# BM25 参数
+_K1 = 1.2
+_B = 0.75
+# 元素文本包含完整查询串时的得分加成
+_PHRASE_BOOST = 1.5
+
+
+class SearchIndex:
+    """
+    文档元素的倒排索引。
+
+    索引单元为段落（p_N）和表格单元格（tbl_N_rRcC），与修改指令使用的ID一致。
+    英文等按词切分并统一小写；中日韩文字没有空格分词，同时索引单字和相邻两字（bigram），
+    查询中两个字以上的中文片段用 bigram 匹配，单字用单字匹配。结果按 BM25 排序。
+    """
+
+    def __init__(self, structure: Dict[str, Any]):
+        self.version = structure.get("version")
+        self.ids: List[str] = []
+        self.types: List[str] = []
+        self.tables: List[Optional[str]] = []
+        self.texts: List[str] = []
+        self.lowered: List[str] = []
+        self.lengths: List[int] = []
+        self.postings: Dict[str, List[Tuple[int, int]]] = {}
+
+        for element in structure["elements"]:
+            if element["type"] == "table":
+                for row in element["rows"]:
+                    for cell in row["cells"]:
+                        self._add(cell["id"], "cell", element["id"], cell.get("text") or "")
+            else:
+                self._add(element["id"], element["type"], None, element.get("text") or "")
+        self.average_length = (sum(self.lengths) / len(self.lengths)) if self.lengths else 0.0
+
+    @staticmethod
+    def tokenize(text: str, query: bool = False) -> List[str]:
+        """
+        切分文本。
+
+        索引时中文片段产生全部单字和bigram；查询时两字以上的片段只产生bigram，减少无关匹配。
+        """
+        tokens = []
+        for match in _TOKEN_RE.finditer(text.lower()):
+            token = match.group()
+            if not _CJK_RE.match(token):
+                tokens.append(token)
+                continue
+            bigrams = [token[i:i + 2] for i in range(len(token) - 1)]
+            if query:
+                tokens.extend(bigrams or [token])
+            else:
+                tokens.extend(token)
+                tokens.extend(bigrams)
+        return tokens
+
+    def _add(self, element_id: str, element_type: str, table_id: Optional[str], text: str):
+        tokens = SearchIndex.tokenize(text)
+        doc = len(self.ids)
+        self.ids.append(element_id)
+        self.types.append(element_type)
+        self.tables.append(table_id)
+        self.texts.append(text)
+        self.lowered.append(text.lower())
+        self.lengths.append(len(tokens))
+        for term, count in Counter(tokens).items():
+            self.postings.setdefault(term, []).append((doc, count))
+
+    def search(self, query: str, limit: int = 10, element_type: Optional[str] = None,
+               snippet_length: int = 80) -> Dict[str, Any]:
+        """
+        查询并返回排好序的元素。
+
+        :param query: 查询文本，多个词之间为“或”关系，包含全部词、以及包含完整查询串的元素排名靠前。
+        :param limit: 最多返回的结果数。
+        :param element_type: "paragraph" 或 "cell" 时只返回该类型的元素。
+        :param snippet_length: 摘要的最大字符数。
+        :return: {"total_matches": 匹配的元素总数, "results": [{"id", "type", "score", "snippet", ...}]}
+        """
+        terms = list(dict.fromkeys(SearchIndex.tokenize(query, query=True)))
+        scores: Dict[int, float] = {}
+        total_docs = len(self.ids)
+        for term in terms:
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (total_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+            for doc, tf in postings:
+                if element_type and self.types[doc] != element_type:
+                    continue
+                norm = 1 - _B + _B * self.lengths[doc] / (self.average_length or 1)
+                scores[doc] = scores.get(doc, 0.0) + idf * tf * (_K1 + 1) / (tf + _K1 * norm)
+
+        phrase = query.strip().lower()
+        if phrase:
+            for doc in scores:
+                if phrase in self.lowered[doc]:
+                    scores[doc] *= _PHRASE_BOOST
+
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:max(0, limit)]
+        results = []
+        for doc, score in ranked:
+            result = {
+                "id": self.ids[doc],
+                "type": self.types[doc],
+                "score": round(score, 4),
+                "snippet": SearchIndex._snippet(self.texts[doc], self.lowered[doc], phrase, terms, snippet_length),
+            }
+            if self.tables[doc]:
+                result["table_id"] = self.tables[doc]
+            results.append(result)
+        return {"total_matches": len(scores), "results": results}
+
+    @staticmethod
+    def _snippet(text: str, lowered: str, phrase: str, terms: List[str], length: int) -> str:
+        """截取包含第一个命中位置的文本片段。"""
+        if len(text) <= length:
+            return text
+        positions = [lowered.find(t) for t in [phrase] + terms if t]
+        positions = [p for p in positions if p >= 0]
+        hit = min(positions) if positions else 0
+        start = max(0, min(hit - length // 4, len(text) - length))
+        snippet = text[start:start + length]
+        return ("…" if start > 0 else "") + snippet + ("…" if start + length < len(text) else "")
+
+
+class SearchIndexCache:
+    """按文档内容哈希缓存 SearchIndex 的LRU缓存，条目数量有上限。"""
+
+    def __init__(self, max_entries: int = 16):
+        self.max_entries = max(0, int(max_entries))
+        self._lock = threading.Lock()
+        self._indexes: "OrderedDict[str, SearchIndex]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, digest: str) -> Optional[SearchIndex]:
+        with self._lock:
+            index = self._indexes.get(digest)
+            if index is None:
+                self.misses += 1
+                return None
+            self._indexes.move_to_end(digest)
+            self.hits += 1
+            return index
+
+    def put(self, digest: str, index: SearchIndex):
+        if self.max_entries == 0:
+            return
+        with self._lock:
+            self._indexes[digest] = index
+            self._indexes.move_to_end(digest)
+            while len(self._indexes) > self.max_entries:
+                self._indexes.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._indexes),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
@@ -0,0 +1,165 @@
+import io
+import threading
+import time
+import uuid
+import zipfile
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional
+
+from .docx_processor import DocxProcessor
+from .lazy_package import LazyPackage
+from .models import DocumentPatch
+
+
+class EditingSession:
+    """
+    一个打开中的编辑会话。
+
+    保存原始文件字节和解析后的 Document 对象，多次打补丁直接作用在同一个 Document 上，
+    只在保存时序列化一次。同一会话的操作通过 lock 串行执行。
+    """
+
+    def __init__(self, session_id: str, content: bytes):
+        self.session_id = session_id
+        self.original = content
+        self.document = LazyPackage.open(io.BytesIO(content))
+        self.lock = threading.Lock()
+        self.created_at = time.monotonic()
+        self.last_access = self.created_at
+        self.edits = 0
+        self.changed = False
+        self.estimated_size = self.estimate_size(content)
+
+    @staticmethod
+    def estimate_size(content: bytes) -> int:
+        """
+        估算会话占用的内存：原始字节加上XML部件解压后的大小。
+
+        文档按需加载，图片等二进制部件只在原始字节中占用空间；XML部件访问时会解析成元素树，
+        解压后的大小可以作为其内存占用的近似值。
+        """
+        try:
+            with zipfile.ZipFile(io.BytesIO(content)) as package:
+                unpacked = sum(
+                    info.file_size for info in package.infolist() if info.filename.endswith((".xml", ".rels"))
+                )
+        except zipfile.BadZipFile:
+            unpacked = 0
+        return len(content) + unpacked
+
+    def apply(self, patches: List[DocumentPatch]) -> List[str]:
+        """
+        应用补丁，返回实际修改了的元素ID。
+
+        一批补丁是原子的：出错时 DocxProcessor 已撤销本批所有修改，会话文档和计数保持不变。
+        """
+        with self.lock:
+            applied: Optional[List[str]] = None
+            try:
+                applied = DocxProcessor.apply_patches_to_document(self.document, patches)
+                return applied
+            finally:
+                # 只按实际生效的修改更新状态
+                if applied is not None:
+                    self.edits += 1
+                    self.changed = self.changed or bool(applied)
+
+    def find_and_replace(self, find: str, replacement: str, **options) -> Dict[str, Any]:
+        """在会话文档中查找替换，参数见 DocxProcessor.find_and_replace。"""
+        with self.lock:
+            result: Optional[Dict[str, Any]] = None
+            try:
+                result = DocxProcessor.find_and_replace(self.document, find, replacement, **options)
+                return result
+            finally:
+                if result is not None:
+                    self.edits += 1
+                    self.changed = self.changed or bool(result["replacements"])
+
+    def save(self) -> io.BytesIO:
+        """把当前文档保存为新的 .docx，返回已定位到开头的 BytesIO。"""
+        with self.lock:
+            output = io.BytesIO()
+            DocxProcessor.save_document(self.document, io.BytesIO(self.original), output, self.changed)
+            output.seek(0)
+            return output
+
+
+class SessionStore:
+    """
+    编辑会话的进程内存储。
+
+    - 会话超过 ttl 秒未被访问即过期；
+    - 会话数量或估算的总内存超过上限时，按最近最少使用的顺序淘汰；
+    过期和淘汰在每次打开、访问会话时顺带检查，不需要后台线程。
+    """
+
+    def __init__(self, ttl: float = 1800.0, max_sessions: int = 32, max_memory: int = 1024 * 1024 * 1024):
+        self.ttl = ttl
+        self.max_sessions = max(1, int(max_sessions))
+        self.max_memory = max(0, int(max_memory))
+        self._lock = threading.Lock()
+        self._sessions: "OrderedDict[str, EditingSession]" = OrderedDict()
+        self.opened = 0
+        self.expired = 0
+        self.evictions = 0
+
+    def open(self, content: bytes) -> EditingSession:
+        """解析文档并创建会话。文档本身超过内存上限时抛出 MemoryError。"""
+        session = EditingSession(uuid.uuid4().hex, content)
+        if self.max_memory and session.estimated_size > self.max_memory:
+            raise MemoryError(
+                f"document needs about {session.estimated_size} bytes, exceeding the session memory limit of {self.max_memory} bytes"
+            )
+        with self._lock:
+            self._sessions[session.session_id] = session
+            self.opened += 1
+            self._evict_locked(time.monotonic())
+        return session
+
+    def get(self, session_id: str) -> Optional[EditingSession]:
+        """获取会话并刷新其访问时间，不存在或已过期时返回 None。"""
+        now = time.monotonic()
+        with self._lock:
+            self._evict_locked(now)
+            session = self._sessions.get(session_id)
+            if session is None:
+                return None
+            session.last_access = now
+            self._sessions.move_to_end(session_id)
+            return session
+
+    def close(self, session_id: str) -> bool:
+        """关闭会话，返回会话是否存在。"""
+        with self._lock:
+            return self._sessions.pop(session_id, None) is not None
+
+    def _evict_locked(self, now: float):
+        """清理过期会话，再按LRU淘汰超出数量或内存上限的会话（调用方需持有锁）。"""
+        if self.ttl > 0:
+            stale = [sid for sid, s in self._sessions.items() if now - s.last_access > self.ttl]
+            for sid in stale:
+                del self._sessions[sid]
+                self.expired += 1
+        total = sum(s.estimated_size for s in self._sessions.values())
+        while self._sessions and (
+            len(self._sessions) > self.max_sessions or (self.max_memory and total > self.max_memory)
+        ):
+            _, session = self._sessions.popitem(last=False)
+            total -= session.estimated_size
+            self.evictions += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """返回会话数量、估算内存占用以及过期/淘汰计数。"""
+        with self._lock:
+            self._evict_locked(time.monotonic())
+            return {
+                "sessions": len(self._sessions),
+                "max_sessions": self.max_sessions,
+                "estimated_memory": sum(s.estimated_size for s in self._sessions.values()),
+                "max_memory": self.max_memory,
+                "ttl": self.ttl,
+                "opened": self.opened,
+                "expired": self.expired,
+                "evictions": self.evictions,
+            }
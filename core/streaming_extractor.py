@@ -0,0 +1,272 @@
+import posixpath
+import zipfile
+from typing import Dict, Any, Iterator, List, Optional, Tuple, BinaryIO
+
+from lxml import etree
+from docx.exceptions import InvalidXmlError
+from docx.oxml.simpletypes import ST_OnOff
+from docx.parts.styles import StylesPart
+from docx.styles import BabelFish
+
+from .structure_delta import StructureDelta
+from .table_engine import TableLayout
+
+# WordprocessingML 命名空间
+W_NS = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+_W = "{%s}" % W_NS
+_W14_PARA_ID = "{http://schemas.microsoft.com/office/word/2010/wordml}paraId"
+# 参与元素编号的顶级元素：标签 -> 元素类型
+_BODY_ELEMENT_KINDS = {_W + "p": "paragraph", _W + "tbl": "table"}
+# 段落稳定锚点的前缀，补丁可以用 para:<w14:paraId> 代替 p_N 定位段落
+ANCHOR_PREFIX = "para:"
+REL_NS = "http://schemas.openxmlformats.org/package/2006/relationships"
+_REL = "{%s}" % REL_NS
+
+RT_OFFICE_DOCUMENT = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument"
+RT_STYLES = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles"
+
+
+class StreamingExtractor:
+    """
+    基于 lxml iterparse 的流式文档结构提取器。
+
+    只从zip包中读取主文档部件（通常为 word/document.xml）和样式部件，
+    不构建 python-docx 的 Document 对象，也不会加载图片等媒体文件。
+    解析过程中逐个处理并清理已完成的段落和表格行，内存占用与文档大小基本无关。
+    生成的元素ID与 DocxProcessor.extract_structure_with_ids 完全一致。
+    """
+
+    @staticmethod
+    def extract_structure(file_stream: BinaryIO) -> Dict[str, Any]:
+        """
+        流式解析DOCX文件并返回与 DocxProcessor.extract_structure_with_ids 相同格式的结构。
+
+        :param file_stream: 包含.docx文件内容的可寻址二进制流。
+        :return: 一个代表文档结构的字典。
+        """
+        return StructureDelta.build(list(StreamingExtractor.iter_elements(file_stream)))
+
+    @staticmethod
+    def body_element_kind(tag) -> Optional[str]:
+        """
+        返回顶级元素的类型："paragraph"（w:p）、"table"（w:tbl），其他元素返回 None。
+
+        结构提取、补丁定位、查找替换都用它判断顶级元素，保证 p_N / tbl_N 的编号在各处一致。
+        """
+        return _BODY_ELEMENT_KINDS.get(tag)
+
+    @staticmethod
+    def iter_elements(file_stream: BinaryIO) -> Iterator[Dict[str, Any]]:
+        """
+        逐个生成文档顶级元素（段落和表格）的字典表示，每个元素带有内容哈希。
+
+        :param file_stream: 包含.docx文件内容的可寻址二进制流。
+        """
+        with zipfile.ZipFile(file_stream) as package:
+            document_part, styles_part = StreamingExtractor._locate_parts(package)
+            styles = StreamingExtractor._load_paragraph_styles(package, styles_part)
+            with package.open(document_part) as xml_stream:
+                for element in StreamingExtractor._iter_body(xml_stream, styles):
+                    yield StructureDelta.with_hash(element)
+
+    @staticmethod
+    def iter_chunks(file_stream: BinaryIO, chunk_size: int) -> Iterator[List[Dict[str, Any]]]:
+        """
+        按每块 chunk_size 个顶级元素分块生成元素列表，内存中只保留当前块。
+
+        :param file_stream: 包含.docx文件内容的可寻址二进制流。
+        :param chunk_size: 每块的元素数量。
+        """
+        chunk: List[Dict[str, Any]] = []
+        for element in StreamingExtractor.iter_elements(file_stream):
+            chunk.append(element)
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    @staticmethod
+    def _locate_parts(package: zipfile.ZipFile) -> Tuple[str, Optional[str]]:
+        """通过包关系找到主文档部件和样式部件的名称。"""
+        names = set(package.namelist())
+        document_part = StreamingExtractor._find_relationship_target(
+            package, "_rels/.rels", "", RT_OFFICE_DOCUMENT
+        ) or "word/document.xml"
+        if document_part not in names:
+            raise KeyError(f"main document part '{document_part}' not found in package")
+
+        base_dir, base_name = posixpath.split(document_part)
+        rels_name = posixpath.join(base_dir, "_rels", base_name + ".rels")
+        styles_part = StreamingExtractor._find_relationship_target(package, rels_name, base_dir, RT_STYLES)
+        if styles_part not in names:
+            styles_part = None
+        return document_part, styles_part
+
+    @staticmethod
+    def _find_relationship_target(package: zipfile.ZipFile, rels_name: str, base_dir: str, reltype: str) -> Optional[str]:
+        """在 .rels 部件中查找指定类型关系的目标部件名。"""
+        try:
+            rels_xml = package.read(rels_name)
+        except KeyError:
+            return None
+        root = etree.fromstring(rels_xml)
+        for rel in root.iter(_REL + "Relationship"):
+            if rel.get("Type") == reltype and rel.get("TargetMode") != "External":
+                target = rel.get("Target", "")
+                if target.startswith("/"):
+                    return posixpath.normpath(target.lstrip("/"))
+                return posixpath.normpath(posixpath.join(base_dir, target))
+        return None
+
+    @staticmethod
+    def _load_paragraph_styles(package: zipfile.ZipFile, styles_part: Optional[str]) -> Dict[str, Any]:
+        """
+        读取段落样式表，返回 {"by_id": {styleId: 名称}, "default": 默认段落样式名称}。
+
+        与 python-docx 的规则一致：样式ID不存在或类型不是段落时回退到默认段落样式；
+        文档没有样式部件时使用 python-docx 自带的默认样式模板。
+        """
+        if styles_part is not None:
+            styles_xml = package.read(styles_part)
+        else:
+            styles_xml = StylesPart._default_styles_xml()
+        root = etree.fromstring(styles_xml)
+
+        by_id: Dict[str, Optional[str]] = {}
+        seen_ids = set()
+        default_name = None
+        for style in root.iterchildren(_W + "style"):
+            style_id = style.get(_W + "styleId")
+            style_type = style.get(_W + "type", "paragraph")
+            name_el = style.find(_W + "name")
+            name = None
+            if name_el is not None and name_el.get(_W + "val") is not None:
+                name = BabelFish.internal2ui(name_el.get(_W + "val"))
+            # 同一个ID只取第一个定义，与 python-docx 的查找行为一致
+            if style_id is not None and style_id not in seen_ids:
+                seen_ids.add(style_id)
+                if style_type == "paragraph":
+                    by_id[style_id] = name
+            if style_type == "paragraph" and StreamingExtractor._is_on(style.get(_W + "default")):
+                # 规范要求取文档顺序中的最后一个默认样式
+                default_name = name
+        return {"by_id": by_id, "default": default_name}
+
+    @staticmethod
+    def _is_on(value: Optional[str]) -> bool:
+        """按 python-docx 的 ST_OnOff 规则解析开关属性（区分大小写），缺省或取值无效时视为关闭。"""
+        if value is None:
+            return False
+        try:
+            return ST_OnOff.convert_from_xml(value)
+        except InvalidXmlError:
+            return False
+
+    @staticmethod
+    def _iter_body(xml_stream, styles: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+        """使用 iterparse 遍历 w:body，处理完一个元素就立即清理。"""
+        element_counter = 0
+        depth = 0
+        body_depth = None
+        table_state = None
+
+        context = etree.iterparse(
+            xml_stream, events=("start", "end"), remove_blank_text=False, huge_tree=True, resolve_entities=False
+        )
+        for event, elem in context:
+            if event == "start":
+                depth += 1
+                if body_depth is None and elem.tag == _W + "body":
+                    body_depth = depth
+                elif body_depth is not None and depth == body_depth + 1 and \
+                        StreamingExtractor.body_element_kind(elem.tag) == "table":
+                    table_state = {
+                        "layout": TableLayout(f"tbl_{element_counter}", StreamingExtractor.paragraph_text),
+                        "rows": [],
+                    }
+                continue
+
+            depth -= 1
+            if body_depth is None:
+                continue
+
+            if depth == body_depth + 1 and table_state is not None and elem.tag == _W + "tr":
+                # 表格行：立即解析并清理，避免整张大表留在内存中
+                table_state["rows"].append(table_state["layout"].add_row(elem))
+                StreamingExtractor._release(elem)
+            elif depth == body_depth:
+                kind = StreamingExtractor.body_element_kind(elem.tag)
+                if kind == "paragraph":  # 如果是段落
+                    paragraph_data = {
+                        "id": f"p_{element_counter}",
+                        "type": "paragraph",
+                        "text": StreamingExtractor.paragraph_text(elem),
+                        "style": StreamingExtractor._paragraph_style(elem, styles),
+                    }
+                    para_id = elem.get(_W14_PARA_ID)
+                    if para_id:
+                        paragraph_data["anchor"] = ANCHOR_PREFIX + para_id
+                    yield paragraph_data
+                    element_counter += 1
+                elif kind == "table" and table_state is not None:  # 如果是表格
+                    yield {
+                        "id": table_state["layout"].table_id,
+                        "type": "table",
+                        "rows": table_state["rows"],
+                    }
+                    table_state = None
+                    element_counter += 1
+                StreamingExtractor._release(elem)
+            elif depth < body_depth:
+                break
+
+    @staticmethod
+    def paragraph_text(p) -> str:
+        """按 python-docx Paragraph.text 的规则计算段落文本。"""
+        parts = []
+        for child in p:
+            tag = child.tag
+            if tag == _W + "r":
+                parts.append(StreamingExtractor._run_text(child))
+            elif tag == _W + "hyperlink":
+                for r in child.iterchildren(_W + "r"):
+                    parts.append(StreamingExtractor._run_text(r))
+        return "".join(parts)
+
+    @staticmethod
+    def _run_text(r) -> str:
+        """按 python-docx Run.text 的规则计算run文本。"""
+        parts = []
+        for child in r:
+            tag = child.tag
+            if tag == _W + "t":
+                parts.append(child.text or "")
+            elif tag == _W + "tab" or tag == _W + "ptab":
+                parts.append("\t")
+            elif tag == _W + "br":
+                if child.get(_W + "type", "textWrapping") == "textWrapping":
+                    parts.append("\n")
+            elif tag == _W + "cr":
+                parts.append("\n")
+            elif tag == _W + "noBreakHyphen":
+                parts.append("-")
+        return "".join(parts)
+
+    @staticmethod
+    def _paragraph_style(p, styles: Dict[str, Any]) -> Optional[str]:
+        """解析段落样式名称，找不到时回退到默认段落样式。"""
+        p_style = p.find(f"{_W}pPr/{_W}pStyle")
+        style_id = p_style.get(_W + "val") if p_style is not None else None
+        if style_id and style_id in styles["by_id"]:
+            return styles["by_id"][style_id]
+        return styles["default"]
+
+    @staticmethod
+    def _release(elem):
+        """清理已处理的元素及其之前的兄弟节点，释放内存。"""
+        elem.clear(keep_tail=False)
+        parent = elem.getparent()
+        if parent is not None:
+            while elem.getprevious() is not None:
+                del parent[0]
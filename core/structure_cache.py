@@ -0,0 +1,105 @@
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple
+
+
+class StructureCache:
+    """
+    进程内的文档结构缓存（LRU）。
+
+    一级键为 (URL, ETag)，用于在不重新下载的情况下快速定位内容哈希；
+    二级键为文档字节的 SHA-256 哈希，对应已解析好的 {"elements": [...], "version": ...} 结构；
+    另外按结构版本号建立索引，用于增量提取时找回上一个版本的结构。
+    缓存条目数量有上限，超出后按最近最少使用的顺序淘汰。
+    返回的结构对象在调用方之间共享，调用方应将其视为只读。
+    """
+
+    def __init__(self, max_entries: int = 64):
+        self.max_entries = max(0, int(max_entries))
+        self._lock = threading.Lock()
+        self._structures: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._url_index: Dict[str, Tuple[str, str]] = {}
+        self._version_index: Dict[str, str] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def lookup_url(self, url: str) -> Optional[Tuple[str, str]]:
+        """
+        根据URL返回上次下载时记录的 (etag, content_hash)。
+
+        仅当对应的结构仍在缓存中时才返回，便于调用方发起条件请求（If-None-Match）。
+        """
+        with self._lock:
+            entry = self._url_index.get(url)
+            if entry is None or entry[1] not in self._structures:
+                return None
+            return entry
+
+    def remember_url(self, url: str, etag: Optional[str], digest: str):
+        """记录URL与ETag、内容哈希之间的映射。没有ETag时不记录。"""
+        if not etag or self.max_entries == 0:
+            return
+        with self._lock:
+            self._url_index[url] = (etag, digest)
+
+    def get(self, digest: str) -> Optional[Dict[str, Any]]:
+        """按内容哈希获取缓存的结构，命中时将其移到最近使用的位置。"""
+        with self._lock:
+            structure = self._structures.get(digest)
+            if structure is None:
+                self.misses += 1
+                return None
+            self._structures.move_to_end(digest)
+            self.hits += 1
+            return structure
+
+    def get_version(self, version: str) -> Optional[Dict[str, Any]]:
+        """按结构版本号获取缓存的结构，不影响命中计数。"""
+        with self._lock:
+            digest = self._version_index.get(version)
+            structure = self._structures.get(digest) if digest is not None else None
+            if structure is not None:
+                self._structures.move_to_end(digest)
+            return structure
+
+    def put(self, digest: str, structure: Dict[str, Any]):
+        """写入结构，必要时淘汰最久未使用的条目。"""
+        if self.max_entries == 0:
+            return
+        with self._lock:
+            self._structures[digest] = structure
+            self._structures.move_to_end(digest)
+            if structure.get("version"):
+                self._version_index[structure["version"]] = digest
+            while len(self._structures) > self.max_entries:
+                evicted, _ = self._structures.popitem(last=False)
+                self.evictions += 1
+                # 同时清理指向被淘汰条目的URL索引
+                stale = [u for u, (_, d) in self._url_index.items() if d == evicted]
+                for u in stale:
+                    del self._url_index[u]
+                stale = [v for v, d in self._version_index.items() if d == evicted]
+                for v in stale:
+                    del self._version_index[v]
+
+    def clear(self):
+        """清空缓存（计数器保留）。"""
+        with self._lock:
+            self._structures.clear()
+            self._url_index.clear()
+            self._version_index.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """返回命中、未命中、淘汰计数以及当前容量信息。"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._structures),
+                "max_entries": self.max_entries,
+                "url_entries": len(self._url_index),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": (self.hits / lookups) if lookups else 0.0,
+            }
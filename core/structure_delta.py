@@ -0,0 +1,134 @@
+import hashlib
+import json
+from collections import deque
+from typing import Dict, Any, List
+
+
+class StructureDelta:
+    """
+    文档结构的内容哈希、版本号与增量比较。
+
+    每个顶级元素带有 "hash"（元素内容的短哈希，不含元素ID，元素只是移动了位置时哈希不变），
+    整份结构带有 "version"（所有元素ID与哈希的摘要）。
+    版本号只取决于提取出的内容，重新保存但内容未变的文档版本号不变。
+    客户端持有上一次的版本号时，可以只获取发生变化的元素。
+    """
+
+    @staticmethod
+    def element_hash(element: Dict[str, Any]) -> str:
+        """计算元素内容的哈希（不含 hash 字段本身和元素ID，表格单元格ID只保留行列部分）。"""
+        payload = {k: v for k, v in element.items() if k not in ("id", "hash")}
+        if "rows" in payload:
+            prefix = len(element["id"])
+            payload["rows"] = [
+                dict(row, cells=[dict(cell, id=cell["id"][prefix:]) for cell in row["cells"]])
+                for row in payload["rows"]
+            ]
+        data = json.dumps(payload, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+        return hashlib.blake2b(data.encode("utf-8"), digest_size=8).hexdigest()
+
+    @staticmethod
+    def with_hash(element: Dict[str, Any]) -> Dict[str, Any]:
+        """为元素写入 hash 字段并返回该元素。"""
+        element["hash"] = StructureDelta.element_hash(element)
+        return element
+
+    @staticmethod
+    def version_digest():
+        """返回用于逐个累加元素计算版本号的摘要对象，配合 add_to_version 使用。"""
+        return hashlib.blake2b(digest_size=16)
+
+    @staticmethod
+    def add_to_version(digest, element: Dict[str, Any]):
+        """把一个已带哈希的元素累加到版本摘要中。"""
+        digest.update(element["id"].encode("utf-8"))
+        digest.update(b":")
+        digest.update(element["hash"].encode("ascii"))
+        digest.update(b"\n")
+
+    @staticmethod
+    def version_token(elements: List[Dict[str, Any]]) -> str:
+        """根据所有元素的ID和哈希计算文档版本号。"""
+        digest = StructureDelta.version_digest()
+        for element in elements:
+            StructureDelta.add_to_version(digest, element)
+        return digest.hexdigest()
+
+    @staticmethod
+    def build(elements: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """由已带哈希的元素列表生成 {"elements": [...], "version": 版本号}。"""
+        return {"elements": elements, "version": StructureDelta.version_token(elements)}
+
+    @staticmethod
+    def diff(previous: Dict[str, Any], current: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        比较两个版本的结构。
+
+        元素ID由位置决定，插入或删除一个元素会使其后所有元素的ID后移，因此按以下顺序对应新旧元素：
+        1. 锚点（w14:paraId）相同的段落；
+        2. 其余元素中内容哈希相同的（哈希不含ID，重复内容按文档顺序依次对应）；
+        3. 仍未对应的元素按ID对应。
+        对应上但哈希不同的为 changed，没有对应的新元素为 inserted，没有对应的旧元素ID列入 removed；
+        对应上但ID变化的元素（包括 changed 中的）在 moved 中给出新旧ID。
+        既没有锚点、内容又改变了的元素如果同时移动了位置，无法与旧元素对应，会表现为一次删除加一次插入。
+
+        :return: {"version", "base_version", "full": False, "changed": [...], "inserted": [...], "removed": [...],
+                  "moved": [{"id": 新ID, "previous_id": 旧ID}, ...]}
+        """
+        old_elements = previous["elements"]
+        new_elements = current["elements"]
+        # matches[新元素下标] = 旧元素下标
+        matches: Dict[int, int] = {}
+        old_matched = set()
+
+        old_by_anchor = {}
+        for i, element in enumerate(old_elements):
+            anchor = element.get("anchor")
+            if anchor:
+                old_by_anchor.setdefault(anchor, i)
+        for j, element in enumerate(new_elements):
+            i = old_by_anchor.get(element.get("anchor")) if element.get("anchor") else None
+            if i is not None and i not in old_matched:
+                matches[j] = i
+                old_matched.add(i)
+
+        old_by_hash: Dict[str, deque] = {}
+        for i, element in enumerate(old_elements):
+            if i not in old_matched:
+                old_by_hash.setdefault(element["hash"], deque()).append(i)
+        for j, element in enumerate(new_elements):
+            candidates = old_by_hash.get(element["hash"]) if j not in matches else None
+            if candidates:
+                i = candidates.popleft()
+                matches[j] = i
+                old_matched.add(i)
+
+        old_by_id = {element["id"]: i for i, element in enumerate(old_elements) if i not in old_matched}
+        for j, element in enumerate(new_elements):
+            i = old_by_id.pop(element["id"], None) if j not in matches else None
+            if i is not None:
+                matches[j] = i
+                old_matched.add(i)
+
+        changed = []
+        inserted = []
+        moved = []
+        for j, element in enumerate(new_elements):
+            i = matches.get(j)
+            if i is None:
+                inserted.append(element)
+                continue
+            old = old_elements[i]
+            if old["hash"] != element["hash"]:
+                changed.append(element)
+            if old["id"] != element["id"]:
+                moved.append({"id": element["id"], "previous_id": old["id"]})
+        return {
+            "version": current["version"],
+            "base_version": previous["version"],
+            "full": False,
+            "changed": changed,
+            "inserted": inserted,
+            "removed": [element["id"] for i, element in enumerate(old_elements) if i not in old_matched],
+            "moved": moved,
+        }
@@ -0,0 +1,93 @@
+import base64
+import json
+import re
+from typing import Dict, Any, Optional, Tuple
+
+# 顶级元素ID（p_N、tbl_N 以及 tbl_N_rRcC 形式的单元格ID）中的元素序号
+_ELEMENT_INDEX_RE = re.compile(r"^(?:p|tbl)_(\d+)")
+
+
+class StructurePager:
+    """
+    对已解析的文档结构做分页和按ID范围截取。
+
+    文档顶级元素的ID序号就是它在 elements 列表中的下标，因此ID范围可以直接换算为下标区间。
+    续页游标中记录了文档内容哈希，后续页面直接从结构缓存中读取，无需重新下载和解析。
+    """
+
+    @staticmethod
+    def element_index(element_id: str) -> int:
+        """从元素ID中解析出顶级元素序号，单元格ID返回其所在表格的序号。"""
+        match = _ELEMENT_INDEX_RE.match(element_id or "")
+        if not match:
+            raise ValueError(f"invalid element id: {element_id}")
+        return int(match.group(1))
+
+    @staticmethod
+    def encode_cursor(digest: str, offset: int, limit: int, start: int, end: Optional[int]) -> str:
+        """生成续页游标。"""
+        payload = json.dumps({"h": digest, "o": offset, "l": limit, "s": start, "e": end}, separators=(",", ":"))
+        return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii")
+
+    @staticmethod
+    def decode_cursor(cursor: str) -> Dict[str, Any]:
+        """解析续页游标，返回 {"h": 内容哈希, "o": 偏移, "l": 每页数量, "s": 起始序号, "e": 结束序号}。"""
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8"))
+            return {
+                "h": str(payload["h"]),
+                "o": int(payload["o"]),
+                "l": int(payload["l"]),
+                "s": int(payload["s"]),
+                "e": None if payload["e"] is None else int(payload["e"]),
+            }
+        except Exception:
+            raise ValueError("invalid cursor")
+
+    @staticmethod
+    def resolve_range(start_id: Optional[str], end_id: Optional[str]) -> Tuple[int, Optional[int]]:
+        """把ID范围（闭区间）换算为元素下标区间 [start, end]，end 为 None 表示到文档末尾。"""
+        start = StructurePager.element_index(start_id) if start_id else 0
+        end = StructurePager.element_index(end_id) if end_id else None
+        if end is not None and end < start:
+            raise ValueError(f"end_id {end_id} is before start_id {start_id}")
+        return start, end
+
+    @staticmethod
+    def paginate(structure: Dict[str, Any], digest: str, offset: int = 0, limit: Optional[int] = None,
+                 start: int = 0, end: Optional[int] = None) -> Dict[str, Any]:
+        """
+        返回结构的一个窗口。
+
+        :param structure: 完整的文档结构 {"elements": [...]}。
+        :param digest: 文档内容哈希，写入续页游标。
+        :param offset: 在ID范围内跳过的元素数量。
+        :param limit: 本页最多返回的元素数量，None 表示返回范围内的全部剩余元素。
+        :param start: ID范围起始下标（含）。
+        :param end: ID范围结束下标（含），None 表示到文档末尾。
+        :return: {"elements": [...], "total_elements": 范围内元素总数, "offset", "limit", "next_cursor", "document_hash", "version"}
+        """
+        if limit is not None and limit <= 0:
+            raise ValueError("limit must be a positive integer")
+        elements = structure["elements"]
+        range_end = len(elements) if end is None else min(end + 1, len(elements))
+        range_start = min(max(0, start), range_end)
+        total = range_end - range_start
+
+        offset = max(0, offset)
+        window_start = min(range_start + offset, range_end)
+        window_end = range_end if limit is None else min(window_start + max(0, limit), range_end)
+
+        next_cursor = None
+        if limit is not None and window_end < range_end:
+            next_cursor = StructurePager.encode_cursor(digest, offset + (window_end - window_start), limit, start, end)
+
+        return {
+            "elements": elements[window_start:window_end],
+            "total_elements": total,
+            "offset": offset,
+            "limit": limit,
+            "next_cursor": next_cursor,
+            "document_hash": digest,
+            "version": structure.get("version"),
+        }
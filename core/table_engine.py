@@ -0,0 +1,103 @@
+from typing import Dict, Any, Callable, List, Optional, Tuple
+
+# WordprocessingML 命名空间
+W_NS = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+_W = "{%s}" % W_NS
+
+
+class TableLayout:
+    """
+    直接读取 w:tr / w:tc 的表格引擎，不创建 python-docx 的 _Row / _Cell 对象。
+
+    按行顺序调用 add_row()，每行只解析一次 gridSpan 和 vMerge：
+    - 横向合并（gridSpan）的单元格只输出一次，col_span 记录它在 row.cells 中占据的位置数；
+    - 纵向合并的后续单元格（vMerge=continue）不再输出，起始单元格的 row_span 随之增加。
+    单元格ID仍为 tbl_N_rRcC，其中 R、C 是该单元格在 python-docx row.cells 语义下首次出现的位置，
+    被合并覆盖的其他位置可以通过 root_at() 解析到同一个起始单元格，因此旧的ID依然有效。
+    """
+
+    def __init__(self, table_id: str, paragraph_text: Optional[Callable[[Any], str]], keep_elements: bool = False):
+        """
+        :param table_id: 表格元素ID，例如 "tbl_3"。
+        :param paragraph_text: 计算 w:p 段落文本的函数（StreamingExtractor.paragraph_text），为 None 时不计算单元格文本。
+        :param keep_elements: 是否保留每个位置对应的起始 w:tc 元素（打补丁时需要，结构提取时不需要）。
+        """
+        self.table_id = table_id
+        self.paragraph_text = paragraph_text
+        self.keep_elements = keep_elements
+        self.row_count = 0
+        # 上一行各网格位置上的起始单元格：grid_offset -> root
+        self._above: Dict[int, Dict[str, Any]] = {}
+        # (行, 位置) -> 起始 w:tc，仅在 keep_elements 时记录
+        self._positions: Dict[Tuple[int, int], Any] = {}
+
+    def add_row(self, tr) -> Dict[str, Any]:
+        """
+        解析下一行 w:tr。
+
+        :return: {"cells": [...]}，只包含本行新出现的单元格。
+        """
+        row_index = self.row_count
+        current: Dict[int, Dict[str, Any]] = {}
+        cells: List[Dict[str, Any]] = []
+        position = 0
+
+        grid_offset = self._int_val(tr.find(f"{_W}trPr/{_W}gridBefore"), 0)
+        for tc in tr.iterchildren(_W + "tc"):
+            span, v_merge = self._cell_properties(tc)
+            root = self._above.get(grid_offset) if v_merge == "continue" else None
+            if root is not None:
+                # 纵向合并的延续部分：沿用上方的起始单元格，只更新其跨行数
+                root["row_span"] += 1
+                if root["cell"] is not None:
+                    root["cell"]["row_span"] = root["row_span"]
+            else:
+                root = {"tc": tc if self.keep_elements else None, "count": span, "row_span": 1, "cell": None}
+                cell = {
+                    "id": f"{self.table_id}_r{row_index}c{position}",
+                    "text": self.cell_text(tc) if self.paragraph_text else None,
+                }
+                if span > 1:
+                    cell["col_span"] = span
+                root["cell"] = cell
+                cells.append(cell)
+
+            if self.keep_elements:
+                for k in range(root["count"]):
+                    self._positions[(row_index, position + k)] = root["tc"]
+            current[grid_offset] = root
+            position += root["count"]
+            grid_offset += span
+
+        self._above = current
+        self.row_count += 1
+        return {"cells": cells}
+
+    def root_at(self, row: int, col: int):
+        """返回 (行, 位置) 对应的起始 w:tc 元素，不存在时返回 None。需要 keep_elements=True。"""
+        return self._positions.get((row, col))
+
+    @staticmethod
+    def _cell_properties(tc) -> Tuple[int, Optional[str]]:
+        """读取单元格的 gridSpan 和 vMerge 值。"""
+        tcPr = tc.find(_W + "tcPr")
+        if tcPr is None:
+            return 1, None
+        span = max(1, TableLayout._int_val(tcPr.find(_W + "gridSpan"), 1))
+        v_merge_el = tcPr.find(_W + "vMerge")
+        v_merge = v_merge_el.get(_W + "val", "continue") if v_merge_el is not None else None
+        return span, v_merge
+
+    def cell_text(self, tc) -> str:
+        """按 python-docx _Cell.text 的规则计算单元格文本（直接子段落的文本以换行连接）。"""
+        return "\n".join(self.paragraph_text(p) for p in tc.iterchildren(_W + "p"))
+
+    @staticmethod
+    def _int_val(el, default: int) -> int:
+        """读取 w:val 整数属性。"""
+        if el is None:
+            return default
+        try:
+            return int(el.get(_W + "val"))
+        except (TypeError, ValueError):
+            return default
@@ -1,74 +1,384 @@
+import asyncio
 import base64
 import io
 import json
 import os
-import requests
-import oss2
+import re
+import threading
+import time
 import uuid
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Union, BinaryIO, Optional, Tuple
 
-from fastmcp import FastMCP
-from docx import Document
+from fastmcp import FastMCP, Context
 
+from core.batch_pipeline import BatchPipeline
+from core.compact_format import CompactFormat, PACK_ENCODING
+from core.connections import ConnectionManager, DownloadedDocument
 from core.docx_processor import DocxProcessor
+from core.lazy_import import LazyModule
+from core.lazy_package import LazyPackage
+from core.metrics import MetricsRegistry, StageTimer, serve_metrics
 from core.models import DocumentPatch
+from core.multipart_upload import MultipartUploader
+from core.process_pool import DocxWorkerPool
+from core.search_index import SearchIndex, SearchIndexCache
+from core.session_store import SessionStore
+from core.streaming_extractor import StreamingExtractor
+from core.structure_cache import StructureCache
+from core.structure_delta import StructureDelta
+from core.structure_pager import StructurePager
+
+# 下载（httpx）和OSS上传（oss2，会带入 requests）的依赖推迟到第一次用到它们的工具调用时导入，
+# 只做结构提取等本地处理的会话不承担这部分启动开销
+httpx = LazyModule("httpx")
+oss2 = LazyModule("oss2")
 
 # 实例化 FastMCP 对象，只传入服务名称，遵循 fastmcp 的正确用法
 mcp = FastMCP("docx_handler")
 
-# 阿里云OSS配置
-# 请在环境变量中设置以下配置或在部署时替换为实际值
+# 阿里云OSS配置，从环境变量读取（参见 env.example）
+# 访问密钥、bucket 和下载域名没有缺省值，未设置时上传会返回错误，不影响其他工具
 OSS_CONFIG = {
-    "endpoint": "https://oss-cn-shenzhen.aliyuncs.com",
-    "access_key": "LTAI5tEX4A49ZUeya8DCCNGd",
-    "secret_key": "7uXTkPwNAE6PP3YHqHscWfKcfmx2fx",
-    "bucket_name": "ggb-lzt",  # 从ALI_DOMAIN中提取的bucket名称
-    "domain": "https://ggb-lzt.oss-cn-shenzhen.aliyuncs.com/"
+    "endpoint": os.getenv("OSS_ENDPOINT", "https://oss-cn-shenzhen.aliyuncs.com"),
+    "access_key": os.getenv("OSS_ACCESS_KEY"),
+    "secret_key": os.getenv("OSS_SECRET_KEY"),
+    "bucket_name": os.getenv("OSS_BUCKET_NAME"),
+    "domain": os.getenv("OSS_DOMAIN"),
+}
+
+# OSS上传配置
+# multipart_threshold: 文件大小超过该值（字节）时改用并发分片上传
+# part_size: 分片大小（字节）
+# part_concurrency: 同时上传的分片数
+# checkpoint_dir: 断点续传记录的保存目录，缺省为用户主目录
+UPLOAD_CONFIG = {
+    "multipart_threshold": int(os.getenv("DOCX_MCP_MULTIPART_THRESHOLD", str(32 * 1024 * 1024))),
+    "part_size": int(os.getenv("DOCX_MCP_MULTIPART_PART_SIZE", str(8 * 1024 * 1024))),
+    "part_concurrency": int(os.getenv("DOCX_MCP_MULTIPART_CONCURRENCY", "4")),
+    "checkpoint_dir": os.getenv("DOCX_MCP_MULTIPART_CHECKPOINT_DIR") or None,
+}
+
+# 文档结构缓存配置
+# structure_cache_size: 最多缓存多少份不同文档的解析结果，设为0可关闭缓存
+# search_index_cache_size: 最多缓存多少份文档的搜索索引，设为0可关闭缓存
+CACHE_CONFIG = {
+    "structure_cache_size": int(os.getenv("DOCX_MCP_STRUCTURE_CACHE_SIZE", "64")),
+    "search_index_cache_size": int(os.getenv("DOCX_MCP_SEARCH_INDEX_CACHE_SIZE", "16")),
+}
+
+# 文档处理配置
+# extract_engine: 结构提取引擎，"streaming" 为流式lxml解析（内存占用低），"docx" 为 python-docx 完整解析
+# worker_processes: 解析和打补丁使用的工作进程数，0 表示在当前进程的线程池中执行
+# worker_max_tasks: 每个工作进程执行多少个任务后回收，用于控制内存增长
+# worker_task_timeout: 单个解析/打补丁任务的超时时间（秒）
+# worker_shm_threshold: 超过该字节数的文档通过共享内存传给工作进程
+# ndjson_max_elements: stream_document_structure 以 ndjson 返回时结果中最多包含的元素数，0 表示不限制
+PROCESSOR_CONFIG = {
+    "extract_engine": os.getenv("DOCX_MCP_EXTRACT_ENGINE", "streaming"),
+    "worker_processes": int(os.getenv("DOCX_MCP_WORKER_PROCESSES", "0")),
+    "worker_max_tasks": int(os.getenv("DOCX_MCP_WORKER_MAX_TASKS", "200")),
+    "worker_task_timeout": float(os.getenv("DOCX_MCP_WORKER_TASK_TIMEOUT", "120")),
+    "worker_shm_threshold": int(os.getenv("DOCX_MCP_WORKER_SHM_THRESHOLD", str(1024 * 1024))),
+    "ndjson_max_elements": int(os.getenv("DOCX_MCP_NDJSON_MAX_ELEMENTS", "5000")),
+}
+
+# 并发执行配置
+# cpu_workers: 执行文档解析/打补丁等CPU密集任务的线程数
+# io_workers: 执行OSS上传等阻塞IO任务的线程数
+EXECUTOR_CONFIG = {
+    "cpu_workers": int(os.getenv("DOCX_MCP_CPU_WORKERS", str(os.cpu_count() or 1))),
+    "io_workers": int(os.getenv("DOCX_MCP_IO_WORKERS", "16")),
+}
+
+# 网络连接配置
+# download_timeout: 下载文档的超时时间（秒）
+# http_pool_size: 下载连接池的最大连接数
+# http_keepalive_expiry: 空闲连接保持时间（秒）
+# oss_pool_size: OSS客户端连接池大小
+# max_download_size: 允许下载的最大文档大小（字节），0 表示不限制
+# spool_threshold: 下载内容超过该字节数后转存到磁盘临时文件
+CONNECTION_CONFIG = {
+    "download_timeout": float(os.getenv("DOCX_MCP_DOWNLOAD_TIMEOUT", "30")),
+    "http_pool_size": int(os.getenv("DOCX_MCP_HTTP_POOL_SIZE", "32")),
+    "http_keepalive_expiry": float(os.getenv("DOCX_MCP_HTTP_KEEPALIVE_EXPIRY", "30")),
+    "oss_pool_size": int(os.getenv("DOCX_MCP_OSS_POOL_SIZE", "16")),
+    "max_download_size": int(os.getenv("DOCX_MCP_MAX_DOWNLOAD_SIZE", str(1024 * 1024 * 1024))),
+    "spool_threshold": int(os.getenv("DOCX_MCP_SPOOL_THRESHOLD", str(16 * 1024 * 1024))),
+}
+
+# 批处理配置
+# download_concurrency / process_concurrency / upload_concurrency: 批处理流水线各阶段的并发数
+# max_jobs: 单次批处理允许的最大任务数
+BATCH_CONFIG = {
+    "download_concurrency": int(os.getenv("DOCX_MCP_BATCH_DOWNLOAD_CONCURRENCY", "8")),
+    "process_concurrency": int(os.getenv("DOCX_MCP_BATCH_PROCESS_CONCURRENCY", str(EXECUTOR_CONFIG["cpu_workers"]))),
+    "upload_concurrency": int(os.getenv("DOCX_MCP_BATCH_UPLOAD_CONCURRENCY", "8")),
+    "max_jobs": int(os.getenv("DOCX_MCP_BATCH_MAX_JOBS", "1000")),
+}
+
+# 编辑会话配置
+# ttl: 会话空闲多少秒后过期
+# max_sessions: 同时打开的会话数上限
+# max_memory: 所有会话估算内存占用的上限（字节），超出后淘汰最久未使用的会话
+SESSION_CONFIG = {
+    "ttl": float(os.getenv("DOCX_MCP_SESSION_TTL", "1800")),
+    "max_sessions": int(os.getenv("DOCX_MCP_SESSION_MAX", "32")),
+    "max_memory": int(os.getenv("DOCX_MCP_SESSION_MAX_MEMORY", str(1024 * 1024 * 1024))),
 }
 
+# 指标配置
+# port: 提供 Prometheus /metrics 的本地HTTP端口，0 表示不启动（仍可通过 get_server_metrics 工具获取）
+# host: 监听地址
+METRICS_CONFIG = {
+    "port": int(os.getenv("DOCX_MCP_METRICS_PORT", "0")),
+    "host": os.getenv("DOCX_MCP_METRICS_HOST", "127.0.0.1"),
+}
+
+# 异步工具把阻塞工作交给这两个线程池，事件循环只负责调度，可同时处理大量请求
+_cpu_executor = ThreadPoolExecutor(max_workers=EXECUTOR_CONFIG["cpu_workers"], thread_name_prefix="docx-cpu")
+_io_executor = ThreadPoolExecutor(max_workers=EXECUTOR_CONFIG["io_workers"], thread_name_prefix="docx-io")
+
+# 解析和打补丁的进程池，未配置工作进程时为 None
+worker_pool = DocxWorkerPool(
+    PROCESSOR_CONFIG["worker_processes"],
+    max_tasks_per_worker=PROCESSOR_CONFIG["worker_max_tasks"],
+    task_timeout=PROCESSOR_CONFIG["worker_task_timeout"],
+    shm_threshold=PROCESSOR_CONFIG["worker_shm_threshold"],
+) if PROCESSOR_CONFIG["worker_processes"] > 0 else None
+
+# 按文档内容哈希缓存解析后的结构，避免重复解析同一份模板
+structure_cache = StructureCache(CACHE_CONFIG["structure_cache_size"])
+# 同样按内容哈希缓存搜索索引，重复查询同一文档时无需重建
+search_indexes = SearchIndexCache(CACHE_CONFIG["search_index_cache_size"])
+
+# 共享的下载连接池和OSS客户端
+connections = ConnectionManager(
+    OSS_CONFIG,
+    http_pool_size=CONNECTION_CONFIG["http_pool_size"],
+    http_keepalive_expiry=CONNECTION_CONFIG["http_keepalive_expiry"],
+    oss_pool_size=CONNECTION_CONFIG["oss_pool_size"],
+    download_timeout=CONNECTION_CONFIG["download_timeout"],
+)
+
+# 编辑会话：文档解析一次后常驻内存，多次打补丁，最后统一保存
+sessions = SessionStore(
+    ttl=SESSION_CONFIG["ttl"],
+    max_sessions=SESSION_CONFIG["max_sessions"],
+    max_memory=SESSION_CONFIG["max_memory"],
+)
+
+# 大文件的并发分片上传器
+multipart_uploader = MultipartUploader(
+    part_size=UPLOAD_CONFIG["part_size"],
+    concurrency=UPLOAD_CONFIG["part_concurrency"],
+    checkpoint_dir=UPLOAD_CONFIG["checkpoint_dir"],
+)
+
+# 各工具分阶段耗时、字节数和调用次数的指标注册表
+metrics = MetricsRegistry()
+metrics.describe("docx_mcp_stage_seconds", "Time spent in each stage of a tool call")
+metrics.describe("docx_mcp_stage_bytes_total", "Bytes processed by each stage of a tool call")
+metrics.describe("docx_mcp_tool_seconds", "Total tool call latency")
+metrics.describe("docx_mcp_tool_calls_total", "Tool calls by result status")
+
+def _collect_gauges() -> Dict[str, float]:
+    """把缓存、会话的当前状态作为 gauge 输出。"""
+    session_stats = sessions.stats()
+    return {
+        "docx_mcp_structure_cache_entries": structure_cache.stats()["entries"],
+        "docx_mcp_search_index_cache_entries": search_indexes.stats()["entries"],
+        "docx_mcp_sessions_open": session_stats["sessions"],
+        "docx_mcp_sessions_estimated_memory_bytes": session_stats["estimated_memory"],
+    }
+
+def _collect_counters() -> Dict[str, float]:
+    """把缓存命中、连接池和进程池的累计次数作为 counter 输出。"""
+    cache = structure_cache.stats()
+    pools = connections.stats()
+    counters = {
+        "docx_mcp_structure_cache_hits_total": cache["hits"],
+        "docx_mcp_structure_cache_misses_total": cache["misses"],
+        "docx_mcp_http_requests_total": pools["http"]["requests"],
+        "docx_mcp_http_connections_opened_total": pools["http"]["connections_opened"],
+        "docx_mcp_oss_requests_total": pools["oss"]["requests"],
+        "docx_mcp_oss_connections_opened_total": pools["oss"]["connections_opened"],
+    }
+    if worker_pool is not None:
+        pool = worker_pool.stats()
+        counters.update({
+            "docx_mcp_worker_tasks_total": pool["tasks"],
+            "docx_mcp_worker_timeouts_total": pool["timeouts"],
+            "docx_mcp_worker_restarts_total": pool["restarts"],
+        })
+    return counters
+
+metrics.register_collector(_collect_gauges)
+metrics.register_collector(_collect_counters, kind="counter")
+
+def _finish_timer(timer: StageTimer, result: Any, include_timings: bool = False) -> Any:
+    """结束计时并按需在结果中附加 timings 块（不修改可能被缓存共享的原结果）。"""
+    ok = not (isinstance(result, dict) and "error" in result)
+    total = timer.finish(ok)
+    if include_timings and isinstance(result, dict):
+        return {**result, "timings": timer.result(total)}
+    return result
+
 def get_oss_bucket():
-    """获取OSS bucket对象"""
-    auth = oss2.Auth(OSS_CONFIG["access_key"], OSS_CONFIG["secret_key"])
-    bucket = oss2.Bucket(auth, OSS_CONFIG["endpoint"], OSS_CONFIG["bucket_name"])
-    return bucket
+    """获取OSS bucket对象（进程内复用同一个客户端及其连接池）"""
+    return connections.get_bucket()
+
+def _as_stream(content: Union[bytes, memoryview, BinaryIO]) -> BinaryIO:
+    """把字节内容包装为可读流；已经是文件对象时定位到开头直接使用。"""
+    if hasattr(content, "read"):
+        content.seek(0)
+        return content
+    # 使用 io.BytesIO 在内存中创建一个类文件对象
+    return io.BytesIO(content)
 
-def _apply_modifications_core(original_file_content_base64: str, patches_json: str) -> str:
+def _extract_structure_core(content: Union[bytes, memoryview, BinaryIO]) -> Dict[str, Any]:
+    """
+    根据配置选择提取引擎解析文档结构（内部函数）
+
+    配置了工作进程时交给进程池执行，否则在当前线程中解析。
+    """
+    if worker_pool is not None:
+        return worker_pool.extract_structure(content, PROCESSOR_CONFIG["extract_engine"])
+    file_stream = _as_stream(content)
+    if PROCESSOR_CONFIG["extract_engine"] == "docx":
+        return DocxProcessor.extract_structure_with_ids(file_stream)
+    return DocxProcessor.extract_structure_streaming(file_stream)
+
+def _extract_with_cache(digest: str, content: Union[bytes, BinaryIO], timer: Optional[StageTimer] = None) -> Dict[str, Any]:
+    """
+    按内容哈希查找缓存，未命中时解析文档结构（内部函数，在CPU线程池中执行）
+    """
+    structure = structure_cache.get(digest)
+    if structure is None:
+        if timer is None:
+            structure = _extract_structure_core(content)
+        else:
+            with timer.stage("extract"):
+                structure = _extract_structure_core(content)
+        structure_cache.put(digest, structure)
+    return structure
+
+async def _run_cpu(func, *args):
+    """在CPU线程池中执行阻塞的文档处理函数。"""
+    return await asyncio.get_running_loop().run_in_executor(_cpu_executor, func, *args)
+
+async def _run_io(func, *args):
+    """在IO线程池中执行阻塞的网络调用（如OSS上传）。"""
+    return await asyncio.get_running_loop().run_in_executor(_io_executor, func, *args)
+
+async def _download(document_url: str, headers: Optional[Dict[str, str]] = None,
+                    timer: Optional[StageTimer] = None) -> DownloadedDocument:
+    """
+    通过共享连接池流式下载文档到临时文件，不阻塞事件循环。
+
+    超过 max_download_size 的文档会在读取响应体之前（或读取过程中）被中止。
+    """
+    started = time.monotonic()
+    download = await connections.download(
+        document_url,
+        headers,
+        max_size=CONNECTION_CONFIG["max_download_size"],
+        spool_threshold=CONNECTION_CONFIG["spool_threshold"],
+        executor=_io_executor,
+    )
+    if timer is not None:
+        timer.record("download", time.monotonic() - started)
+        timer.add_bytes("download", download.size)
+    return download
+
+def _apply_modifications_core(original_file_content: Union[bytes, memoryview, BinaryIO], patches_json: str,
+                              timer: Optional[StageTimer] = None) -> Dict[str, Any]:
     """
     核心修改应用逻辑（内部函数）
+
+    全程直接处理字节，不做任何Base64编解码；Base64只在需要返回文件内容的工具边界处理。
+
+    :param original_file_content: 原始 .docx 文件的字节内容（bytes 或 memoryview），或可寻址的文件对象。
+    :param patches_json: JSON格式的补丁列表字符串。
+    :param timer: 可选的计时器，记录 parse/patch/save 各阶段耗时和输出字节数。
+    :return: 成功时为 {"success": True, "stream": 修改后文件的BytesIO（已定位到开头）}，
+             失败时为 {"error": 错误信息}。
     """
     try:
-        # 解码原始文件
-        decoded_original_content = base64.b64decode(original_file_content_base64)
-        original_file_stream = io.BytesIO(decoded_original_content)
-
         # 解析JSON字符串为Python对象
         patches_data = json.loads(patches_json)
         # 将字典列表转换为DocumentPatch对象列表
         patches = [DocumentPatch(**p) for p in patches_data]
 
-        # 创建一个新的内存流来保存修改后的文件
-        modified_file_stream = io.BytesIO()
+        timings: Dict[str, float] = {}
+        if worker_pool is not None:
+            # 交给工作进程执行，大文档通过共享内存传递
+            started = time.monotonic()
+            modified_file_stream = worker_pool.apply_patches(original_file_content, patches, timings)
+            if timer is not None:
+                # 进程间传递（含排队）的耗时
+                timer.record("worker_transfer", max(0.0, time.monotonic() - started - sum(timings.values())))
+        else:
+            # BytesIO 直接引用原始字节，不会产生额外拷贝；文件对象则直接读取
+            original_file_stream = _as_stream(original_file_content)
+            # 创建一个新的内存流来保存修改后的文件
+            modified_file_stream = io.BytesIO()
+            # 调用核心逻辑来应用补丁
+            DocxProcessor.apply_patches(original_file_stream, modified_file_stream, patches, timings)
+        if timer is not None:
+            for stage, seconds in timings.items():
+                timer.record(stage, seconds)
+            timer.add_bytes("save", modified_file_stream.getbuffer().nbytes)
 
-        # 调用核心逻辑来应用补丁
-        DocxProcessor.apply_patches(original_file_stream, modified_file_stream, patches)
+        # 将指针移到内存流的开头，调用方可直接读取或通过 getbuffer() 零拷贝访问
+        modified_file_stream.seek(0)
+        return {"success": True, "stream": modified_file_stream}
+    except Exception as e:
+        return {"error": f"Failed to apply modifications: {str(e)}"}
 
-        # 将指针移到内存流的开头
+def _find_and_replace_core(original_file_content: Union[bytes, memoryview, BinaryIO], find: str, replacement: str,
+                           options: Dict[str, Any], timer: StageTimer) -> Dict[str, Any]:
+    """
+    核心查找替换逻辑（内部函数）：解析文档、一次遍历完成所有替换并保存。
+
+    :return: 成功时为 {"success": True, "stream": 修改后文件的BytesIO, "replacements": ..., "elements": {...}}，
+             失败时为 {"error": 错误信息}。
+    """
+    try:
+        original_file_stream = _as_stream(original_file_content)
+        with timer.stage("parse"):
+            document = LazyPackage.open(original_file_stream)
+        with timer.stage("replace"):
+            summary = DocxProcessor.find_and_replace(document, find, replacement, **options)
+        modified_file_stream = io.BytesIO()
+        with timer.stage("save"):
+            DocxProcessor.save_document(document, original_file_stream, modified_file_stream,
+                                        bool(summary["replacements"]))
+        timer.add_bytes("save", modified_file_stream.getbuffer().nbytes)
         modified_file_stream.seek(0)
-        # 读取修改后的文件字节
-        modified_content_bytes = modified_file_stream.read()
-        
-        # 将修改后的字节内容编码为 Base64 字符串并返回
-        return base64.b64encode(modified_content_bytes).decode('utf-8')
+        return {"success": True, "stream": modified_file_stream, **summary}
     except Exception as e:
-        # 返回 Base64 编码的错误信息可能不是最佳实践，但作为示例
-        error_message = f"Failed to apply modifications: {str(e)}"
-        return base64.b64encode(error_message.encode('utf-8')).decode('utf-8')
+        return {"error": f"Failed to find and replace: {str(e)}"}
 
-def _upload_to_oss_core(file_bytes: bytes) -> Dict[str, Any]:
+def _upload_to_oss_core(file_data: Union[bytes, BinaryIO], timer: Optional[StageTimer] = None) -> Dict[str, Any]:
     """
     核心OSS上传逻辑（内部函数）
+
+    :param file_data: 文件字节内容，或已定位到开头的文件对象（按块读取上传，避免拷贝）。
+    :param timer: 可选的计时器，记录上传耗时和字节数。
     """
+    if timer is None:
+        return _upload_to_oss(file_data)
+    size = MultipartUploader.data_size(file_data)
+    with timer.stage("upload"):
+        result = _upload_to_oss(file_data)
+    if "error" not in result:
+        timer.add_bytes("upload", size)
+    return result
+
+def _upload_to_oss(file_data: Union[bytes, BinaryIO]) -> Dict[str, Any]:
+    """上传文件到OSS并构建访问链接。"""
     try:
         # 生成唯一的文件名
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -78,8 +388,11 @@ def _upload_to_oss_core(file_bytes: bytes) -> Dict[str, Any]:
         # 获取OSS bucket
         bucket = get_oss_bucket()
         
-        # 上传文件到OSS
-        result = bucket.put_object(filename, file_bytes)
+        # 上传文件到OSS，大文件使用并发分片上传（支持断点续传）
+        if MultipartUploader.data_size(file_data) >= UPLOAD_CONFIG["multipart_threshold"]:
+            filename, result = multipart_uploader.upload(bucket, filename, file_data)
+        else:
+            result = bucket.put_object(filename, file_data)
         
         # 构建访问链接
         download_url = f"{OSS_CONFIG['domain']}{filename}"
@@ -105,40 +418,377 @@ def _upload_to_oss_core(file_bytes: bytes) -> Dict[str, Any]:
         return {"error": f"上传文件时发生错误: {str(e)}"}
 
 
+async def _load_structure(document_url: str, timer: Optional[StageTimer] = None) -> Tuple[str, Dict[str, Any]]:
+    """
+    下载并解析文档结构，返回 (内容哈希, 结构)（内部函数）
+
+    优先使用结构缓存：URL带ETag时发起条件请求，内容哈希命中时跳过解析。
+    下载失败时抛出 httpx.HTTPError。
+    """
+    # 如果之前下载过该URL且服务端提供了ETag，发起条件请求
+    known = structure_cache.lookup_url(document_url)
+    headers = {"If-None-Match": known[0]} if known else {}
+
+    # 异步流式下载文件（状态码不是2xx/304时抛出异常）
+    download = await _download(document_url, headers, timer)
+    if known and download.status_code == 304:
+        # 文件未变化，直接返回缓存的结构
+        structure = structure_cache.get(known[1])
+        if structure is not None:
+            return known[1], structure
+        # 缓存条目在此期间被淘汰，重新完整下载
+        download = await _download(document_url, timer=timer)
+
+    try:
+        # 检查Content-Type是否为docx文件
+        content_type = download.headers.get('content-type', '').lower()
+        if 'application/vnd.openxmlformats-officedocument.wordprocessingml.document' not in content_type:
+            # 如果Content-Type不正确，但文件可能仍然是docx，我们继续尝试处理
+            pass
+
+        # 按下载时计算的内容哈希查找缓存，未命中时在线程池中解析临时文件
+        structure = await _run_cpu(_extract_with_cache, download.sha256, download.file, timer)
+        structure_cache.remember_url(document_url, download.headers.get('ETag'), download.sha256)
+        return download.sha256, structure
+    finally:
+        download.close()
+
+
 @mcp.tool()
-def extract_document_structure(document_url: str) -> Dict[str, Any]:
+async def extract_document_structure(
+    document_url: str,
+    offset: int = 0,
+    limit: Optional[int] = None,
+    start_id: Optional[str] = None,
+    end_id: Optional[str] = None,
+    cursor: Optional[str] = None,
+    since_version: Optional[str] = None,
+    include_timings: bool = False,
+    output_format: str = "full",
+    pack: bool = False
+) -> Dict[str, Any]:
     """
     从链接下载并解析 .docx 文件的内容，并以 JSON 格式提取其结构和文本。
 
     这个工具接收一个 .docx 文件的URL链接，下载文件后返回一个详细描述
     文档结构（段落、表格等）的字典，并为每个元素分配一个唯一的ID。
 
+    对于大文档，可以只获取其中一部分：用 start_id/end_id 指定元素ID范围（闭区间），
+    用 offset/limit 在范围内分页。返回结果中的 next_cursor 可直接传给下一次调用获取后续页面，
+    后续页面从已缓存的解析结果中读取，不会重新下载和解析文档。
+    不传任何分页参数时返回完整结构（与之前的格式相同）。
+
+    每个元素带有内容哈希 hash，结构带有文档版本号 version。传入上一次得到的 since_version 时，
+    只返回相对该版本发生变化的元素（changed）、新增的元素（inserted）和被删除的元素ID（removed）；
+    该版本的结构已不在缓存中时返回完整结构，并标记 "full": true。此模式下忽略分页参数。
+    元素ID由位置决定，新旧元素先按锚点（anchor）、再按内容哈希对应，最后才按ID对应，
+    因此插入或删除一个元素不会使其后的元素都成为 changed；ID因此后移的元素在 moved 中给出
+    {"id": 新ID, "previous_id": 旧ID}。限制：没有锚点的元素如果内容改变的同时位置也移动了，
+    无法与旧元素对应，会表现为 removed 中的旧ID加 inserted 中的新元素。
+
     :param document_url: .docx 文件的URL链接。
-    :return: 包含文档结构的字典。
+    :param offset: 在ID范围内跳过的元素数量。
+    :param limit: 每页最多返回的顶级元素数量。
+    :param start_id: 起始元素ID（含），例如 "p_100"。
+    :param end_id: 结束元素ID（含），例如 "tbl_250"。
+    :param cursor: 上一页返回的 next_cursor；提供时忽略其他分页参数。
+    :param since_version: 上一次提取得到的 version，提供时只返回增量。
+    :param include_timings: 为 True 时在结果中附加 timings（各阶段耗时和字节数）。
+    :param output_format: "full"（默认）为每个元素一个对象的格式；"compact" 为紧凑的列式格式：
+                          elements（以及增量模式的 changed、inserted）变为 {"format": "compact-v1", "start", "types",
+                          "styles", "style", "text", "hash", "anchors", "tables"}，ID由位置推出，表格为二维文本数组。
+    :param pack: 为 True 时把整个结果JSON用gzip压缩并Base64编码，返回 {"encoding": "gzip+base64", "data": ...}。
+    :return: 包含文档结构的字典；分页时附带 total_elements、next_cursor 等信息。
     """
+    if output_format not in ("full", "compact"):
+        return {"error": f"Invalid output_format: {output_format}"}
+    timer = StageTimer(metrics, "extract_document_structure")
+    result = await _extract_document_structure(document_url, offset, limit, start_id, end_id, cursor, since_version, timer)
+    result = _format_structure_output(result, output_format, pack, timer)
+    return _finish_timer(timer, result, include_timings)
+
+def _format_structure_output(result: Dict[str, Any], output_format: str, pack: bool, timer: StageTimer) -> Dict[str, Any]:
+    """按 output_format / pack 转换结构提取结果（不修改可能被缓存共享的原结果）。"""
+    if "error" in result:
+        return result
+    if output_format == "compact":
+        with timer.stage("compact"):
+            result = dict(result)
+            for key in ("elements", "changed", "inserted"):
+                if key in result:
+                    result[key] = CompactFormat.encode(result[key])
+    if pack:
+        with timer.stage("pack"):
+            data = CompactFormat.pack(result)
+        timer.add_bytes("pack", len(data))
+        result = {"encoding": PACK_ENCODING, "data": data}
+    return result
+
+async def _extract_document_structure(
+    document_url: str,
+    offset: int,
+    limit: Optional[int],
+    start_id: Optional[str],
+    end_id: Optional[str],
+    cursor: Optional[str],
+    since_version: Optional[str],
+    timer: StageTimer
+) -> Dict[str, Any]:
+    """extract_document_structure 的实现（内部函数）"""
     try:
-        # 发送GET请求下载文件
-        response = requests.get(document_url, timeout=30)
-        response.raise_for_status()  # 如果状态码不是200，抛出异常
-        
-        # 检查Content-Type是否为docx文件
-        content_type = response.headers.get('content-type', '').lower()
-        if 'application/vnd.openxmlformats-officedocument.wordprocessingml.document' not in content_type:
-            # 如果Content-Type不正确，但文件可能仍然是docx，我们继续尝试处理
-            pass
-        
-        # 使用 io.BytesIO 在内存中创建一个类文件对象
-        file_stream = io.BytesIO(response.content)
-        # 调用核心逻辑来提取结构
-        structure = DocxProcessor.extract_structure_with_ids(file_stream)
-        return structure
-    except requests.exceptions.RequestException as e:
+        if since_version is not None:
+            # 先取出旧版本（下载时的缓存写入可能淘汰它）
+            previous = structure_cache.get_version(since_version)
+            _, structure = await _load_structure(document_url, timer)
+            if previous is None:
+                return {"version": structure["version"], "base_version": since_version, "full": True,
+                        "elements": structure["elements"]}
+            return StructureDelta.diff(previous, structure)
+
+        paged = cursor is not None or limit is not None or offset or start_id or end_id
+        if cursor is not None:
+            position = StructurePager.decode_cursor(cursor)
+            digest, offset, limit, start, end = position["h"], position["o"], position["l"], position["s"], position["e"]
+            # 续页优先从缓存读取，缓存已淘汰时重新下载并确认文档未变化
+            structure = structure_cache.get(digest)
+            if structure is None:
+                current_digest, structure = await _load_structure(document_url, timer)
+                if current_digest != digest:
+                    return {"error": "Document has changed since the cursor was issued, please restart from the first page"}
+        else:
+            start, end = StructurePager.resolve_range(start_id, end_id)
+            digest, structure = await _load_structure(document_url, timer)
+
+        if not paged:
+            return structure
+        return StructurePager.paginate(structure, digest, offset, limit, start, end)
+    except httpx.HTTPError as e:
         # 处理网络请求相关的错误
         return {"error": f"Failed to download document from URL: {str(e)}"}
     except Exception as e:
         # 在MCP中，错误处理通常是通过返回一个包含错误信息的字典来完成的
         return {"error": f"Failed to extract document structure: {str(e)}"}
 
+@mcp.tool()
+async def stream_document_structure(
+    document_url: str,
+    chunk_size: int = 200,
+    output_format: str = "full",
+    delivery: str = "progress",
+    include_timings: bool = False,
+    ctx: Context = None
+) -> Dict[str, Any]:
+    """
+    以分块方式流式提取文档结构，适合超大文档。
+
+    文档边解析边发送：每解析出 chunk_size 个顶级元素就发送一块，客户端可以在后续内容仍在解析时处理前面的部分，
+    服务端同时只保留少量块，内存占用与块大小有关而与文档大小无关。
+
+    - delivery="progress"（默认）：每块通过一条MCP进度通知发送，通知的 message 是一行JSON
+      {"chunk": 块序号, "start": 第一个元素的序号, "count": 元素数, "elements": [...]}，progress 为已发送的元素数；
+      工具结果只包含汇总信息。
+    - delivery="ndjson"：不发送进度通知，各块按行拼接为NDJSON放在结果的 ndjson 字段中（适用于不处理进度通知的客户端）。
+      整个结果在内存中生成，因此结果中最多放入约 DOCX_MCP_NDJSON_MAX_ELEMENTS（默认5000）个元素（按块计，可能多出不到一块）；
+      超过时结果带有 "truncated": true 和 next_cursor，其余元素通过 extract_document_structure(cursor=next_cursor) 分页获取。
+    请求 progress 但调用没有携带 progressToken 时（客户端不接收进度通知），自动改用 ndjson，
+    结果中的 delivery 为实际使用的方式。
+
+    :param document_url: .docx 文件的URL链接。
+    :param chunk_size: 每块的顶级元素数量（1~5000），默认200。
+    :param output_format: "full"（默认）或 "compact"，每块 elements 的格式，与 extract_document_structure 相同。
+    :param delivery: "progress" 或 "ndjson"。
+    :param include_timings: 为 True 时在结果中附加 timings（各阶段耗时和字节数）。
+    :return: {"total_elements", "chunks", "version", "document_hash", "format", "delivery"}，ndjson 模式另有 "ndjson"，
+             截断时另有 "truncated" 和 "next_cursor"。total_elements 和 version 始终针对整个文档，chunks 为实际发送的块数。
+    """
+    if output_format not in ("full", "compact"):
+        return {"error": f"Invalid output_format: {output_format}"}
+    if delivery not in ("progress", "ndjson"):
+        return {"error": f"Invalid delivery: {delivery}"}
+    if delivery == "progress" and _progress_token(ctx) is None:
+        # 没有 progressToken 时进度通知不会发出，分块只能放在结果中
+        delivery = "ndjson"
+    timer = StageTimer(metrics, "stream_document_structure")
+    result = await _stream_document_structure(document_url, max(1, min(int(chunk_size), 5000)), output_format,
+                                              delivery, ctx, timer)
+    return _finish_timer(timer, result, include_timings)
+
+def _progress_token(ctx: Optional[Context]) -> Any:
+    """返回本次调用请求中的 progressToken，客户端未请求进度通知时为 None。"""
+    request_context = ctx.request_context if ctx is not None else None
+    meta = getattr(request_context, "meta", None)
+    if isinstance(meta, dict):
+        return meta.get("progressToken")
+    return getattr(meta, "progressToken", None)
+
+async def _stream_document_structure(document_url: str, chunk_size: int, output_format: str, delivery: str,
+                                     ctx: Optional[Context], timer: StageTimer) -> Dict[str, Any]:
+    """stream_document_structure 的实现（内部函数）"""
+    try:
+        download = await _download(document_url, timer=timer)
+    except httpx.HTTPError as e:
+        return {"error": f"Failed to download document from URL: {str(e)}"}
+
+    loop = asyncio.get_running_loop()
+    # 解析线程与发送之间的有界队列：发送跟不上时解析线程阻塞，内存中最多保留几块
+    queue: asyncio.Queue = asyncio.Queue(maxsize=2)
+    stop = threading.Event()
+
+    def produce() -> float:
+        """在线程池中逐块解析，最后放入 None（正常结束）或异常作为结束标记，返回解析耗时。"""
+        parse_seconds = 0.0
+        end = None
+        try:
+            chunks = StreamingExtractor.iter_chunks(download.file, chunk_size)
+            while not stop.is_set():
+                started = time.monotonic()
+                chunk = next(chunks, None)
+                parse_seconds += time.monotonic() - started
+                if chunk is None:
+                    break
+                asyncio.run_coroutine_threadsafe(queue.put(chunk), loop).result()
+        except Exception as e:
+            end = e
+        asyncio.run_coroutine_threadsafe(queue.put(end), loop).result()
+        return parse_seconds
+
+    producer = loop.run_in_executor(_cpu_executor, produce)
+    digest = StructureDelta.version_digest()
+    lines: List[str] = []
+    max_elements = PROCESSOR_CONFIG["ndjson_max_elements"] if delivery == "ndjson" else 0
+    total = 0
+    delivered = 0
+    chunks = 0
+    finished = False
+    try:
+        while True:
+            item = await queue.get()
+            if item is None or isinstance(item, Exception):
+                finished = True
+                if item is not None:
+                    raise item
+                break
+            for element in item:
+                StructureDelta.add_to_version(digest, element)
+            total += len(item)
+            if max_elements and delivered >= max_elements:
+                # 超过上限后继续解析以得到元素总数和版本号，但不再放入结果
+                continue
+            line = json.dumps({
+                "chunk": chunks,
+                "start": StructurePager.element_index(item[0]["id"]),
+                "count": len(item),
+                "elements": CompactFormat.encode(item) if output_format == "compact" else item,
+            }, ensure_ascii=False, separators=(",", ":"))
+            delivered += len(item)
+            chunks += 1
+            timer.add_bytes("deliver", len(line))
+            with timer.stage("deliver"):
+                if delivery == "progress":
+                    await ctx.report_progress(total, None, line)
+                else:
+                    lines.append(line)
+    except Exception as e:
+        return {"error": f"Failed to stream document structure: {str(e)}"}
+    finally:
+        if not finished:
+            # 发送失败或被取消：通知解析线程停止，并取走队列中剩余的块使其能够退出
+            stop.set()
+            while True:
+                item = await queue.get()
+                if item is None or isinstance(item, Exception):
+                    break
+        timer.record("extract", await producer)
+        download.close()
+
+    result = {
+        "total_elements": total,
+        "chunks": chunks,
+        "version": digest.hexdigest(),
+        "document_hash": download.sha256,
+        "format": output_format,
+        "delivery": delivery,
+    }
+    if delivery == "ndjson":
+        result["ndjson"] = "\n".join(lines)
+        if delivered < total:
+            result["truncated"] = True
+            result["next_cursor"] = StructurePager.encode_cursor(download.sha256, delivered, max_elements, 0, None)
+    return result
+
+@mcp.tool()
+async def search_document(
+    document_url: str,
+    query: str,
+    limit: int = 10,
+    element_type: Optional[str] = None,
+    include_timings: bool = False
+) -> Dict[str, Any]:
+    """
+    在文档中搜索，返回按相关度排序的元素ID和摘要，无需把整个文档结构取回上下文。
+
+    索引基于 extract_document_structure 的元素文本建立（英文按词、中文按字和相邻两字切分），
+    并按文档内容哈希缓存，对同一文档的重复查询只需毫秒级时间。
+    返回的 id（段落 p_N 或单元格 tbl_N_rRcC）可以直接用于修改指令。
+
+    :param document_url: .docx 文件的URL链接。
+    :param query: 查询文本，例如 "liability" 或 "违约责任"；包含全部查询词或完整查询串的元素排名靠前。
+    :param limit: 最多返回的结果数，默认10。
+    :param element_type: 可选，"paragraph" 或 "cell"，只返回该类型的元素。
+    :param include_timings: 为 True 时在结果中附加 timings（各阶段耗时和字节数）。
+    :return: {"query", "version": 文档版本号, "total_matches": 匹配元素总数,
+              "results": [{"id", "type", "score", "snippet", "table_id"(仅单元格)}]}
+    """
+    timer = StageTimer(metrics, "search_document")
+    result = await _search_document(document_url, query, limit, element_type, timer)
+    return _finish_timer(timer, result, include_timings)
+
+async def _search_document(document_url: str, query: str, limit: int, element_type: Optional[str],
+                           timer: StageTimer) -> Dict[str, Any]:
+    """search_document 的实现（内部函数）"""
+    if element_type not in (None, "paragraph", "cell"):
+        return {"error": f"Invalid element_type: {element_type}"}
+    if not SearchIndex.tokenize(query, query=True):
+        return {"error": "Query contains no searchable terms"}
+    try:
+        digest, structure = await _load_structure(document_url, timer)
+        index = search_indexes.get(digest)
+        if index is None:
+            with timer.stage("index"):
+                index = await _run_cpu(SearchIndex, structure)
+            search_indexes.put(digest, index)
+        with timer.stage("search"):
+            found = index.search(query, limit, element_type)
+        return {"query": query, "version": index.version, **found}
+    except httpx.HTTPError as e:
+        return {"error": f"Failed to download document from URL: {str(e)}"}
+    except Exception as e:
+        return {"error": f"Failed to search document: {str(e)}"}
+
+@mcp.tool()
+def get_structure_cache_stats() -> Dict[str, Any]:
+    """
+    返回文档结构缓存的统计信息。
+
+    包括当前条目数、容量上限、命中/未命中/淘汰次数以及命中率，
+    可用于评估和调整缓存大小（环境变量 DOCX_MCP_STRUCTURE_CACHE_SIZE）。
+
+    :return: 包含缓存统计信息的字典。
+    """
+    return structure_cache.stats()
+
+@mcp.tool()
+def get_connection_pool_stats() -> Dict[str, Any]:
+    """
+    返回下载连接池和OSS连接池的统计信息。
+
+    包括请求数、新建连接数和连接复用率，可用于确认 keep-alive 连接是否被复用，
+    以及调整连接池大小（环境变量 DOCX_MCP_HTTP_POOL_SIZE / DOCX_MCP_OSS_POOL_SIZE）。
+
+    :return: 包含连接池统计信息的字典。
+    """
+    return connections.stats()
+
 @mcp.tool()
 def apply_modifications_to_document(
     original_file_content_base64: str,
@@ -153,9 +803,28 @@ def apply_modifications_to_document(
     :param original_file_content_base64: 原始 .docx 文件的 Base64 编码字符串。
     :param patches_json: 一个JSON格式的字符串，包含一个补丁列表。
                          例如: '[{"element_id": "p_0", "new_content": "New text"}]'
+                         段落补丁可以带 "start"/"end" 只替换该字符区间，或带 "mode": "diff" 只改写有变化的部分。
     :return: 修改后的 .docx 文件内容的 Base64 编码字符串。
     """
-    return _apply_modifications_core(original_file_content_base64, patches_json)
+    timer = StageTimer(metrics, "apply_modifications_to_document")
+    try:
+        with timer.stage("base64_decode"):
+            original_file_content = base64.b64decode(original_file_content_base64)
+        timer.add_bytes("base64_decode", len(original_file_content))
+    except Exception as e:
+        result = {"error": f"Failed to apply modifications: {str(e)}"}
+    else:
+        result = _apply_modifications_core(original_file_content, patches_json, timer)
+
+    if "error" in result:
+        _finish_timer(timer, result)
+        # 保持与旧版本一致：错误信息同样以 Base64 编码返回
+        return base64.b64encode(result["error"].encode('utf-8')).decode('utf-8')
+    with timer.stage("base64_encode"):
+        encoded = base64.b64encode(result["stream"].getbuffer()).decode('ascii')
+    timer.add_bytes("base64_encode", len(encoded))
+    _finish_timer(timer, result)
+    return encoded
 
 @mcp.tool()
 def get_modified_document(
@@ -178,9 +847,10 @@ def get_modified_document(
 
 
 @mcp.tool()
-def prepare_document_for_download(
+async def prepare_document_for_download(
     original_file_content_base64: str,
-    patches_json: str
+    patches_json: str,
+    include_timings: bool = False
 ) -> Dict[str, Any]:
     """
     将修改后的 .docx 文件上传到阿里云OSS，并返回访问链接。
@@ -190,35 +860,38 @@ def prepare_document_for_download(
 
     :param original_file_content_base64: 原始 .docx 文件的 Base64 编码字符串。
     :param patches_json: 一个JSON格式的字符串，包含一个补丁列表。
+    :param include_timings: 为 True 时在结果中附加 timings（各阶段耗时和字节数）。
     :return: 包含上传结果和访问链接的字典。
     """
+    timer = StageTimer(metrics, "prepare_document_for_download")
+    result = await _prepare_document_for_download(original_file_content_base64, patches_json, timer)
+    return _finish_timer(timer, result, include_timings)
+
+async def _prepare_document_for_download(original_file_content_base64: str, patches_json: str,
+                                         timer: StageTimer) -> Dict[str, Any]:
+    """prepare_document_for_download 的实现（内部函数）"""
     try:
-        # 首先应用修改，获取修改后的文件内容
-        modified_file_base64 = apply_modifications_to_document(original_file_content_base64, patches_json)
-        
-        # 检查是否是错误返回（Base64编码的错误信息）
-        try:
-            # 尝试解码，如果是错误信息会包含可读的错误文本
-            decoded_test = base64.b64decode(modified_file_base64).decode('utf-8')
-            if 'Failed to apply modifications' in decoded_test:
-                return {"error": decoded_test}
-        except:
-            # 解码失败说明是正常的文件内容，继续处理
-            pass
-        
-        # 解码修改后的文件内容
-        modified_file_bytes = base64.b64decode(modified_file_base64)
+        # 解码原始文件（仅此一次Base64解码）
+        with timer.stage("base64_decode"):
+            original_file_content = base64.b64decode(original_file_content_base64)
+        timer.add_bytes("base64_decode", len(original_file_content))
+
+        # 在线程池中应用修改，错误以结构化结果返回
+        result = await _run_cpu(_apply_modifications_core, original_file_content, patches_json, timer)
+        if "error" in result:
+            return {"error": result["error"]}
         
-        # 调用核心OSS上传逻辑
-        return _upload_to_oss_core(modified_file_bytes)
+        # 调用核心OSS上传逻辑，直接上传内存流
+        return await _run_io(_upload_to_oss_core, result["stream"], timer)
         
     except Exception as e:
         return {"error": f"处理文档时发生错误: {str(e)}"}
 
 @mcp.tool()
-def process_document_from_url(
+async def process_document_from_url(
     document_url: str,
-    patches_json: str
+    patches_json: str,
+    include_timings: bool = False
 ) -> Dict[str, Any]:
     """
     从URL下载文档，应用修改，然后上传到阿里云OSS。
@@ -228,47 +901,375 @@ def process_document_from_url(
 
     :param document_url: 原始 .docx 文件的URL链接。
     :param patches_json: 一个JSON格式的字符串，包含一个补丁列表。
+    :param include_timings: 为 True 时在结果中附加 timings（下载、解析、打补丁、保存、上传各阶段耗时和字节数）。
     :return: 包含上传结果和访问链接的字典。
     """
+    timer = StageTimer(metrics, "process_document_from_url")
+    result = await _process_document_from_url(document_url, patches_json, timer)
+    return _finish_timer(timer, result, include_timings)
+
+async def _process_document_from_url(document_url: str, patches_json: str, timer: StageTimer) -> Dict[str, Any]:
+    """process_document_from_url 的实现（内部函数）"""
     try:
-        # 首先下载原始文件
-        response = requests.get(document_url, timeout=30)
-        response.raise_for_status()
-        
-        # 将下载的文件内容转换为Base64
-        original_file_base64 = base64.b64encode(response.content).decode('utf-8')
-        
-        # 应用修改
-        modified_file_base64 = _apply_modifications_core(original_file_base64, patches_json)
-        
-        # 检查是否是错误返回（Base64编码的错误信息）
+        # 首先异步流式下载原始文件到临时文件
+        download = await _download(document_url, timer=timer)
         try:
-            # 尝试解码，如果是错误信息会包含可读的错误文本
-            decoded_test = base64.b64decode(modified_file_base64).decode('utf-8')
-            if 'Failed to apply modifications' in decoded_test:
-                return {"error": decoded_test}
-        except:
-            # 解码失败说明是正常的文件内容，继续处理
-            pass
-        
-        # 解码修改后的文件内容
-        modified_file_bytes = base64.b64decode(modified_file_base64)
+            # 在线程池中直接对下载的临时文件应用修改
+            result = await _run_cpu(_apply_modifications_core, download.file, patches_json, timer)
+        finally:
+            download.close()
+        if "error" in result:
+            return {"error": result["error"]}
         
         # 上传到OSS
-        return _upload_to_oss_core(modified_file_bytes)
+        return await _run_io(_upload_to_oss_core, result["stream"], timer)
         
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         return {"error": f"下载文档失败: {str(e)}"}
     except Exception as e:
         return {"error": f"处理文档时发生错误: {str(e)}"}
 
+@mcp.tool()
+async def process_documents_batch(
+    jobs_json: str,
+    patches_json: Optional[str] = None,
+    download_concurrency: Optional[int] = None,
+    process_concurrency: Optional[int] = None,
+    upload_concurrency: Optional[int] = None,
+    include_timings: bool = False,
+    ctx: Context = None
+) -> Dict[str, Any]:
+    """
+    批量处理多个文档：下载、应用修改、上传到阿里云OSS，一次调用完成。
+
+    下载、打补丁、上传三个阶段以流水线方式重叠执行，每个阶段的并发数可以单独设置。
+    每完成一个任务就通过进度通知上报一次（客户端提供了 progressToken 时），通知的 message 是一行JSON：
+    {"index", "document_url", "download_url", "filename"} 或 {"index", "document_url", "error"}，
+    progress 为已完成的任务数。最终结果按完成顺序列出每个任务的下载链接或错误信息，单个任务失败不影响其他任务。
+
+    :param jobs_json: JSON格式的任务列表，每个任务为 {"document_url": ..., "patches": [...]}，
+                      patches 可省略，此时使用公共的 patches_json。
+                      例如: '[{"document_url": "https://.../a.docx", "patches": [{"element_id": "p_0", "new_content": "x"}]}]'
+    :param patches_json: 所有未单独指定 patches 的任务共用的补丁列表（JSON字符串）。
+    :param download_concurrency: 同时下载的文档数，缺省使用 DOCX_MCP_BATCH_DOWNLOAD_CONCURRENCY。
+    :param process_concurrency: 同时打补丁的文档数，缺省使用 DOCX_MCP_BATCH_PROCESS_CONCURRENCY。
+    :param upload_concurrency: 同时上传的文档数，缺省使用 DOCX_MCP_BATCH_UPLOAD_CONCURRENCY。
+    :param include_timings: 为 True 时每个任务结果附带 timings，整体结果附带批处理总耗时。
+    :return: {"total", "succeeded", "failed", "results": [{"index", "document_url", "download_url"... 或 "error"}]}
+    """
+    try:
+        jobs = json.loads(jobs_json)
+        if not isinstance(jobs, list):
+            return {"error": "jobs_json must be a JSON list"}
+        if len(jobs) > BATCH_CONFIG["max_jobs"]:
+            return {"error": f"Too many jobs: {len(jobs)} (limit {BATCH_CONFIG['max_jobs']})"}
+
+        prepared = []
+        for index, job in enumerate(jobs):
+            if not isinstance(job, dict) or not job.get("document_url"):
+                return {"error": f"Job {index} must be an object with a document_url"}
+            patches = job.get("patches")
+            if patches is None:
+                if patches_json is None:
+                    return {"error": f"Job {index} has no patches and no shared patches_json was given"}
+                job_patches_json = patches_json
+            else:
+                job_patches_json = patches if isinstance(patches, str) else json.dumps(patches)
+            prepared.append({
+                "document_url": job["document_url"],
+                "patches_json": job_patches_json,
+                "timer": StageTimer(metrics, "process_documents_batch"),
+            })
+    except Exception as e:
+        return {"error": f"Invalid batch request: {str(e)}"}
+
+    batch_timer = StageTimer(metrics, "process_documents_batch")
+
+    async def download(job):
+        try:
+            return await _download(job["document_url"], timer=job["timer"])
+        except httpx.HTTPError as e:
+            raise RuntimeError(f"下载文档失败: {str(e)}")
+
+    async def process(job, document):
+        return await _run_cpu(_apply_modifications_core, document.file, job["patches_json"], job["timer"])
+
+    async def upload(job, result):
+        return await _run_io(_upload_to_oss_core, result["stream"], job["timer"])
+
+    pipeline = BatchPipeline(
+        download, process, upload,
+        download_concurrency=download_concurrency or BATCH_CONFIG["download_concurrency"],
+        process_concurrency=process_concurrency or BATCH_CONFIG["process_concurrency"],
+        upload_concurrency=upload_concurrency or BATCH_CONFIG["upload_concurrency"],
+        release=lambda document: document.close(),
+    )
+
+    completed = 0
+
+    async def on_result(result):
+        nonlocal completed
+        completed += 1
+        if ctx is not None:
+            # 进度通知的 message 是一行JSON，客户端无需等待最终结果即可拿到该任务的下载链接或错误
+            notice = {"index": result["index"], "document_url": prepared[result["index"]]["document_url"]}
+            if "error" in result:
+                notice["error"] = result["error"]
+            else:
+                notice.update({key: result[key] for key in ("download_url", "filename") if key in result})
+            await ctx.report_progress(completed, len(prepared),
+                                      json.dumps(notice, ensure_ascii=False, separators=(",", ":")))
+
+    results = await pipeline.run(prepared, on_result)
+    for result in results:
+        job = prepared[result["index"]]
+        result["document_url"] = job["document_url"]
+        if include_timings:
+            result["timings"] = job["timer"].result()
+    failed = sum(1 for result in results if "error" in result)
+    return _finish_timer(batch_timer, {
+        "total": len(prepared),
+        "succeeded": len(results) - failed,
+        "failed": failed,
+        "results": results,
+    }, include_timings)
+
+def _session_not_found(session_id: str) -> Dict[str, Any]:
+    return {"error": f"Session not found or expired: {session_id}"}
+
+@mcp.tool()
+async def open_editing_session(
+    document_url: Optional[str] = None,
+    file_content_base64: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    打开一个编辑会话：文档只下载、解析一次，之后的多次修改都直接作用在内存中的文档上。
+
+    document_url 和 file_content_base64 二选一。会话空闲超过 DOCX_MCP_SESSION_TTL 秒后过期，
+    会话总数或估算内存超过上限时，最久未使用的会话会被淘汰。
+
+    :param document_url: .docx 文件的URL链接。
+    :param file_content_base64: .docx 文件内容的 Base64 编码字符串。
+    :return: {"session_id": 会话ID, "ttl": 过期秒数, "estimated_size": 估算内存占用}
+    """
+    if (document_url is None) == (file_content_base64 is None):
+        return {"error": "Provide exactly one of document_url or file_content_base64"}
+    try:
+        if document_url is not None:
+            download = await _download(document_url)
+            try:
+                content = download.file.read()
+            finally:
+                download.close()
+        else:
+            content = base64.b64decode(file_content_base64)
+
+        session = await _run_cpu(sessions.open, content)
+        return {
+            "session_id": session.session_id,
+            "ttl": sessions.ttl,
+            "estimated_size": session.estimated_size,
+        }
+    except httpx.HTTPError as e:
+        return {"error": f"Failed to download document from URL: {str(e)}"}
+    except Exception as e:
+        return {"error": f"Failed to open editing session: {str(e)}"}
+
+@mcp.tool()
+async def apply_session_patches(session_id: str, patches_json: str) -> Dict[str, Any]:
+    """
+    在编辑会话中应用一批修改，不重新解析也不保存文档。
+
+    :param session_id: open_editing_session 返回的会话ID。
+    :param patches_json: JSON格式的补丁列表，格式与 apply_modifications_to_document 相同。
+    :return: {"success": True, "applied": 已修改的元素ID, "not_found": 未找到的元素ID, "edits": 会话累计修改次数}
+    """
+    session = sessions.get(session_id)
+    if session is None:
+        return _session_not_found(session_id)
+    try:
+        patches = [DocumentPatch(**p) for p in json.loads(patches_json)]
+        applied = await _run_cpu(session.apply, patches)
+        applied_set = set(applied)
+        return {
+            "success": True,
+            "applied": applied,
+            "not_found": [p.element_id for p in patches if p.element_id not in applied_set],
+            "edits": session.edits,
+        }
+    except Exception as e:
+        return {"error": f"Failed to apply modifications: {str(e)}"}
+
+@mcp.tool()
+async def save_editing_session(
+    session_id: str,
+    upload: bool = True,
+    close_session: bool = True
+) -> Dict[str, Any]:
+    """
+    保存编辑会话中的文档：上传到阿里云OSS，或以 Base64 返回文件内容。
+
+    :param session_id: open_editing_session 返回的会话ID。
+    :param upload: True 时上传到OSS并返回下载链接；False 时返回 file_content_base64。
+    :param close_session: 保存后是否关闭会话，释放内存。
+    :return: 上传结果字典，或 {"success": True, "file_content_base64": ...}
+    """
+    session = sessions.get(session_id)
+    if session is None:
+        return _session_not_found(session_id)
+    try:
+        stream = await _run_cpu(session.save)
+        if upload:
+            result = await _run_io(_upload_to_oss_core, stream)
+        else:
+            result = {"success": True, "file_content_base64": base64.b64encode(stream.getbuffer()).decode('ascii')}
+    except Exception as e:
+        return {"error": f"Failed to save editing session: {str(e)}"}
+    if close_session and "error" not in result:
+        sessions.close(session_id)
+    return result
+
+@mcp.tool()
+def close_editing_session(session_id: str) -> Dict[str, Any]:
+    """
+    关闭编辑会话并丢弃未保存的修改。
+
+    :param session_id: 会话ID。
+    :return: {"success": 会话是否存在}
+    """
+    return {"success": sessions.close(session_id)}
+
+@mcp.tool()
+def get_session_stats() -> Dict[str, Any]:
+    """
+    返回编辑会话的统计信息：当前会话数、估算内存占用、过期和淘汰次数。
+
+    :return: 包含会话统计信息的字典。
+    """
+    return sessions.stats()
+
+@mcp.tool()
+async def find_and_replace(
+    find: str,
+    replace: str,
+    document_url: Optional[str] = None,
+    session_id: Optional[str] = None,
+    regex: bool = False,
+    match_case: bool = True,
+    scope: str = "all",
+    start_id: Optional[str] = None,
+    end_id: Optional[str] = None,
+    max_replacements: int = 0,
+    include_timings: bool = False
+) -> Dict[str, Any]:
+    """
+    在服务端查找并替换文档中的文本，一次调用完成所有替换，无需先提取结构再逐段发送补丁。
+
+    跨越多个run的匹配同样会被替换；替换内容沿用匹配起点所在run的格式，未匹配的run保持不变。
+    document_url 和 session_id 二选一：给出 document_url 时下载、替换后上传到OSS；
+    给出 session_id 时直接修改编辑会话中的文档（需之后调用 save_editing_session 保存）。
+
+    :param find: 要查找的文本；regex 为 True 时为正则表达式（Python re 语法）。
+    :param replace: 替换文本；正则模式下可以用 \\1、\\g<name> 引用分组。
+    :param document_url: 原始 .docx 文件的URL链接。
+    :param session_id: open_editing_session 返回的会话ID。
+    :param regex: 是否按正则表达式匹配，默认按字面文本匹配。
+    :param match_case: 是否区分大小写，默认区分。
+    :param scope: 查找范围："all"（默认）、"paragraphs"（只处理顶级段落）或 "tables"（只处理表格）。
+    :param start_id: 可选，只处理从该元素ID开始的元素（含），例如 "p_100"。
+    :param end_id: 可选，只处理到该元素ID为止的元素（含）。
+    :param max_replacements: 最多替换的次数，0 表示不限制。
+    :param include_timings: 为 True 时在结果中附加 timings（各阶段耗时和字节数）。
+    :return: 替换总数 replacements、每个顶级元素的替换次数 elements（表格按 tbl_N 计），
+             以及上传结果和下载链接（URL模式）或会话累计修改次数 edits（会话模式）。
+    """
+    timer = StageTimer(metrics, "find_and_replace")
+    result = await _find_and_replace(find, replace, document_url, session_id, regex, match_case, scope,
+                                     start_id, end_id, max_replacements, timer)
+    return _finish_timer(timer, result, include_timings)
+
+async def _find_and_replace(find: str, replace: str, document_url: Optional[str], session_id: Optional[str],
+                            regex: bool, match_case: bool, scope: str, start_id: Optional[str],
+                            end_id: Optional[str], max_replacements: int, timer: StageTimer) -> Dict[str, Any]:
+    """find_and_replace 的实现（内部函数）"""
+    if (document_url is None) == (session_id is None):
+        return {"error": "Provide exactly one of document_url or session_id"}
+    # 参数错误在下载之前返回
+    if not find:
+        return {"error": "find must not be empty"}
+    if scope not in ("all", "paragraphs", "tables"):
+        return {"error": f"Invalid scope: {scope}"}
+    try:
+        if regex:
+            re.compile(find)
+        start, end = StructurePager.resolve_range(start_id, end_id)
+    except re.error as e:
+        return {"error": f"Invalid regular expression: {str(e)}"}
+    except ValueError as e:
+        return {"error": str(e)}
+    options = dict(regex=regex, match_case=match_case, scope=scope, start=start, end=end,
+                   max_replacements=max(0, max_replacements))
+
+    if session_id is not None:
+        session = sessions.get(session_id)
+        if session is None:
+            return _session_not_found(session_id)
+        try:
+            with timer.stage("replace"):
+                summary = await _run_cpu(lambda: session.find_and_replace(find, replace, **options))
+        except Exception as e:
+            return {"error": f"Failed to find and replace: {str(e)}"}
+        return {"success": True, **summary, "edits": session.edits}
+
+    try:
+        download = await _download(document_url, timer=timer)
+        try:
+            result = await _run_cpu(_find_and_replace_core, download.file, find, replace, options, timer)
+        finally:
+            download.close()
+        if "error" in result:
+            return {"error": result["error"]}
+
+        upload = await _run_io(_upload_to_oss_core, result.pop("stream"), timer)
+        if "error" in upload:
+            return upload
+        return {**upload, **result}
+    except httpx.HTTPError as e:
+        return {"error": f"Failed to download document from URL: {str(e)}"}
+    except Exception as e:
+        return {"error": f"处理文档时发生错误: {str(e)}"}
+
+@mcp.tool()
+def get_server_metrics() -> str:
+    """
+    以 Prometheus 文本格式返回服务指标。
+
+    包括各工具每个阶段（下载、Base64编解码、解析、打补丁、保存、上传等）的耗时直方图和处理字节数、
+    工具调用次数和总耗时，以及缓存、会话、连接池的当前状态。
+    设置 DOCX_MCP_METRICS_PORT 后，同样的内容也可以通过 http://<host>:<port>/metrics 抓取。
+
+    :return: Prometheus 文本格式的指标。
+    """
+    return metrics.render_prometheus()
+
 
 def main():
     """主入口点函数，用于uvx运行"""
+    # 预热工作进程，避免首个请求承担进程启动开销
+    if worker_pool is not None:
+        worker_pool.start()
+    # 按需启动 Prometheus 抓取端点
+    if METRICS_CONFIG["port"]:
+        serve_metrics(metrics, METRICS_CONFIG["host"], METRICS_CONFIG["port"])
     # 启动MCP服务
     # transport='stdio' 表示服务将通过标准输入/输出与客户端通信
     # 这是MCP的标准做法
-    mcp.run(transport='stdio')
+    try:
+        mcp.run(transport='stdio')
+    finally:
+        # 服务退出时关闭工作进程
+        if worker_pool is not None:
+            worker_pool.shutdown()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,106 @@
+"""
+CompactFormat 紧凑格式和 pack 压缩编码的测试。
+
+在项目根目录执行：python -m unittest discover -s tests
+"""
+import asyncio
+import io
+import os
+import sys
+import unittest
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+sys.path.insert(0, os.path.join(ROOT_DIR, "benchmarks"))
+
+import docgen  # noqa: E402
+import docx  # noqa: E402
+from docx.oxml.ns import qn  # noqa: E402
+from stubs import DocumentServer  # noqa: E402
+
+from core.compact_format import CompactFormat, COMPACT_FORMAT, PACK_ENCODING  # noqa: E402
+from core.docx_processor import DocxProcessor  # noqa: E402
+
+
+def make_document():
+    """带合并单元格的表格，部分段落带 w14:paraId 锚点。"""
+    document = docx.Document(io.BytesIO(docgen.generate(paragraphs=40, tables=2, table_rows=6, table_cols=4)))
+    for i, paragraph in enumerate(document.paragraphs[::5]):
+        paragraph._p.set(qn("w14:paraId"), f"{i + 1:08X}")
+    stream = io.BytesIO()
+    document.save(stream)
+    return stream.getvalue()
+
+
+class CompactFormatTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.content = make_document()
+        cls.structure = DocxProcessor.extract_structure_with_ids(io.BytesIO(cls.content))
+
+    def test_round_trip(self):
+        elements = self.structure["elements"]
+
+        compact = CompactFormat.encode(elements)
+
+        self.assertEqual(compact["format"], COMPACT_FORMAT)
+        self.assertEqual(compact["start"], 0)
+        self.assertEqual(compact["types"].count("t"), 2)
+        self.assertTrue(compact["anchors"])
+        self.assertTrue(any("spans" in table for table in compact["tables"]))
+        self.assertEqual(CompactFormat.decode(compact), elements)
+
+    def test_non_contiguous_elements_keep_their_ids(self):
+        # 例如增量结果中的 changed：元素不连续，改用 index 列表
+        elements = self.structure["elements"][3::7]
+
+        compact = CompactFormat.encode(elements)
+
+        self.assertNotIn("start", compact)
+        self.assertEqual(CompactFormat.decode(compact), elements)
+        self.assertEqual(CompactFormat.decode(CompactFormat.encode([])), [])
+
+    def test_pack_round_trip_and_size(self):
+        packed = CompactFormat.pack(self.structure)
+
+        self.assertEqual(CompactFormat.unpack(packed), self.structure)
+        self.assertLess(len(CompactFormat.pack(CompactFormat.encode(self.structure["elements"]))), len(packed))
+
+
+class CompactOutputTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        import main
+        cls.main = main
+        cls.server = DocumentServer()
+        cls.url = cls.server.publish("compact.docx", make_document())
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.close()
+
+    def extract(self, **kwargs):
+        async def run():
+            try:
+                return await self.main.extract_document_structure(self.url, **kwargs)
+            finally:
+                await self.main.connections.aclose()
+
+        return asyncio.run(run())
+
+    def test_compact_packed_page_decodes_to_full_page(self):
+        full = self.extract(start_id="p_10", limit=12)
+
+        packed = self.extract(start_id="p_10", limit=12, output_format="compact", pack=True)
+
+        self.assertEqual(packed["encoding"], PACK_ENCODING)
+        page = CompactFormat.unpack(packed["data"])
+        self.assertEqual(CompactFormat.decode(page["elements"]), full["elements"])
+        self.assertEqual({k: v for k, v in page.items() if k != "elements"},
+                         {k: v for k, v in full.items() if k != "elements"})
+        # 格式转换不修改缓存中共享的结构
+        self.assertIsInstance(self.extract()["elements"], list)
+
+
+if __name__ == "__main__":
+    unittest.main()
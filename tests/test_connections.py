@@ -0,0 +1,146 @@
+"""
+ConnectionManager 的测试。
+
+在项目根目录执行：python -m unittest discover -s tests
+"""
+import asyncio
+import hashlib
+import os
+import sys
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+sys.path.insert(0, os.path.join(ROOT_DIR, "benchmarks"))
+
+from stubs import DocumentServer  # noqa: E402
+
+from core.connections import ConnectionManager, OssConfigError  # noqa: E402
+
+
+def is_shut_down(stream):
+    """连接已被本端 shutdown 时，非阻塞读取立即返回EOF。"""
+    with stream.get_extra_info("socket").dup() as sock:
+        sock.setblocking(False)
+        try:
+            return sock.recv(1) == b""
+        except BlockingIOError:
+            return False
+
+
+class HttpClientLoopChangeTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = DocumentServer()
+        cls.url = cls.server.publish("a.docx", b"x" * 1024)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.close()
+
+    async def fetch(self, connections):
+        document = await connections.download(self.url)
+        document.close()
+        return connections.http_client()
+
+    def test_client_of_closed_loop_is_disconnected(self):
+        connections = ConnectionManager({})
+        old_client = asyncio.run(self.fetch(connections))
+        streams = list(connections._http_streams)
+        self.assertEqual(len(streams), 1)
+        self.assertFalse(is_shut_down(streams[0]))
+
+        async def second():
+            client = await self.fetch(connections)
+            await connections.aclose()
+            return client
+
+        new_client = asyncio.run(second())
+        self.assertIsNot(new_client, old_client)
+        self.assertTrue(is_shut_down(streams[0]))
+
+    def test_client_of_running_loop_is_closed_on_its_loop(self):
+        connections = ConnectionManager({})
+        loop = asyncio.new_event_loop()
+        thread = threading.Thread(target=loop.run_forever, daemon=True)
+        thread.start()
+        try:
+            old_client = asyncio.run_coroutine_threadsafe(self.fetch(connections), loop).result(10)
+
+            async def second():
+                client = connections.http_client()
+                await connections.aclose()
+                return client
+
+            self.assertIsNot(asyncio.run(second()), old_client)
+            # aclose 在旧循环上执行，排在它后面的任务完成时客户端已关闭
+            asyncio.run_coroutine_threadsafe(asyncio.sleep(0.05), loop).result(10)
+            self.assertTrue(old_client.is_closed)
+        finally:
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join(10)
+            loop.close()
+
+
+class RecordingSpooledFile(tempfile.SpooledTemporaryFile):
+    """记录每次写入所在的线程和字节数。"""
+
+    writes = []
+
+    def write(self, data):
+        self.writes.append((threading.get_ident(), len(data)))
+        return super().write(data)
+
+    def writelines(self, lines):
+        lines = list(lines)
+        self.writes.append((threading.get_ident(), sum(map(len, lines))))
+        return super().writelines(lines)
+
+
+class SpooledDownloadTest(unittest.TestCase):
+    def test_writes_past_spool_threshold_run_off_the_event_loop(self):
+        payload = os.urandom(3 * 1024 * 1024)
+        threshold = 256 * 1024
+        server = DocumentServer()
+        url = server.publish("large.docx", payload)
+        connections = ConnectionManager({})
+        RecordingSpooledFile.writes = []
+
+        async def download():
+            try:
+                document = await connections.download(url, spool_threshold=threshold)
+                return threading.get_ident(), document
+            finally:
+                await connections.aclose()
+
+        try:
+            with mock.patch("tempfile.SpooledTemporaryFile", RecordingSpooledFile):
+                loop_thread, document = asyncio.run(download())
+            content = document.file.read()
+            document.close()
+        finally:
+            server.close()
+
+        self.assertEqual(content, payload)
+        self.assertEqual(document.sha256, hashlib.sha256(payload).hexdigest())
+        on_loop = sum(n for thread, n in RecordingSpooledFile.writes if thread == loop_thread)
+        self.assertLessEqual(on_loop, threshold)
+        self.assertEqual(sum(n for _, n in RecordingSpooledFile.writes), len(payload))
+
+
+class OssConfigTest(unittest.TestCase):
+    def test_missing_credentials_are_reported(self):
+        connections = ConnectionManager({"endpoint": "https://oss-cn-shenzhen.aliyuncs.com", "access_key": None,
+                                         "secret_key": "", "bucket_name": "b", "domain": "https://b/"})
+        with self.assertRaises(OssConfigError) as raised:
+            connections.get_bucket()
+        self.assertIn("OSS_ACCESS_KEY", str(raised.exception))
+        self.assertIn("OSS_SECRET_KEY", str(raised.exception))
+        self.assertNotIn("OSS_BUCKET_NAME", str(raised.exception))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,197 @@
+"""
+DocxProcessor 补丁定位和应用的测试。
+
+在项目根目录执行：python -m unittest discover -s tests
+"""
+import io
+import os
+import re
+import sys
+import unittest
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+import docx  # noqa: E402
+from docx.oxml.ns import qn  # noqa: E402
+
+from core.docx_processor import DocxProcessor  # noqa: E402
+from core.models import DocumentPatch  # noqa: E402
+
+
+def make_anchored_document(count):
+    """生成 count 个带 w14:paraId 的段落，以及一个单元格中带锚点段落的表格。"""
+    document = docx.Document()
+    for i in range(count):
+        paragraph = document.add_paragraph(f"paragraph {i}")
+        paragraph._p.set(qn("w14:paraId"), f"{i + 1:08X}")
+    table = document.add_table(rows=1, cols=1)
+    table.cell(0, 0).paragraphs[0]._p.set(qn("w14:paraId"), "0000ABCD")
+    table.cell(0, 0).paragraphs[0].text = "in table"
+    stream = io.BytesIO()
+    document.save(stream)
+    return docx.Document(io.BytesIO(stream.getvalue()))
+
+
+def make_formatted_paragraph():
+    """生成一个由三个run组成的段落："Hello "（粗体）、"brave "（斜体）、"world"（无格式）。"""
+    document = docx.Document()
+    paragraph = document.add_paragraph()
+    paragraph.add_run("Hello ").bold = True
+    paragraph.add_run("brave ").italic = True
+    paragraph.add_run("world")
+    return document
+
+
+def runs_of(paragraph):
+    return [(run.text, run.bold, run.italic) for run in paragraph.runs]
+
+
+class AnchorPatchTest(unittest.TestCase):
+    def test_many_anchor_patches_in_one_batch(self):
+        document = make_anchored_document(200)
+        patches = [DocumentPatch(element_id=f"para:{i + 1:08X}", new_content=f"anchored {i}") for i in range(0, 200, 7)]
+        # 锚点大小写不敏感
+        patches.append(DocumentPatch(element_id="para:0000abcd", new_content="cell anchored"))
+        patches.append(DocumentPatch(element_id="para:FFFFFFFF", new_content="missing"))
+
+        applied = DocxProcessor.apply_patches_to_document(document, patches)
+
+        self.assertEqual(len(applied), len(range(0, 200, 7)) + 1)
+        self.assertNotIn("para:FFFFFFFF", applied)
+        texts = [p.text for p in document.paragraphs]
+        for i in range(200):
+            self.assertEqual(texts[i], f"anchored {i}" if i % 7 == 0 else f"paragraph {i}")
+        self.assertEqual(document.tables[0].cell(0, 0).text, "cell anchored")
+
+    def test_invalid_anchor_is_ignored(self):
+        document = make_anchored_document(3)
+        applied = DocxProcessor.apply_patches_to_document(
+            document, [DocumentPatch(element_id='para:"] | //w:p[@x="', new_content="x")])
+        self.assertEqual(applied, [])
+
+
+class CellPatchValidationTest(unittest.TestCase):
+    def test_diff_and_range_patches_on_cell_are_rejected(self):
+        for patch in (DocumentPatch(element_id="tbl_3_r0c0", new_content="x", mode="diff"),
+                      DocumentPatch(element_id="tbl_3_r0c0", new_content="x", start=0, end=1)):
+            document = make_anchored_document(3)
+            with self.assertRaises(ValueError):
+                DocxProcessor.apply_patches_to_document(
+                    document, [DocumentPatch(element_id="p_0", new_content="changed"), patch])
+            self.assertEqual(document.paragraphs[0].text, "paragraph 0")
+            self.assertEqual(document.tables[0].cell(0, 0).text, "in table")
+
+
+class RangeAndDiffPatchTest(unittest.TestCase):
+    def test_range_patch_rewrites_only_overlapping_runs(self):
+        document = make_formatted_paragraph()
+        bold_run = document.paragraphs[0].runs[0]._r
+
+        DocxProcessor.apply_patches_to_document(
+            document, [DocumentPatch(element_id="p_0", new_content="bold", start=6, end=11)])
+
+        paragraph = document.paragraphs[0]
+        self.assertEqual(runs_of(paragraph), [("Hello ", True, None), ("bold ", None, True), ("world", None, None)])
+        self.assertIs(paragraph.runs[0]._r, bold_run)
+
+    def test_multiple_ranges_are_relative_to_original_text(self):
+        document = make_formatted_paragraph()
+
+        DocxProcessor.apply_patches_to_document(document, [
+            DocumentPatch(element_id="p_0", new_content="earth", start=12),
+            DocumentPatch(element_id="p_0", new_content="Howdy", end=5),
+            DocumentPatch(element_id="p_0", new_content="very ", start=6, end=6),
+        ])
+
+        self.assertEqual(runs_of(document.paragraphs[0]),
+                         [("Howdy very ", True, None), ("brave ", None, True), ("earth", None, None)])
+
+    def test_overlapping_ranges_are_rejected_without_changes(self):
+        document = make_formatted_paragraph()
+        before = runs_of(document.paragraphs[0])
+
+        with self.assertRaises(ValueError):
+            DocxProcessor.apply_patches_to_document(document, [
+                DocumentPatch(element_id="p_0", new_content="a", start=0, end=8),
+                DocumentPatch(element_id="p_0", new_content="b", start=7, end=10),
+            ])
+        with self.assertRaises(ValueError):
+            DocxProcessor.apply_patches_to_document(
+                document, [DocumentPatch(element_id="p_0", new_content="x", start=10, end=99)])
+
+        self.assertEqual(runs_of(document.paragraphs[0]), before)
+
+    def test_diff_mode_keeps_unchanged_runs(self):
+        document = make_formatted_paragraph()
+        untouched = [run._r for run in document.paragraphs[0].runs]
+
+        DocxProcessor.apply_patches_to_document(
+            document, [DocumentPatch(element_id="p_0", new_content="Hello brave new world!", mode="diff")])
+
+        paragraph = document.paragraphs[0]
+        self.assertEqual(paragraph.text, "Hello brave new world!")
+        self.assertEqual(runs_of(paragraph), [("Hello ", True, None), ("brave new ", None, True), ("world!", None, None)])
+        self.assertEqual([run._r for run in paragraph.runs], untouched)
+
+
+class FindAndReplaceTest(unittest.TestCase):
+    def test_match_across_run_boundary_takes_first_run_formatting(self):
+        document = make_formatted_paragraph()
+
+        result = DocxProcessor.find_and_replace(document, "lo bra", "p, gra")
+
+        self.assertEqual(result, {"replacements": 1, "elements": {"p_0": 1}})
+        self.assertEqual(runs_of(document.paragraphs[0]),
+                         [("Help, gra", True, None), ("ve ", None, True), ("world", None, None)])
+
+    def test_match_spanning_three_runs_with_regex_groups(self):
+        document = make_formatted_paragraph()
+
+        result = DocxProcessor.find_and_replace(document, r"(h\w+) brave (W\w+)", r"\2 \1", regex=True,
+                                                match_case=False)
+
+        self.assertEqual(result["replacements"], 1)
+        self.assertEqual(runs_of(document.paragraphs[0]), [("world Hello", True, None)])
+
+    def test_scope_range_and_limit(self):
+        document = make_anchored_document(6)
+        document.tables[0].cell(0, 0).text = "paragraph in table"
+
+        self.assertEqual(DocxProcessor.find_and_replace(document, "paragraph", "x", scope="tables"),
+                         {"replacements": 1, "elements": {"tbl_6": 1}})
+        self.assertEqual(DocxProcessor.find_and_replace(document, "PARAGRAPH", "item", match_case=False,
+                                                        start=1, end=4, max_replacements=2),
+                         {"replacements": 2, "elements": {"p_1": 1, "p_2": 1}})
+        self.assertEqual([p.text for p in document.paragraphs],
+                         ["paragraph 0", "item 1", "item 2", "paragraph 3", "paragraph 4", "paragraph 5"])
+        self.assertEqual(document.tables[0].cell(0, 0).text, "x in table")
+
+    def test_bad_group_reference_leaves_document_unchanged(self):
+        document = make_anchored_document(3)
+
+        with self.assertRaises(re.error):
+            DocxProcessor.find_and_replace(document, r"paragraph (\d)", r"\2", regex=True)
+
+        self.assertEqual([p.text for p in document.paragraphs], ["paragraph 0", "paragraph 1", "paragraph 2"])
+
+
+class ElementNumberingTest(unittest.TestCase):
+    def test_find_and_replace_uses_extracted_ids(self):
+        document = make_anchored_document(3)
+        # 顶级的书签标记不是段落或表格，不参与编号
+        bookmark = document.element.body[1].makeelement(qn("w:bookmarkStart"), {qn("w:id"): "0", qn("w:name"): "b"})
+        document.element.body.insert(1, bookmark)
+        stream = io.BytesIO()
+        document.save(stream)
+        structure = DocxProcessor.extract_structure_with_ids(io.BytesIO(stream.getvalue()))
+        ids_by_text = {e.get("text"): e["id"] for e in structure["elements"]}
+
+        result = DocxProcessor.find_and_replace(docx.Document(io.BytesIO(stream.getvalue())), "paragraph 2", "x")
+
+        self.assertEqual(result["elements"], {ids_by_text["paragraph 2"]: 1})
+        self.assertEqual(structure, DocxProcessor.extract_structure_streaming(io.BytesIO(stream.getvalue())))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,119 @@
+"""
+LazyPackage 按需加载的测试。
+
+在项目根目录执行：python -m unittest discover -s tests
+"""
+import io
+import os
+import sys
+import unittest
+import zipfile
+from unittest import mock
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+sys.path.insert(0, os.path.join(ROOT_DIR, "benchmarks"))
+
+import docgen  # noqa: E402
+import docx  # noqa: E402
+
+from core import lazy_package  # noqa: E402
+from core.docx_processor import DocxProcessor  # noqa: E402
+from core.lazy_package import LazyPackage  # noqa: E402
+from core.models import DocumentPatch  # noqa: E402
+
+
+class ReadLog:
+    """记录通过 ZipFile.open 实际打开的条目名（ZipFile.read 也经由 open；不存在的条目不记录）。"""
+
+    def __init__(self):
+        self.names = []
+        original_open = zipfile.ZipFile.open
+
+        def recording_open(zipf, name, *args, **kwargs):
+            opened = original_open(zipf, name, *args, **kwargs)
+            self.names.append(name.filename if isinstance(name, zipfile.ZipInfo) else name)
+            return opened
+
+        self.patcher = mock.patch.object(zipfile.ZipFile, "open", recording_open)
+
+    def __enter__(self):
+        self.patcher.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.patcher.stop()
+
+    def media(self):
+        return [name for name in self.names if name.startswith("word/media/")]
+
+
+class LazyPackageTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.content = docgen.generate(paragraphs=20, tables=1, table_rows=3, media_count=3, media_size=100_000)
+
+    def test_open_and_read_text_never_reads_media(self):
+        with ReadLog() as log:
+            document = LazyPackage.open(io.BytesIO(self.content))
+            texts = [p.text for p in document.paragraphs]
+            styles = [p.style.name for p in document.paragraphs]
+
+        self.assertEqual(log.media(), [])
+        self.assertIn("word/document.xml", log.names)
+        expected = docx.Document(io.BytesIO(self.content))
+        self.assertEqual(texts, [p.text for p in expected.paragraphs])
+        self.assertEqual(styles, [p.style.name for p in expected.paragraphs])
+
+    def test_apply_patches_never_reads_media(self):
+        output = io.BytesIO()
+        with ReadLog() as log:
+            DocxProcessor.apply_patches(io.BytesIO(self.content), output,
+                                        [DocumentPatch(element_id="p_1", new_content="patched")])
+
+        self.assertEqual(log.media(), [])
+        result = docx.Document(io.BytesIO(output.getvalue()))
+        self.assertEqual(result.paragraphs[1].text, "patched")
+        with zipfile.ZipFile(io.BytesIO(self.content)) as before, zipfile.ZipFile(output) as after:
+            for name in before.namelist():
+                if name.startswith("word/media/"):
+                    self.assertEqual(after.read(name), before.read(name))
+
+    def test_media_is_read_on_first_access_and_saved_intact(self):
+        document = LazyPackage.open(io.BytesIO(self.content))
+        image_parts = [rel.target_part for rel in document.part.rels.values() if "image" in rel.reltype]
+        self.assertEqual(len(image_parts), 3)
+
+        with ReadLog() as log:
+            blob = image_parts[0].blob
+        self.assertEqual(log.media(), [image_parts[0].partname.lstrip("/")])
+
+        # python-docx 的完整保存会读取全部部件，结果与原文件一致
+        output = io.BytesIO()
+        document.save(output)
+        with zipfile.ZipFile(io.BytesIO(self.content)) as before, zipfile.ZipFile(output) as after:
+            self.assertEqual(after.read(image_parts[0].partname.lstrip("/")), blob)
+            for name in before.namelist():
+                if name.startswith("word/media/"):
+                    self.assertEqual(after.read(name), before.read(name))
+
+    def test_missing_docx_internals_fall_back_to_full_load(self):
+        # 模拟 python-docx 内部接口变化：需要的内部方法不存在
+        required = lazy_package._REQUIRED_DOCX_INTERNALS + ((lazy_package.PackageReader, "_removed_in_future_docx"),)
+        with mock.patch.object(lazy_package, "_REQUIRED_DOCX_INTERNALS", required):
+            self.assertFalse(LazyPackage.supported())
+            document = LazyPackage.open(io.BytesIO(self.content))
+            output = io.BytesIO()
+            DocxProcessor.apply_patches(io.BytesIO(self.content), output,
+                                        [DocumentPatch(element_id="p_1", new_content="patched")])
+
+        self.assertTrue(LazyPackage.supported())
+        parts = [rel.target_part for rel in document.part.rels.values()]
+        self.assertFalse(any(type(part).__name__.startswith("Lazy") for part in parts))
+        self.assertEqual([p.text for p in document.paragraphs],
+                         [p.text for p in docx.Document(io.BytesIO(self.content)).paragraphs])
+        self.assertEqual(docx.Document(io.BytesIO(output.getvalue())).paragraphs[1].text, "patched")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,45 @@
+"""
+指标输出的测试。
+
+在项目根目录执行：python -m unittest discover -s tests
+"""
+import os
+import sys
+import unittest
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from core.metrics import MetricsRegistry  # noqa: E402
+
+
+def metric_types(text):
+    return dict(line.split()[2:4] for line in text.splitlines() if line.startswith("# TYPE "))
+
+
+class CollectorKindTest(unittest.TestCase):
+    def test_counter_collector_is_rendered_as_counter(self):
+        registry = MetricsRegistry()
+        registry.register_collector(lambda: {"cache_entries": 3})
+        registry.register_collector(lambda: {"cache_hits_total": 7}, kind="counter")
+        text = registry.render_prometheus()
+
+        self.assertEqual(metric_types(text), {"cache_entries": "gauge", "cache_hits_total": "counter"})
+        self.assertIn("cache_hits_total 7\n", text)
+
+    def test_invalid_kind_is_rejected(self):
+        with self.assertRaises(ValueError):
+            MetricsRegistry().register_collector(dict, kind="summary")
+
+    def test_server_cache_statistics_are_counters(self):
+        import main
+        types = metric_types(main.metrics.render_prometheus())
+
+        self.assertEqual(types["docx_mcp_structure_cache_hits_total"], "counter")
+        self.assertEqual(types["docx_mcp_structure_cache_misses_total"], "counter")
+        self.assertEqual(types["docx_mcp_structure_cache_entries"], "gauge")
+        self.assertNotIn("docx_mcp_structure_cache_hits", types)
+
+
+if __name__ == "__main__":
+    unittest.main()
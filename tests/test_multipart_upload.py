@@ -0,0 +1,91 @@
+"""
+分片上传和断点续传的测试，使用本地的模拟OSS端点（benchmarks/stubs.py 中的 FakeOSS）。
+
+在项目根目录执行：python -m unittest discover -s tests
+"""
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+sys.path.insert(0, os.path.join(ROOT_DIR, "benchmarks"))
+
+from stubs import FakeOSS  # noqa: E402
+
+from core.connections import ConnectionManager  # noqa: E402
+from core.multipart_upload import MultipartUploader, oss2  # noqa: E402
+
+BUCKET = "test-bucket"
+# oss2 允许的最小分片为100KB
+PART_SIZE = 100 * 1024
+
+
+def make_payload(parts):
+    """生成 parts 个完整分片再加半个分片的数据，各分片内容互不相同。"""
+    return b"".join(bytes([n]) * PART_SIZE for n in range(parts)) + b"tail" * (PART_SIZE // 8)
+
+
+class MultipartUploadTest(unittest.TestCase):
+    def setUp(self):
+        self.oss = FakeOSS(keep_content=True)
+        self.oss_config = {"endpoint": self.oss.endpoint, "access_key": "test", "secret_key": "test",
+                           "bucket_name": BUCKET, "domain": f"{self.oss.endpoint}/{BUCKET}/"}
+        self.connections = ConnectionManager(self.oss_config)
+        self.checkpoints = tempfile.TemporaryDirectory()
+        self.uploader = MultipartUploader(part_size=PART_SIZE, concurrency=2, max_retries=1,
+                                          checkpoint_dir=self.checkpoints.name)
+
+    def tearDown(self):
+        self.oss.close()
+        self.checkpoints.cleanup()
+
+    def test_upload_above_threshold_uses_multipart(self):
+        import main
+        payload = make_payload(4)
+        with mock.patch.object(main, "connections", self.connections), \
+                mock.patch.object(main, "multipart_uploader", self.uploader), \
+                mock.patch.dict(main.OSS_CONFIG, self.oss_config), \
+                mock.patch.dict(main.UPLOAD_CONFIG, {"multipart_threshold": 2 * PART_SIZE}):
+            result = main._upload_to_oss(payload)
+            small = main._upload_to_oss(b"small document")
+
+        self.assertNotIn("error", result)
+        self.assertEqual(self.oss.content(result["filename"]), payload)
+        self.assertEqual(sorted(self.oss.part_requests), [1, 2, 3, 4, 5])
+        self.assertTrue(result["download_url"].startswith(self.oss_config["domain"]))
+        # 低于阈值的文档用一次 PutObject 上传
+        self.assertEqual(self.oss.content(small["filename"]), b"small document")
+        self.assertEqual(len(self.oss.part_requests), 5)
+
+    def test_interrupted_upload_resumes_missing_parts_only(self):
+        payload = make_payload(5)
+        bucket = self.connections.get_bucket()
+
+        self.oss.fail_parts(4)
+        with self.assertRaises(oss2.exceptions.OssError):
+            self.uploader.upload(bucket, "first-attempt.docx", payload)
+        first_attempt = set(self.oss.part_requests)
+        self.assertIn(4, first_attempt)
+        self.assertEqual(self.oss.uploaded_objects, 0)
+
+        # checkpoint 记录了上传任务和已完成的分片
+        record = self.uploader.store.get(MultipartUploader.checkpoint_id(payload))
+        self.assertEqual(record["key"], "first-attempt.docx")
+        uploaded = {int(n) for n in record["parts"]}
+        self.assertNotIn(4, uploaded)
+
+        self.oss.fail_parts()
+        key, _ = self.uploader.upload(bucket, "second-attempt.docx", payload)
+
+        # 沿用第一次的对象名和 upload_id，只重新发送服务端缺失的分片
+        self.assertEqual(key, "first-attempt.docx")
+        self.assertEqual(set(self.oss.part_requests), set(range(1, 7)) - uploaded)
+        self.assertEqual(self.oss.content(key), payload)
+        self.assertIsNone(self.uploader.store.get(MultipartUploader.checkpoint_id(payload)))
+
+
+if __name__ == "__main__":
+    unittest.main()
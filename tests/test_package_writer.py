@@ -0,0 +1,116 @@
+"""
+PackageWriter 增量保存的测试。
+
+在项目根目录执行：python -m unittest discover -s tests
+"""
+import io
+import os
+import struct
+import sys
+import unittest
+import zipfile
+from unittest import mock
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+sys.path.insert(0, os.path.join(ROOT_DIR, "benchmarks"))
+
+import docgen  # noqa: E402
+import docx  # noqa: E402
+
+from core.docx_processor import DocxProcessor  # noqa: E402
+from core.models import DocumentPatch  # noqa: E402
+from core import package_writer  # noqa: E402
+from core.package_writer import PackageWriter  # noqa: E402
+
+
+def raw_entries(content):
+    """返回 {条目名: 压缩后的原始字节}。"""
+    entries = {}
+    with zipfile.ZipFile(io.BytesIO(content)) as package:
+        for info in package.infolist():
+            header = content[info.header_offset:info.header_offset + 30]
+            name_length, extra_length = struct.unpack("<HH", header[26:30])
+            start = info.header_offset + 30 + name_length + extra_length
+            entries[info.filename] = content[start:start + info.compress_size]
+    return entries
+
+
+def patch_first_paragraph(content, text="patched"):
+    output = io.BytesIO()
+    DocxProcessor.apply_patches(io.BytesIO(content), output, [DocumentPatch(element_id="p_0", new_content=text)])
+    return output.getvalue()
+
+
+class PackageWriterTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.content = docgen.generate(paragraphs=30, tables=1, table_rows=3, media_count=2, media_size=50_000)
+
+    def test_untouched_entries_are_copied_byte_for_byte(self):
+        result = patch_first_paragraph(self.content)
+
+        before, after = raw_entries(self.content), raw_entries(result)
+        self.assertEqual(list(after), list(before))
+        for name in before:
+            if name == "word/document.xml":
+                self.assertNotEqual(after[name], before[name])
+            else:
+                self.assertEqual(after[name], before[name], name)
+        with zipfile.ZipFile(io.BytesIO(result)) as package:
+            self.assertIsNone(package.testzip())
+        self.assertEqual(docx.Document(io.BytesIO(result)).paragraphs[0].text, "patched")
+
+    def test_rewrite_replaces_only_named_parts(self):
+        output = io.BytesIO()
+        PackageWriter.rewrite(io.BytesIO(self.content), output, {"word/styles.xml": b"<replaced/>"})
+        with zipfile.ZipFile(output) as package:
+            self.assertEqual(package.read("word/styles.xml"), b"<replaced/>")
+        with self.assertRaises(KeyError):
+            PackageWriter.rewrite(io.BytesIO(self.content), io.BytesIO(), {"word/missing.xml": b""})
+
+    def test_unchanged_document_is_copied_verbatim(self):
+        output = io.BytesIO()
+        DocxProcessor.apply_patches(io.BytesIO(self.content), output, [DocumentPatch(element_id="p_999", new_content="x")])
+        self.assertEqual(output.getvalue(), self.content)
+
+    def test_failed_raw_copy_falls_back_to_document_save(self):
+        calls = []
+        original_copy = PackageWriter._copy_raw_entry
+
+        def failing_copy(source, target, info):
+            # 先写入几个条目再失败，确认回退时丢弃了不完整的输出
+            calls.append(info.filename)
+            if len(calls) > 3:
+                raise zipfile.BadZipFile("simulated failure")
+            original_copy(source, target, info)
+
+        with mock.patch.object(PackageWriter, "_copy_raw_entry", staticmethod(failing_copy)), \
+                mock.patch.object(docx.document.Document, "save", autospec=True,
+                                  side_effect=docx.document.Document.save) as save:
+            result = patch_first_paragraph(self.content)
+
+        self.assertEqual(save.call_count, 1)
+        with zipfile.ZipFile(io.BytesIO(result)) as package:
+            self.assertIsNone(package.testzip())
+            self.assertEqual(sorted(package.namelist()), sorted(raw_entries(self.content)))
+        self.assertEqual(docx.Document(io.BytesIO(result)).paragraphs[0].text, "patched")
+
+    def test_zipfile_without_raw_copy_support_falls_back_to_document_save(self):
+        # 模拟 zipfile 内部接口变化：需要的内部属性不存在
+        attrs = package_writer._ZIPFILE_WRITER_ATTRS + ("_removed_in_future_python",)
+        with mock.patch.object(package_writer, "_ZIPFILE_WRITER_ATTRS", attrs), \
+                mock.patch.object(PackageWriter, "_copy_raw_entry") as copy_raw, \
+                mock.patch.object(docx.document.Document, "save", autospec=True,
+                                  side_effect=docx.document.Document.save) as save:
+            with self.assertRaises(NotImplementedError):
+                PackageWriter.rewrite(io.BytesIO(self.content), io.BytesIO(), {})
+            result = patch_first_paragraph(self.content)
+
+        copy_raw.assert_not_called()
+        self.assertEqual(save.call_count, 1)
+        self.assertEqual(docx.Document(io.BytesIO(result)).paragraphs[0].text, "patched")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,101 @@
+"""
+SearchIndex 分词和 BM25 排序的测试。
+
+在项目根目录执行：python -m unittest discover -s tests
+"""
+import os
+import sys
+import unittest
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from core.search_index import SearchIndex  # noqa: E402
+
+
+def make_structure(texts, cells=()):
+    """按文本生成段落 p_N，cells 非空时在末尾追加一个单行表格。"""
+    elements = [{"id": f"p_{i}", "type": "paragraph", "text": text} for i, text in enumerate(texts)]
+    if cells:
+        table_id = f"tbl_{len(texts)}"
+        elements.append({"id": table_id, "type": "table", "rows": [
+            {"cells": [{"id": f"{table_id}_r0c{c}", "text": text} for c, text in enumerate(cells)]}]})
+    return {"elements": elements, "version": "v1"}
+
+
+def ids(found):
+    return [result["id"] for result in found["results"]]
+
+
+class TokenizeTest(unittest.TestCase):
+    def test_cjk_is_indexed_as_characters_and_bigrams(self):
+        self.assertEqual(SearchIndex.tokenize("Total 违约责任"),
+                         ["total", "违", "约", "责", "任", "违约", "约责", "责任"])
+
+    def test_cjk_query_uses_bigrams_only(self):
+        self.assertEqual(SearchIndex.tokenize("Total 违约责任", query=True), ["total", "违约", "约责", "责任"])
+        self.assertEqual(SearchIndex.tokenize("违", query=True), ["违"])
+        self.assertEqual(SearchIndex.tokenize(" _-，。", query=True), [])
+
+
+class SearchRankingTest(unittest.TestCase):
+    def test_cjk_bigram_does_not_match_scattered_characters(self):
+        index = SearchIndex(make_structure([
+            "乙方应按期付款。",
+            "付出的努力与款项无关。",
+            "无关的段落",
+        ]))
+
+        found = index.search("付款")
+
+        # p_1 含有“付”和“款”两个字，但没有相邻的“付款”
+        self.assertEqual(found["total_matches"], 1)
+        self.assertEqual(ids(found), ["p_0"])
+
+    def test_bm25_prefers_rare_terms_and_short_elements(self):
+        index = SearchIndex(make_structure([
+            "the contract term",
+            "the liability of the parties under the contract and all related agreements",
+            "the liability",
+            "the the the",
+        ]))
+
+        # "liability" 比 "the" 更少见，权重更高；同样命中时较短的元素得分更高
+        self.assertEqual(ids(index.search("the liability")), ["p_2", "p_1", "p_3", "p_0"])
+
+    def test_elements_with_all_terms_and_phrase_rank_first(self):
+        index = SearchIndex(make_structure([
+            "违约方承担赔偿",
+            "违约责任由乙方承担",
+            "责任限制条款",
+            "乙方的违约与责任",
+        ]))
+
+        found = index.search("违约责任")
+
+        self.assertEqual(ids(found)[0], "p_1")
+        self.assertEqual(set(ids(found)), {"p_0", "p_1", "p_2", "p_3"})
+        self.assertGreater(found["results"][1]["score"], found["results"][-1]["score"])
+
+    def test_cells_are_indexed_and_filterable(self):
+        index = SearchIndex(make_structure(["付款方式见下表"], cells=["付款日期", "金额"]))
+
+        cells = index.search("付款", element_type="cell")
+        paragraphs = index.search("付款", element_type="paragraph", limit=1)
+
+        self.assertEqual(cells["results"], [{"id": "tbl_1_r0c0", "type": "cell", "score": cells["results"][0]["score"],
+                                             "snippet": "付款日期", "table_id": "tbl_1"}])
+        self.assertEqual(ids(paragraphs), ["p_0"])
+
+    def test_snippet_centers_on_first_hit(self):
+        text = "前言" * 100 + "违约责任" + "结尾" * 100
+        index = SearchIndex(make_structure([text]))
+
+        snippet = index.search("违约责任", snippet_length=40)["results"][0]["snippet"]
+
+        self.assertIn("违约责任", snippet)
+        self.assertTrue(snippet.startswith("…") and snippet.endswith("…"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,100 @@
+"""
+编辑会话的测试。
+
+在项目根目录执行：python -m unittest discover -s tests
+"""
+import io
+import os
+import sys
+import unittest
+from unittest import mock
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+import docx  # noqa: E402
+
+from core.models import DocumentPatch  # noqa: E402
+from core.run_formatter import RunOffsetTable  # noqa: E402
+from core.session_store import SessionStore  # noqa: E402
+
+
+def make_document(texts):
+    document = docx.Document()
+    for text in texts:
+        paragraph = document.add_paragraph()
+        paragraph.add_run(text[:3]).bold = True
+        paragraph.add_run(text[3:])
+    table = document.add_table(rows=1, cols=2)
+    table.cell(0, 0).text = "cell"
+    stream = io.BytesIO()
+    document.save(stream)
+    return stream.getvalue()
+
+
+def paragraph_texts(content):
+    return [p.text for p in docx.Document(io.BytesIO(content)).paragraphs]
+
+
+class EditingSessionAtomicityTest(unittest.TestCase):
+    def setUp(self):
+        self.texts = ["first paragraph", "second paragraph", "third paragraph"]
+        self.session = SessionStore().open(make_document(self.texts))
+
+    def test_failed_batch_leaves_document_unchanged(self):
+        # p_0 和 p_1 先被修改，p_2 的区间越界
+        patches = [
+            DocumentPatch(element_id="p_0", new_content="changed"),
+            DocumentPatch(element_id="p_1", new_content="X", start=0, end=6),
+            DocumentPatch(element_id="p_2", new_content="X", start=0, end=999),
+        ]
+        with self.assertRaises(ValueError):
+            self.session.apply(patches)
+
+        self.assertEqual(self.session.edits, 0)
+        self.assertFalse(self.session.changed)
+        self.assertEqual([p.text for p in self.session.document.paragraphs], self.texts)
+        self.assertEqual(paragraph_texts(self.session.save().getvalue()), self.texts)
+
+    def test_failed_batch_then_successful_batch(self):
+        with self.assertRaises(ValueError):
+            self.session.apply([
+                DocumentPatch(element_id="p_0", new_content="A", start=0, end=5),
+                DocumentPatch(element_id="p_0", new_content="B", start=3, end=8),
+            ])
+        self.assertEqual(self.session.apply([DocumentPatch(element_id="p_1", new_content="done")]), ["p_1"])
+
+        self.assertEqual(self.session.edits, 1)
+        self.assertTrue(self.session.changed)
+        self.assertEqual(paragraph_texts(self.session.save().getvalue()), ["first paragraph", "done", "third paragraph"])
+
+    def test_range_patch_on_cell_is_rejected_before_any_change(self):
+        with self.assertRaises(ValueError):
+            self.session.apply([
+                DocumentPatch(element_id="p_0", new_content="changed"),
+                DocumentPatch(element_id="tbl_3_r0c0", new_content="X", start=0, end=1),
+            ])
+        self.assertEqual([p.text for p in self.session.document.paragraphs], self.texts)
+
+    def test_failed_find_and_replace_is_rolled_back(self):
+        # 第一个段落替换完成后，第二个段落的替换出错
+        original_replace = RunOffsetTable.replace
+        calls = []
+
+        def failing_replace(table, start, end, text):
+            calls.append(start)
+            if len(calls) > 1:
+                raise RuntimeError("simulated failure")
+            return original_replace(table, start, end, text)
+
+        with mock.patch.object(RunOffsetTable, "replace", failing_replace):
+            with self.assertRaises(RuntimeError):
+                self.session.find_and_replace("paragraph", "para")
+
+        self.assertEqual(self.session.edits, 0)
+        self.assertFalse(self.session.changed)
+        self.assertEqual([p.text for p in self.session.document.paragraphs], self.texts)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,115 @@
+"""
+stream_document_structure 的测试。
+
+在项目根目录执行：python -m unittest discover -s tests
+"""
+import asyncio
+import json
+import os
+import sys
+import unittest
+from unittest import mock
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+sys.path.insert(0, os.path.join(ROOT_DIR, "benchmarks"))
+
+import docgen  # noqa: E402
+from stubs import DocumentServer  # noqa: E402
+
+
+class StreamDocumentStructureTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        import main
+        cls.main = main
+        cls.server = DocumentServer()
+        cls.url = cls.server.publish("stream.docx", docgen.generate(paragraphs=120, tables=1, table_rows=5))
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.close()
+
+    def call_tool(self, arguments, progress_handler=None):
+        """
+        通过MCP客户端调用工具。
+
+        不传 progress_handler 时使用底层会话发送请求，请求中不带 progressToken
+        （fastmcp.Client.call_tool 总会附带 progressToken）。
+        """
+        from fastmcp import Client
+
+        async def run():
+            async with Client(self.main.mcp) as client:
+                if progress_handler is None:
+                    result = (await client.session.call_tool("stream_document_structure", arguments)).structuredContent
+                else:
+                    result = (await client.call_tool(
+                        "stream_document_structure", arguments, progress_handler=progress_handler)).data
+            await self.main.connections.aclose()
+            return result
+
+        return asyncio.run(run())
+
+    def expected_elements(self):
+        async def run():
+            self.main.structure_cache.clear()
+            result = await self.main.extract_document_structure(self.url)
+            await self.main.connections.aclose()
+            return result
+
+        return asyncio.run(run())["elements"]
+
+    def test_default_delivery_without_progress_token_returns_elements(self):
+        # 客户端不处理进度通知时不会发送 progressToken，元素必须出现在结果中
+        result = self.call_tool({"document_url": self.url, "chunk_size": 50})
+
+        self.assertNotIn("error", result)
+        self.assertEqual(result["delivery"], "ndjson")
+        chunks = [json.loads(line) for line in result["ndjson"].split("\n")]
+        elements = [element for chunk in chunks for element in chunk["elements"]]
+        self.assertEqual(len(elements), result["total_elements"])
+        self.assertEqual(elements, self.expected_elements())
+
+    def test_ndjson_is_capped_with_continuation_cursor(self):
+        with mock.patch.dict(self.main.PROCESSOR_CONFIG, {"ndjson_max_elements": 50}):
+            result = self.call_tool({"document_url": self.url, "chunk_size": 20, "delivery": "ndjson"})
+
+        chunks = [json.loads(line) for line in result["ndjson"].split("\n")]
+        elements = [element for chunk in chunks for element in chunk["elements"]]
+        # 上限按块计算：第三块开始时只发送了40个元素，因此放入60个
+        self.assertEqual((result["chunks"], len(elements)), (3, 60))
+        self.assertTrue(result["truncated"])
+
+        async def rest(cursor):
+            pages = []
+            while cursor:
+                page = await self.main.extract_document_structure(self.url, cursor=cursor)
+                self.assertNotIn("error", page)
+                pages.extend(page["elements"])
+                cursor = page["next_cursor"]
+            await self.main.connections.aclose()
+            return pages
+
+        elements.extend(asyncio.run(rest(result["next_cursor"])))
+        expected = self.expected_elements()
+        self.assertEqual(elements, expected)
+        self.assertEqual(result["total_elements"], len(expected))
+
+    def test_progress_delivery_with_progress_token(self):
+        chunks = []
+
+        async def on_progress(progress, total, message):
+            chunks.append(json.loads(message))
+
+        result = self.call_tool({"document_url": self.url, "chunk_size": 50}, progress_handler=on_progress)
+
+        self.assertEqual(result["delivery"], "progress")
+        self.assertNotIn("ndjson", result)
+        self.assertEqual(len(chunks), result["chunks"])
+        elements = [element for chunk in sorted(chunks, key=lambda c: c["chunk"]) for element in chunk["elements"]]
+        self.assertEqual(elements, self.expected_elements())
+
+
+if __name__ == "__main__":
+    unittest.main()
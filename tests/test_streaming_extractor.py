@@ -0,0 +1,96 @@
+"""
+流式提取引擎与 python-docx 提取结果一致性的测试。
+
+在项目根目录执行：python -m unittest discover -s tests
+"""
+import io
+import os
+import sys
+import unittest
+import zipfile
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+sys.path.insert(0, os.path.join(ROOT_DIR, "benchmarks"))
+
+import docgen  # noqa: E402
+import docx  # noqa: E402
+from docx.enum.text import WD_BREAK  # noqa: E402
+from docx.oxml.ns import qn  # noqa: E402
+
+from core.docx_processor import DocxProcessor  # noqa: E402
+from core.streaming_extractor import StreamingExtractor  # noqa: E402
+
+
+def document_with_default_flag(value):
+    """生成一个段落未指定样式的文档，默认段落样式 Normal 的 w:default 设为 value。"""
+    document = docx.Document()
+    document.add_paragraph("text")
+    stream = io.BytesIO()
+    document.save(stream)
+    source = zipfile.ZipFile(io.BytesIO(stream.getvalue()))
+    output = io.BytesIO()
+    with zipfile.ZipFile(output, "w") as target:
+        for info in source.infolist():
+            data = source.read(info)
+            if info.filename == "word/styles.xml":
+                data = data.replace(b'w:default="1" w:styleId="Normal"',
+                                    f'w:default="{value}" w:styleId="Normal"'.encode())
+            target.writestr(info, data)
+    return output.getvalue()
+
+
+def mixed_document():
+    """包含标题、制表符、换行、空段落、锚点、嵌套表格和合并单元格的文档。"""
+    document = docx.Document()
+    document.add_heading("标题", level=1)
+    paragraph = document.add_paragraph("first\tsecond", style="List Bullet")
+    paragraph.add_run().add_break(WD_BREAK.LINE)
+    paragraph.add_run("after break")
+    paragraph._p.set(qn("w14:paraId"), "1A2B3C4D")
+    document.add_paragraph()
+    table = document.add_table(rows=3, cols=3)
+    table.cell(0, 0).merge(table.cell(0, 1))
+    table.cell(1, 2).merge(table.cell(2, 2))
+    table.cell(1, 0).text = "第一行\n第二行"
+    table.cell(2, 1).add_table(rows=1, cols=2).cell(0, 1).text = "nested"
+    document.add_paragraph("中文段落", style="Quote")
+    stream = io.BytesIO()
+    document.save(stream)
+    return stream.getvalue()
+
+
+class EngineEquivalenceTest(unittest.TestCase):
+    def assert_same_structure(self, content):
+        expected = DocxProcessor.extract_structure_with_ids(io.BytesIO(content))
+        self.assertEqual(DocxProcessor.extract_structure_streaming(io.BytesIO(content)), expected)
+        self.assertEqual(list(StreamingExtractor.iter_elements(io.BytesIO(content))), expected["elements"])
+
+    def test_mixed_document(self):
+        self.assert_same_structure(mixed_document())
+
+    def test_generated_documents(self):
+        for params in ({"paragraphs": 80, "tables": 2, "table_rows": 6},
+                       {"paragraphs": 20, "tables": 1, "table_rows": 4, "merged_cells": True, "media_count": 2},
+                       {"paragraphs": 0, "tables": 0}):
+            with self.subTest(**params):
+                self.assert_same_structure(docgen.generate(**params))
+
+
+class DefaultStyleFlagTest(unittest.TestCase):
+    def test_engines_accept_the_same_on_values(self):
+        for value in ("1", "true", "on"):
+            content = document_with_default_flag(value)
+            expected = DocxProcessor.extract_structure_with_ids(io.BytesIO(content))
+            self.assertEqual(expected["elements"][0]["style"], "Normal", value)
+            self.assertEqual(DocxProcessor.extract_structure_streaming(io.BytesIO(content)), expected, value)
+
+    def test_values_rejected_by_python_docx_are_not_on(self):
+        # python-docx 的 ST_OnOff 区分大小写，"True"、"ON" 不是有效的开启值
+        for value in ("True", "ON", "yes"):
+            structure = DocxProcessor.extract_structure_streaming(io.BytesIO(document_with_default_flag(value)))
+            self.assertIsNone(structure["elements"][0]["style"], value)
+
+
+if __name__ == "__main__":
+    unittest.main()
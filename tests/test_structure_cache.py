@@ -0,0 +1,96 @@
+"""
+文档结构缓存的测试。
+
+在项目根目录执行：python -m unittest discover -s tests
+"""
+import asyncio
+import os
+import sys
+import unittest
+from unittest import mock
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+sys.path.insert(0, os.path.join(ROOT_DIR, "benchmarks"))
+
+import docgen  # noqa: E402
+from stubs import DocumentServer  # noqa: E402
+
+from core.structure_cache import StructureCache  # noqa: E402
+
+
+def structure(version):
+    return {"elements": [], "version": version}
+
+
+class StructureCacheTest(unittest.TestCase):
+    def test_lru_eviction(self):
+        cache = StructureCache(max_entries=2)
+        cache.put("a", structure("va"))
+        cache.put("b", structure("vb"))
+        cache.remember_url("http://x/b", '"etag-b"', "b")
+        self.assertIsNotNone(cache.get("a"))  # a 变为最近使用
+
+        cache.put("c", structure("vc"))
+
+        self.assertIsNone(cache.get("b"))
+        self.assertIsNotNone(cache.get("a"))
+        self.assertIsNotNone(cache.get("c"))
+        # 被淘汰条目的URL索引和版本索引一并清理
+        self.assertIsNone(cache.lookup_url("http://x/b"))
+        self.assertIsNone(cache.get_version("vb"))
+        stats = cache.stats()
+        self.assertEqual((stats["entries"], stats["evictions"], stats["hits"], stats["misses"]), (2, 1, 3, 1))
+
+    def test_zero_size_disables_cache(self):
+        cache = StructureCache(max_entries=0)
+        cache.put("a", structure("va"))
+        cache.remember_url("http://x/a", '"etag"', "a")
+        self.assertIsNone(cache.get("a"))
+        self.assertIsNone(cache.lookup_url("http://x/a"))
+
+
+class CachedExtractionTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        import main
+        cls.main = main
+        cls.server = DocumentServer()
+        cls.content = docgen.generate(paragraphs=50, tables=1, table_rows=3)
+        cls.url = cls.server.publish("cached.docx", cls.content)
+        cls.copy_url = cls.server.publish("copy.docx", cls.content)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.close()
+
+    def extract(self, url):
+        async def run():
+            try:
+                return await self.main.extract_document_structure(url)
+            finally:
+                await self.main.connections.aclose()
+
+        return asyncio.run(run())
+
+    def test_same_content_is_parsed_once_and_etag_is_revalidated(self):
+        main = self.main
+        parse = mock.Mock(wraps=main._extract_structure_core)
+        with mock.patch.object(main, "structure_cache", StructureCache(8)), \
+                mock.patch.object(main, "_extract_structure_core", parse):
+            first = self.extract(self.url)
+            second = self.extract(self.url)
+            copy = self.extract(self.copy_url)
+
+        self.assertNotIn("error", first)
+        self.assertEqual(parse.call_count, 1)
+        self.assertIs(second, first)
+        self.assertIs(copy, first)
+        # 第二次请求带 If-None-Match，服务端返回304，不再传输文档
+        self.assertEqual(self.server.statuses("cached.docx"), [200, 304])
+        # 另一个URL上的相同内容按内容哈希命中
+        self.assertEqual(self.server.statuses("copy.docx"), [200])
+
+
+if __name__ == "__main__":
+    unittest.main()
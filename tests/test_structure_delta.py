@@ -0,0 +1,148 @@
+"""
+StructureDelta 增量比较的测试。
+
+在项目根目录执行：python -m unittest discover -s tests
+"""
+import asyncio
+import io
+import os
+import sys
+import unittest
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+sys.path.insert(0, os.path.join(ROOT_DIR, "benchmarks"))
+
+import docx  # noqa: E402
+from docx.oxml.ns import qn  # noqa: E402
+from stubs import DocumentServer  # noqa: E402
+
+from core.docx_processor import DocxProcessor  # noqa: E402
+from core.structure_delta import StructureDelta  # noqa: E402
+
+
+def build(paragraphs, anchored=False, table=True):
+    """按给定的段落文本生成文档；anchored 为 True 时以文本生成 w14:paraId。"""
+    document = docx.Document()
+    for text in paragraphs:
+        paragraph = document.add_paragraph(text)
+        if anchored:
+            paragraph._p.set(qn("w14:paraId"), "%08X" % (sum(map(ord, text.split("!")[0])) * 7919))
+    if table:
+        document.add_table(rows=1, cols=2).cell(0, 0).text = "cell"
+    stream = io.BytesIO()
+    document.save(stream)
+    return stream.getvalue()
+
+
+def extract(paragraphs, anchored=False, table=True):
+    """按给定的段落文本生成文档并提取结构。"""
+    return DocxProcessor.extract_structure_with_ids(io.BytesIO(build(paragraphs, anchored, table)))
+
+
+class StructureDeltaTest(unittest.TestCase):
+    def test_insertion_only_reports_inserted_and_moved(self):
+        texts = [f"paragraph {i}" for i in range(10)]
+        previous = extract(texts)
+        current = extract(texts[:3] + ["new paragraph"] + texts[3:])
+
+        delta = StructureDelta.diff(previous, current)
+
+        self.assertEqual(delta["changed"], [])
+        self.assertEqual([e["id"] for e in delta["inserted"]], ["p_3"])
+        self.assertEqual(delta["removed"], [])
+        expected_moves = [{"id": f"p_{i + 1}", "previous_id": f"p_{i}"} for i in range(3, 10)]
+        expected_moves.append({"id": "tbl_11", "previous_id": "tbl_10"})
+        self.assertEqual(delta["moved"], expected_moves)
+
+    def test_deletion_only_reports_removed(self):
+        texts = [f"paragraph {i}" for i in range(10)]
+        delta = StructureDelta.diff(extract(texts), extract(texts[1:]))
+
+        self.assertEqual(delta["changed"], [])
+        self.assertEqual(delta["inserted"], [])
+        self.assertEqual(delta["removed"], ["p_0"])
+        self.assertEqual(len(delta["moved"]), 10)
+
+    def test_anchored_paragraph_changed_and_moved(self):
+        texts = [f"paragraph {i}" for i in range(5)]
+        previous = extract(texts, anchored=True)
+        current = extract(["inserted"] + texts[:2] + ["paragraph 2!edited"] + texts[3:], anchored=True)
+
+        delta = StructureDelta.diff(previous, current)
+
+        self.assertEqual([e["id"] for e in delta["changed"]], ["p_3"])
+        self.assertEqual([e["id"] for e in delta["inserted"]], ["p_0"])
+        self.assertEqual(delta["removed"], [])
+        self.assertIn({"id": "p_3", "previous_id": "p_2"}, delta["moved"])
+
+    def test_in_place_edit_falls_back_to_position(self):
+        texts = [f"paragraph {i}" for i in range(5)]
+        delta = StructureDelta.diff(extract(texts), extract(texts[:2] + ["edited"] + texts[3:]))
+
+        self.assertEqual([e["id"] for e in delta["changed"]], ["p_2"])
+        self.assertEqual(delta["inserted"], [])
+        self.assertEqual(delta["removed"], [])
+        self.assertEqual(delta["moved"], [])
+
+    def test_hash_does_not_depend_on_position(self):
+        previous = extract(["a"], table=True)
+        current = extract(["x", "a"], table=True)
+        self.assertEqual(previous["elements"][1]["hash"], current["elements"][2]["hash"])
+        self.assertNotEqual(previous["version"], current["version"])
+
+
+class SinceVersionExtractionTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        import main
+        cls.main = main
+        cls.server = DocumentServer()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.close()
+
+    def extract(self, url, **kwargs):
+        async def run():
+            try:
+                return await self.main.extract_document_structure(url, **kwargs)
+            finally:
+                await self.main.connections.aclose()
+
+        return asyncio.run(run())
+
+    def test_since_version_returns_only_the_delta(self):
+        texts = [f"paragraph {i}" for i in range(8)]
+        url = self.server.publish("delta.docx", build(texts, anchored=True))
+        base = self.extract(url)
+
+        edited = texts[:2] + ["inserted"] + texts[2:5] + ["paragraph 5!edited"] + texts[7:]
+        self.server.publish("delta.docx", build(edited, anchored=True))
+        delta = self.extract(url, since_version=base["version"])
+
+        self.assertFalse(delta["full"])
+        self.assertEqual(delta["base_version"], base["version"])
+        self.assertEqual(delta["version"], self.extract(url)["version"])
+        self.assertEqual([e["text"] for e in delta["changed"]], ["paragraph 5!edited"])
+        self.assertEqual([(e["id"], e["text"]) for e in delta["inserted"]], [("p_2", "inserted")])
+        self.assertEqual(delta["removed"], ["p_6"])
+        self.assertIn({"id": "p_6", "previous_id": "p_5"}, delta["moved"])
+        self.assertNotIn("tbl_8", [move["id"] for move in delta["moved"]])
+
+        # 内容未变时增量为空
+        same = self.extract(url, since_version=delta["version"])
+        self.assertEqual((same["changed"], same["inserted"], same["removed"], same["moved"]), ([], [], [], []))
+
+    def test_unknown_version_returns_full_structure(self):
+        url = self.server.publish("unknown.docx", build(["a", "b"]))
+
+        result = self.extract(url, since_version="0" * 32)
+
+        self.assertTrue(result["full"])
+        self.assertEqual([e["id"] for e in result["elements"]], ["p_0", "p_1", "tbl_2"])
+        self.assertEqual(result["base_version"], "0" * 32)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,109 @@
+"""
+结构分页（offset/limit、ID范围和续页游标）的测试。
+
+在项目根目录执行：python -m unittest discover -s tests
+"""
+import asyncio
+import os
+import sys
+import unittest
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+sys.path.insert(0, os.path.join(ROOT_DIR, "benchmarks"))
+
+import docgen  # noqa: E402
+from stubs import DocumentServer  # noqa: E402
+
+from core.structure_pager import StructurePager  # noqa: E402
+
+
+def make_structure(count):
+    return {"elements": [{"id": f"p_{i}"} for i in range(count)], "version": "v"}
+
+
+class StructurePagerTest(unittest.TestCase):
+    def test_id_range_with_offset_and_limit(self):
+        start, end = StructurePager.resolve_range("p_10", "tbl_19_r2c1")
+        self.assertEqual((start, end), (10, 19))
+
+        page = StructurePager.paginate(make_structure(50), "digest", offset=3, limit=4, start=start, end=end)
+
+        self.assertEqual([e["id"] for e in page["elements"]], ["p_13", "p_14", "p_15", "p_16"])
+        self.assertEqual(page["total_elements"], 10)
+        cursor = StructurePager.decode_cursor(page["next_cursor"])
+        self.assertEqual(cursor, {"h": "digest", "o": 7, "l": 4, "s": 10, "e": 19})
+
+    def test_cursor_walks_range_to_the_end(self):
+        structure = make_structure(23)
+        ids = []
+        page = StructurePager.paginate(structure, "d", limit=5, start=2)
+        while True:
+            ids.extend(e["id"] for e in page["elements"])
+            if page["next_cursor"] is None:
+                break
+            c = StructurePager.decode_cursor(page["next_cursor"])
+            page = StructurePager.paginate(structure, c["h"], c["o"], c["l"], c["s"], c["e"])
+        self.assertEqual(ids, [f"p_{i}" for i in range(2, 23)])
+
+    def test_invalid_arguments(self):
+        with self.assertRaises(ValueError):
+            StructurePager.resolve_range("p_9", "p_3")
+        with self.assertRaises(ValueError):
+            StructurePager.resolve_range("para:1234", None)
+        with self.assertRaises(ValueError):
+            StructurePager.decode_cursor("not-a-cursor")
+        with self.assertRaises(ValueError):
+            StructurePager.paginate(make_structure(3), "d", limit=0)
+
+
+class PagedExtractionTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        import main
+        cls.main = main
+        cls.server = DocumentServer()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.close()
+
+    def extract(self, url, **kwargs):
+        async def run():
+            try:
+                return await self.main.extract_document_structure(url, **kwargs)
+            finally:
+                await self.main.connections.aclose()
+
+        return asyncio.run(run())
+
+    def test_cursor_pages_come_from_cache_and_cover_the_range(self):
+        url = self.server.publish("paged.docx", docgen.generate(paragraphs=60, tables=2, table_rows=3))
+        full = self.extract(url)["elements"]
+        requests_before = len(self.server.statuses("paged.docx"))
+
+        page = self.extract(url, start_id="p_5", end_id="p_40", limit=7)
+        elements = list(page["elements"])
+        while page["next_cursor"]:
+            page = self.extract(url, cursor=page["next_cursor"])
+            self.assertNotIn("error", page)
+            elements.extend(page["elements"])
+
+        self.assertEqual(elements, full[5:41])
+        self.assertEqual(page["total_elements"], 36)
+        # 第一页做了一次条件请求，续页直接读取缓存，不再访问文档URL
+        self.assertEqual(len(self.server.statuses("paged.docx")), requests_before + 1)
+
+    def test_cursor_is_rejected_after_document_changes(self):
+        url = self.server.publish("changing.docx", docgen.generate(paragraphs=30, seed=1))
+        first = self.extract(url, limit=10)
+        self.main.structure_cache.clear()
+        self.server.publish("changing.docx", docgen.generate(paragraphs=30, seed=2))
+
+        result = self.extract(url, cursor=first["next_cursor"])
+
+        self.assertIn("changed", result["error"])
+
+
+if __name__ == "__main__":
+    unittest.main()